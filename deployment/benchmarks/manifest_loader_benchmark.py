@@ -0,0 +1,220 @@
+##############################################################################
+#  Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.   #
+#                                                                            #
+#  Licensed under the Apache License, Version 2.0 (the "License").           #
+#  You may not use this file except in compliance                            #
+#  with the License. A copy of the License is located at                     #
+#                                                                            #
+#      http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                            #
+#  or in the "license" file accompanying this file. This file is             #
+#  distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  #
+#  KIND, express or implied. See the License for the specific language       #
+#  governing permissions  and limitations under the License.                 #
+##############################################################################
+
+# !/usr/bin/env python3
+"""Compares the manifest loader (cfct.manifest.manifest.Manifest) with the
+yorm models it replaced, on a generated manifest.
+
+Usage (from the package root):
+    pip install yorm==1.6.2  # optional, to time the yorm models
+    python3 deployment/benchmarks/manifest_loader_benchmark.py --resources 2000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "source", "src"))
+
+from cfct.manifest.manifest import Manifest  # noqa: E402
+
+
+def generate_manifest(resource_count: int) -> str:
+    """Returns a version 2021-03-15 manifest with resource_count StackSet
+    resources, each with parameters, accounts, OUs, regions and exports
+    """
+    lines = ["---", "region: us-east-1", "version: 2021-03-15", "resources:"]
+    for index in range(resource_count):
+        lines += [
+            "  - name: stackset-{}".format(index),
+            "    resource_file: templates/stackset-{}.template".format(index),
+            "    deploy_method: stack_set",
+            "    parameters:",
+            "      - parameter_key: BucketName",
+            "        parameter_value: bucket-{}".format(index),
+            "      - parameter_key: VpcCidr",
+            "        parameter_value: 10.{}.0.0/16".format(index % 256),
+            "      - parameter_key: AvailabilityZones",
+            "        parameter_value: $[alfred_genaz_2]",
+            "    deployment_targets:",
+            "      accounts:",
+            "        - {:012d}".format(100000000000 + index),
+            "        - account-{}".format(index),
+            "      organizational_units:",
+            "        - OU-{}".format(index % 50),
+            "        - OU-{}:Nested-{}".format(index % 50, index % 7),
+            "    regions:",
+            "      - us-east-1",
+            "      - eu-west-1",
+            "    export_outputs:",
+            "      - name: /org/stackset-{}/bucket".format(index),
+            "        value: $[output_BucketName]",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def walk(manifest) -> int:
+    """Reads the fields the parsers read from each resource"""
+    count = 0
+    for resource in manifest.resources:
+        count += len(resource.name) + len(resource.resource_file)
+        count += len(resource.deployment_targets.accounts)
+        count += len(resource.deployment_targets.organizational_units)
+        count += len(resource.regions)
+        for parameter in resource.parameters:
+            count += len(parameter.parameter_key) + len(parameter.parameter_value)
+        for export in resource.export_outputs:
+            count += len(export.name) + len(export.value)
+    return count
+
+
+def get_yorm_manifest_class():
+    """Returns the yorm models of the manifest, as they were before the
+    read-only loader, or None if yorm is not installed
+    """
+    try:
+        import yorm
+        from yorm.types import AttributeDictionary, Boolean, List, String
+    except ImportError:
+        return None
+
+    @yorm.attr(name=String)
+    @yorm.attr(value=String)
+    class SSM(AttributeDictionary):
+        pass
+
+    @yorm.attr(all=SSM)
+    class SSMList(List):
+        pass
+
+    @yorm.attr(all=String)
+    class StringList(List):
+        pass
+
+    @yorm.attr(parameter_key=String)
+    @yorm.attr(parameter_value=String)
+    class Parameter(AttributeDictionary):
+        pass
+
+    @yorm.attr(all=Parameter)
+    class Parameters(List):
+        pass
+
+    @yorm.attr(accounts=StringList)
+    @yorm.attr(organizational_units=StringList)
+    class DeployTargets(AttributeDictionary):
+        pass
+
+    @yorm.attr(name=String)
+    @yorm.attr(template_file=String)
+    @yorm.attr(parameter_file=String)
+    @yorm.attr(deploy_method=String)
+    @yorm.attr(ssm_parameters=SSMList)
+    @yorm.attr(regions=StringList)
+    @yorm.attr(deploy_to_account=StringList)
+    @yorm.attr(deploy_to_ou=StringList)
+    class CfnResource(AttributeDictionary):
+        pass
+
+    @yorm.attr(all=CfnResource)
+    class CfnResourcesList(List):
+        pass
+
+    @yorm.attr(name=String)
+    @yorm.attr(policy_file=String)
+    @yorm.attr(description=String)
+    @yorm.attr(apply_to_accounts_in_ou=StringList)
+    class Policy(AttributeDictionary):
+        pass
+
+    @yorm.attr(all=Policy)
+    class PolicyList(List):
+        pass
+
+    @yorm.attr(name=String)
+    @yorm.attr(resource_file=String)
+    @yorm.attr(parameter_file=String)
+    @yorm.attr(deploy_method=String)
+    @yorm.attr(export_outputs=SSMList)
+    @yorm.attr(regions=StringList)
+    @yorm.attr(deployment_targets=DeployTargets)
+    @yorm.attr(parameters=Parameters)
+    class ResourceProps(AttributeDictionary):
+        pass
+
+    @yorm.attr(all=ResourceProps)
+    class Resources(List):
+        pass
+
+    @yorm.attr(region=String)
+    @yorm.attr(version=String)
+    @yorm.attr(enable_stack_set_deletion=Boolean)
+    @yorm.attr(cloudformation_resources=CfnResourcesList)
+    @yorm.attr(organization_policies=PolicyList)
+    @yorm.attr(resources=Resources)
+    @yorm.sync("{self.manifest_file}", auto_create=False)
+    class YormManifest:
+        def __init__(self, manifest_file):
+            self.manifest_file = manifest_file
+            self.enable_stack_set_deletion = False
+            self.organization_policies = []
+            self.cloudformation_resources = []
+            self.resources = []
+
+    return YormManifest
+
+
+def benchmark(name, manifest_class, manifest_file, repeat):
+    load_times, walk_times = [], []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        manifest = manifest_class(manifest_file)
+        resource_count = len(manifest.resources)
+        load_times.append(time.perf_counter() - start_time)
+
+        start_time = time.perf_counter()
+        checksum = walk(manifest)
+        walk_times.append(time.perf_counter() - start_time)
+    print(
+        "{:<8} resources: {}  load: {:.3f} s  walk: {:.3f} s  (best of {}, checksum {})".format(
+            name, resource_count, min(load_times), min(walk_times), repeat, checksum
+        )
+    )
+    return checksum
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--resources", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        manifest_file = os.path.join(folder, "manifest.yaml")
+        with open(manifest_file, "w") as content_file:
+            content_file.write(generate_manifest(args.resources))
+
+        checksum = benchmark("loader", Manifest, manifest_file, args.repeat)
+        yorm_manifest_class = get_yorm_manifest_class()
+        if yorm_manifest_class is None:
+            print("yorm       not installed, skipped")
+        elif benchmark("yorm", yorm_manifest_class, manifest_file, args.repeat) != checksum:
+            sys.exit("The loader and yorm read different values")
+
+
+if __name__ == "__main__":
+    main()
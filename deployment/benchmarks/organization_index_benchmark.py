@@ -0,0 +1,205 @@
+##############################################################################
+#  Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.   #
+#                                                                            #
+#  Licensed under the Apache License, Version 2.0 (the "License").           #
+#  You may not use this file except in compliance                            #
+#  with the License. A copy of the License is located at                     #
+#                                                                            #
+#      http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                            #
+#  or in the "license" file accompanying this file. This file is             #
+#  distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  #
+#  KIND, express or implied. See the License for the specific language       #
+#  governing permissions  and limitations under the License.                 #
+##############################################################################
+
+# !/usr/bin/env python3
+"""Compares the account resolution of the manifest resources through the
+OrganizationsData indexes with the map scans they replaced, on a generated
+organization. No AWS API is called.
+
+Usage (from the package root):
+    python3 deployment/benchmarks/organization_index_benchmark.py \
+        --accounts 5000 --ous 250 --resources 500
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "source", "src"))
+os.environ.setdefault("LOG_LEVEL", "warning")
+
+from cfct.manifest.manifest_parser import OrganizationsData  # noqa: E402
+
+ROOT_ID = "r-abcd"
+
+
+class Snapshot:
+    def __init__(self, sections):
+        self.sections = sections
+
+    def get(self, name, builder):
+        return self.sections[name]
+
+
+def generate_organization(account_count: int, ou_count: int) -> dict:
+    """Returns the organization snapshot sections: 80% of the OUs are at the
+    root level, the other ones are nested under them. The accounts are
+    spread over the OUs, 1% of the account names only differ in case.
+    """
+    top_level_count = max(1, ou_count * 4 // 5)
+    organizational_units = {}
+    for index in range(ou_count):
+        parent_id = ROOT_ID if index < top_level_count else "ou-{}".format(index % top_level_count)
+        organizational_units["ou-{}".format(index)] = {
+            "Name": "OU-{}".format(index),
+            "ParentId": parent_id,
+        }
+
+    accounts = {}
+    accounts_by_parent = {ROOT_ID: []}
+    for index in range(account_count):
+        account_id = "{:012d}".format(100000000000 + index)
+        name = "Account-{}".format(index)
+        accounts[account_id] = name.upper() if index % 100 == 99 else name
+        accounts_by_parent.setdefault("ou-{}".format(index % ou_count), []).append(account_id)
+    return {
+        "Roots": [ROOT_ID],
+        "OrganizationalUnits": organizational_units,
+        "AccountsByParent": accounts_by_parent,
+        "Accounts": accounts,
+    }
+
+
+def generate_resources(sections: dict, resource_count: int, seed: int) -> list:
+    """Returns (accounts, OUs) of each resource: 20 account ids and names and
+    3 OUs, one of them nested
+    """
+    rng = random.Random(seed)
+    account_ids = sorted(sections["Accounts"])
+    names = {ou_id: ou["Name"] for ou_id, ou in sections["OrganizationalUnits"].items()}
+    paths = [
+        (
+            ou["Name"]
+            if ou["ParentId"] == ROOT_ID
+            else "{}:{}".format(names[ou["ParentId"]], ou["Name"])
+        )
+        for ou in sections["OrganizationalUnits"].values()
+    ]
+    nested_paths = [path for path in paths if ":" in path] or paths
+    resources = []
+    for _ in range(resource_count):
+        accounts = []
+        for account_id in rng.sample(account_ids, 20):
+            if rng.random() < 0.5:
+                accounts.append(account_id)
+            else:
+                accounts.append(sections["Accounts"][account_id].lower())
+        ous = rng.sample([path for path in paths if ":" not in path], 2)
+        ous.append(rng.choice(nested_paths))
+        resources.append((accounts, ous))
+    return resources
+
+
+def resolve_with_scans(sections: dict, resources: list) -> list:
+    """Account resolution as it was done before the indexes"""
+    org = build_organizations_data(sections)
+    accounts_by_parent = sections["AccountsByParent"]
+    ou_tree = org._get_ou_tree()
+    ou_name_to_id_map = {ou_tree.names[ou_id]: ou_id for ou_id in ou_tree.get_children(ROOT_ID)}
+    ou_id_to_account_map = {
+        ou_id: list(accounts_by_parent.get(ou_id, [])) for ou_id in ou_name_to_id_map.values()
+    }
+    name_to_account_map = {name: account_id for account_id, name in sections["Accounts"].items()}
+    accounts_in_all_ous = [
+        account_id for accounts in ou_id_to_account_map.values() for account_id in accounts
+    ]
+
+    results = []
+    for account_list, ou_list in resources:
+        accounts_in_ou = []
+        ou_ids_manifest = []
+        for ou_name in ou_list:
+            if ":" in ou_name:
+                accounts_in_ou.extend(accounts_by_parent.get(ou_tree.get_ou_id(ou_name), []))
+            elif ou_name in ou_name_to_id_map:
+                ou_ids_manifest.append(ou_name_to_id_map[ou_name])
+        for ou_id in ou_ids_manifest:
+            accounts_in_ou.extend(ou_id_to_account_map.get(ou_id, []))
+
+        new_account_list = []
+        for item in account_list:
+            if item.isdigit() and len(item) == 12:
+                new_account_list.append(item)
+            else:
+                new_account_list.extend(
+                    value
+                    for key, value in name_to_account_map.items()
+                    if item.lower() == key.lower()
+                )
+        sanitized = list(set(new_account_list).intersection(set(accounts_in_all_ous)))
+        sanitized.extend(accounts_in_ou)
+        results.append(sorted(set(sanitized)))
+    return results
+
+
+def resolve_with_indexes(sections: dict, resources: list) -> list:
+    """Account resolution of the StackSet parsers"""
+    org = build_organizations_data(sections)
+    accounts_in_all_ous = set(
+        account_id
+        for ou_id in org._get_ou_tree().get_children(ROOT_ID)
+        for account_id in sections["AccountsByParent"].get(ou_id, [])
+    )
+    account_name_index = org.get_account_name_index()
+    return [
+        org.get_final_account_list(
+            account_list,
+            accounts_in_all_ous,
+            org.get_accounts_in_ou(ou_list),
+            account_name_index,
+        )
+        for account_list, ou_list in resources
+    ]
+
+
+def build_organizations_data(sections: dict) -> OrganizationsData:
+    with mock.patch("cfct.manifest.manifest_parser.StackSet"), mock.patch(
+        "cfct.manifest.manifest_parser.get_organization_snapshot",
+        return_value=Snapshot(sections),
+    ):
+        return OrganizationsData()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=5000)
+    parser.add_argument("--ous", type=int, default=250)
+    parser.add_argument("--resources", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    sections = generate_organization(args.accounts, args.ous)
+    resources = generate_resources(sections, args.resources, args.seed)
+
+    timings = {}
+    results = {}
+    for name, resolve in (("scans", resolve_with_scans), ("indexes", resolve_with_indexes)):
+        start_time = time.perf_counter()
+        results[name] = resolve(sections, resources)
+        timings[name] = time.perf_counter() - start_time
+        print(
+            "{:<8} accounts: {}  OUs: {}  resources: {}  {:.3f} s".format(
+                name, args.accounts, args.ous, args.resources, timings[name]
+            )
+        )
+    if results["scans"] != results["indexes"]:
+        sys.exit("The indexes and the scans resolved different accounts")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,7 @@
 if [ -z "$1" ]; then
     echo "Please provide the base source bucket name, trademark approved solution name and version where the lambda code will eventually reside."
     echo "For example: ./execute_stage_scripts.sh <STAGE_NAME>"
-    echo "For example: ./execute_stage_scripts.sh build | scp | rcp | stackset"
+    echo "For example: ./execute_stage_scripts.sh build | compile | scp | rcp | stackset | merge"
     exit 1
 fi
 
@@ -17,9 +17,14 @@ KMS_KEY_ALIAS_NAME=$6
 BOOL_VALUES=$7
 NONE_TYPE_VALUES=$8
 BUILD_STAGE_NAME="build"
+COMPILE_STAGE_NAME="compile"
 SCP_STAGE_NAME="scp"
 RCP_STAGE_NAME="rcp"
 STACKSET_STAGE_NAME="stackset"
+MERGE_STAGE_NAME="merge"
+# the StackSets are deployed in SHARD_COUNT shards by separate CodeBuild jobs
+SHARD_INDEX=${SHARD_INDEX:-0}
+SHARD_COUNT=${SHARD_COUNT:-1}
 CURRENT=$(pwd)
 MANIFEST_FILE_PATH=$CURRENT/manifest.yaml
 
@@ -43,6 +48,12 @@ build_scripts () {
     cat merge_report.txt
 }
 
+compile_scripts () {
+    echo "Date: $(date) Path: $(pwd)"
+    echo "python state_machine_trigger.py $LOG_LEVEL $WAIT_TIME $MANIFEST_FILE_PATH $SM_ARN $ARTIFACT_BUCKET $COMPILE_STAGE_NAME $KMS_KEY_ALIAS_NAME"
+    python state_machine_trigger.py "$LOG_LEVEL" "$WAIT_TIME" "$MANIFEST_FILE_PATH" "$SM_ARN" "$ARTIFACT_BUCKET" "$COMPILE_STAGE_NAME" "$KMS_KEY_ALIAS_NAME"
+}
+
 scp_scripts () {
     echo "Date: $(date) Path: $(pwd)"
     echo "python state_machine_trigger.py $LOG_LEVEL $WAIT_TIME $MANIFEST_FILE_PATH $SM_ARN $ARTIFACT_BUCKET $SCP_STAGE_NAME $KMS_KEY_ALIAS_NAME"
@@ -57,14 +68,24 @@ rcp_scripts () {
 
 stackset_scripts () {
     echo "Date: $(date) Path: $(pwd)"
-    echo "python state_machine_trigger.py $LOG_LEVEL $WAIT_TIME $MANIFEST_FILE_PATH $SM_ARN $ARTIFACT_BUCKET $STACKSET_STAGE_NAME $KMS_KEY_ALIAS_NAME"
-    python state_machine_trigger.py "$LOG_LEVEL" "$WAIT_TIME" "$MANIFEST_FILE_PATH" "$SM_ARN" "$ARTIFACT_BUCKET" "$STACKSET_STAGE_NAME" "$KMS_KEY_ALIAS_NAME" "$ENFORCE_SUCCESSFUL_STACK_INSTANCES"
+    echo "python state_machine_trigger.py $LOG_LEVEL $WAIT_TIME $MANIFEST_FILE_PATH $SM_ARN $ARTIFACT_BUCKET $STACKSET_STAGE_NAME $KMS_KEY_ALIAS_NAME $ENFORCE_SUCCESSFUL_STACK_INSTANCES $SHARD_INDEX $SHARD_COUNT"
+    python state_machine_trigger.py "$LOG_LEVEL" "$WAIT_TIME" "$MANIFEST_FILE_PATH" "$SM_ARN" "$ARTIFACT_BUCKET" "$STACKSET_STAGE_NAME" "$KMS_KEY_ALIAS_NAME" "$ENFORCE_SUCCESSFUL_STACK_INSTANCES" "$SHARD_INDEX" "$SHARD_COUNT"
+}
+
+merge_scripts () {
+    echo "Date: $(date) Path: $(pwd)"
+    echo "python state_machine_trigger.py $LOG_LEVEL $WAIT_TIME $MANIFEST_FILE_PATH $SM_ARN $ARTIFACT_BUCKET $MERGE_STAGE_NAME $KMS_KEY_ALIAS_NAME $ENFORCE_SUCCESSFUL_STACK_INSTANCES $SHARD_INDEX $SHARD_COUNT"
+    python state_machine_trigger.py "$LOG_LEVEL" "$WAIT_TIME" "$MANIFEST_FILE_PATH" "$SM_ARN" "$ARTIFACT_BUCKET" "$MERGE_STAGE_NAME" "$KMS_KEY_ALIAS_NAME" "$ENFORCE_SUCCESSFUL_STACK_INSTANCES" "$SHARD_INDEX" "$SHARD_COUNT"
 }
 
 if [ "$STAGE_NAME_ARGUMENT" == $BUILD_STAGE_NAME ];
 then
     echo "Executing Build Stage Scripts."
     build_scripts
+elif [ "$STAGE_NAME_ARGUMENT" == $COMPILE_STAGE_NAME ];
+then
+    echo "Executing Compile Stage Scripts."
+    compile_scripts
 elif [ "$STAGE_NAME_ARGUMENT" == $SCP_STAGE_NAME ];
 then
     echo "Executing SCP Stage Scripts."
@@ -77,7 +98,11 @@ elif [ "$STAGE_NAME_ARGUMENT" == $STACKSET_STAGE_NAME ];
 then
     echo "Executing StackSet Stage Scripts."
     stackset_scripts
+elif [ "$STAGE_NAME_ARGUMENT" == $MERGE_STAGE_NAME ];
+then
+    echo "Executing Merge Stage Scripts."
+    merge_scripts
 else
     echo "Could not execute scripts. Argument didn't match one of the allowed values.
-    >> build | scp | stackset"
+    >> build | compile | scp | rcp | stackset | merge"
 fi
@@ -4,15 +4,17 @@
 if [ -z "$1" ]; then
     echo "Please provide the base source bucket name, trademark approved solution name and version where the lambda code will eventually reside."
     echo "For example: ./install_stage_dependencies.sh <STAGE_NAME>"
-    echo "For example: ./install_stage_dependencies.sh build | scp | rcp | stackset"
+    echo "For example: ./install_stage_dependencies.sh build | compile | scp | rcp | stackset | merge"
     exit 1
 fi
 
 stage_name_argument=$1
 build_stage_name='build'
+compile_stage_name='compile'
 scp_stage_name='scp'
 rcp_stage_name='rcp'
 stackset_stage_name='stackset'
+merge_stage_name='merge'
 
 install_common_pip_packages () {
     # install pip packages
@@ -21,7 +23,6 @@ install_common_pip_packages () {
     pip install --quiet --upgrade wheel
     pip install --quiet --upgrade virtualenv==20.4.2
     pip install --quiet "cython<3.0.0" && pip install --quiet --no-build-isolation pyyaml==5.4.1
-    pip install --quiet --upgrade yorm==1.6.2
     pip install --quiet --upgrade jinja2==3.1.6
     pip install --quiet --upgrade requests==2.32.4
 }
@@ -42,6 +43,11 @@ build_dependencies () {
     gem install --quiet cfn-nag -v 0.7.2
 }
 
+compile_dependencies () {
+    # install pip packages
+    install_common_pip_packages
+}
+
 scp_dependencies () {
     # install pip packages
     install_common_pip_packages
@@ -57,10 +63,19 @@ stackset_dependencies () {
     install_common_pip_packages
 }
 
+merge_dependencies () {
+    # install pip packages
+    install_common_pip_packages
+}
+
 if [ $stage_name_argument == $build_stage_name ];
 then
     echo "Installing Build Stage Dependencies."
     build_dependencies
+elif [ $stage_name_argument == $compile_stage_name ];
+then
+    echo "Installing Compile Stage Dependencies."
+    compile_dependencies
 elif [ $stage_name_argument == $scp_stage_name ];
 then
     echo "Installing SCP Stage Dependencies."
@@ -73,7 +88,11 @@ elif [ $stage_name_argument == $stackset_stage_name ];
 then
     echo "Installing StackSet Stage Dependencies."
     stackset_dependencies
+elif [ $stage_name_argument == $merge_stage_name ];
+then
+    echo "Installing Merge Stage Dependencies."
+    merge_dependencies
 else
     echo "Could not install dependencies. Argument didn't match one of the allowed values.
-    >> build | scp | rcp | stackset"
+    >> build | compile | scp | rcp | stackset | merge"
 fi
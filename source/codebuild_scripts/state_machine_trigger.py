@@ -15,10 +15,18 @@
 
 import os
 import sys
+from collections.abc import Iterator
+from typing import Union
 
 import cfct.manifest.manifest_parser as parse
+from cfct.aws.services.rcp import ResourceControlPolicy as RCP
+from cfct.aws.services.scp import ServiceControlPolicy as SCP
+from cfct.aws.utils.policy_index import add_policy_index
 from cfct.exceptions import StackSetHasFailedInstances
+from cfct.manifest.deployment_ledger import get_deployment_ledger
+from cfct.manifest.shards import ShardResults, partition_shards
 from cfct.manifest.sm_execution_manager import SMExecutionManager
+from cfct.manifest.stack_set_dependencies import is_delete_request
 from cfct.utils.logger import Logger
 
 
@@ -27,13 +35,21 @@ def main():
     This function is triggered by CodePipeline stages (ServiceControlPolicy,
      ResourceControlPolicy and CloudFormationResource).
      Each stage triggers the following workflow:
-     1. Parse the manifest file.
+     1. Parse the manifest file, or load the inputs compiled by the
+        CompileManifest stage for this pipeline execution.
      2. Generate state machine input.
      3. Start state machine execution.
      4. Monitor state machine execution.
 
      SCP & RCP State Machine currently supports parallel deployments only
-     Stack Set State Machine currently support sequential deployments only.
+     Stack Set State Machine supports sequential (default) and dependency
+     graph (dag) deployments, selected with the STACKSET_EXECUTION_MODE
+     environment variable. In dag mode, up to MAX_CONCURRENT_STACK_SETS
+     StackSets that do not share SSM parameters are deployed concurrently.
+
+     The StackSets can be deployed by several CodeBuild jobs, each one
+     passing its <SHARD_INDEX> and the <SHARD_COUNT> (see partition_shards).
+     The MERGE stage then reports the results of all the shards.
 
     :return: None
     """
@@ -61,6 +77,21 @@ def main():
                 enforce_successful_stack_instances = (
                     True if sys.argv[8] == "true" else False
                 )
+            shard_index, shard_count = 0, 1
+            if len(sys.argv) > 10:
+                shard_index = int(sys.argv[9])
+                shard_count = int(sys.argv[10])
+
+            if stage_name.upper() == "COMPILE":
+                # compile the state machine inputs of all the stages once,
+                # the next stages of the pipeline execution load them
+                parse.compile_manifest()
+                return
+
+            if stage_name.upper() == "MERGE":
+                # report the results stored by the STACKSET shards
+                merge_shard_results(shard_count)
+                return
 
             sm_input_list = []
             if stage_name.upper() == "SCP":
@@ -76,10 +107,17 @@ def main():
                 logger.info("RCP sm_input_list:")
                 logger.info(sm_input_list)
             elif stage_name.upper() == "STACKSET":
-                os.environ["EXECUTION_MODE"] = "sequential"
+                os.environ["EXECUTION_MODE"] = os.environ.get(
+                    "STACKSET_EXECUTION_MODE", "sequential"
+                )
+                if shard_count > 1:
+                    run_stack_set_shard(
+                        shard_index, shard_count, enforce_successful_stack_instances
+                    )
+                    return
+                # without a compiled plan, the inputs are streamed and the
+                # executions start while the next inputs are built
                 sm_input_list = get_stack_set_inputs()
-                logger.info("STACKSET sm_input_list:")
-                logger.info(sm_input_list)
 
             if sm_input_list:
                 logger.info("=== Launching State Machine Execution ===")
@@ -93,7 +131,8 @@ def main():
             print(
                 "Example: state_machine_trigger.py <LOG-LEVEL> <WAIT_TIME> "
                 "<MANIFEST-FILE-PATH> <SM_ARN_SCP> <STAGING_BUCKET> "
-                "<STAGE-NAME> <KMS_KEY_ALIAS_NAME>"
+                "<STAGE-NAME> <KMS_KEY_ALIAS_NAME> "
+                "[<ENFORCE_SUCCESSFUL_STACK_INSTANCES> <SHARD_INDEX> <SHARD_COUNT>]"
             )
             sys.exit(2)
     except Exception as e:
@@ -102,51 +141,154 @@ def main():
 
 
 def get_scp_inputs() -> list:
-    return parse.scp_manifest()
+    sm_input_list = parse.scp_manifest()
+    # the executions look the policies up in the index built for this stage
+    add_policy_index(logger, sm_input_list, SCP(logger))
+    return sm_input_list
 
 
 def get_rcp_inputs() -> list:
-    return parse.rcp_manifest()
+    sm_input_list = parse.rcp_manifest()
+    add_policy_index(logger, sm_input_list, RCP(logger))
+    return sm_input_list
+
+
+def get_stack_set_inputs() -> Union[list, Iterator]:
+    return parse.stream_stack_set_manifest()
+
+
+def run_stack_set_shard(
+    shard_index, shard_count, enforce_successful_stack_instances=False
+):
+    """Deploys the StackSets of one shard of the compiled plan and stores
+    its result for the MERGE stage. Shard 0 deploys the StackSet deletions
+    first, the other shards wait for them before deploying their StackSets.
+    """
+    if not 0 <= shard_index < shard_count:
+        raise ValueError("Invalid shard index: {}".format(shard_index))
+    results = ShardResults(logger, shard_count)
+    # the deployment ledger and the operation timings are kept per shard
+    os.environ["SHARD_INDEX"] = str(shard_index)
+    os.environ["SHARD_COUNT"] = str(shard_count)
+    sm_input_list = parse.compiled_stack_set_manifest()
+    shard_inputs = [
+        sm_input_list[index]
+        for index in partition_shards(sm_input_list, shard_count)[shard_index]
+    ]
+    stack_set_names = [
+        sm_input.get("ResourceProperties").get("StackSetName")
+        for sm_input in shard_inputs
+    ]
+    logger.info("Shard {} of {}: {}".format(shard_index, shard_count, stack_set_names))
+
+    status, failed_list = None, []
+    try:
+        deletions = [
+            sm_input for sm_input in shard_inputs if is_delete_request(sm_input)
+        ]
+        updates = [
+            sm_input for sm_input in shard_inputs if not is_delete_request(sm_input)
+        ]
+        if shard_index == 0:
+            if deletions:
+                status, failed_list = run_shard_executions(
+                    deletions, enforce_successful_stack_instances
+                )
+            results.save_deletions(status, failed_list)
+        elif any(is_delete_request(sm_input) for sm_input in sm_input_list):
+            if not results.wait_for_deletions(
+                int(os.environ.get("WAIT_TIME")),
+                int(os.environ.get("SHARD_WAIT_TIMEOUT", 3600)),
+            ):
+                status = "FAILED"
+
+        if status != "FAILED" and updates:
+            status, failed_executions = run_shard_executions(
+                updates, enforce_successful_stack_instances
+            )
+            failed_list.extend(failed_executions)
+    except Exception:
+        if shard_index == 0 and status is None:
+            results.save_deletions("FAILED", failed_list)
+        results.save(shard_index, "FAILED", stack_set_names, failed_list)
+        raise
+
+    results.save(shard_index, status, stack_set_names, failed_list)
+    retain_shard_ledger(stack_set_names)
+    if status == "FAILED":
+        log_failed_executions(failed_list)
+        sys.exit(1)
 
 
-def get_stack_set_inputs() -> list:
-    return parse.stack_set_manifest()
+def retain_shard_ledger(stack_set_names):
+    """Drops the ledger records of the StackSets moved to another shard"""
+    ledger = get_deployment_ledger(logger)
+    if ledger:
+        ledger.retain(stack_set_names)
+        ledger.save()
+
+
+def run_shard_executions(sm_input_list, enforce_successful_stack_instances=False):
+    manager = SMExecutionManager(
+        logger, sm_input_list, enforce_successful_stack_instances
+    )
+    try:
+        return manager.launch_executions()
+    except StackSetHasFailedInstances as error:
+        log_failed_stack_set_instances(error)
+        return "FAILED", []
+
+
+def merge_shard_results(shard_count):
+    status, failed_list = ShardResults(logger, shard_count).merge()
+    if status == "FAILED":
+        log_failed_executions(failed_list)
+        sys.exit(1)
+    logger.info("All the shards completed.")
+
+
+def log_failed_stack_set_instances(error):
+    logger.error(f"{error.stack_set_name} has following failed instances:")
+    for instance in error.failed_stack_set_instances:
+        message = {
+            "StackID": instance["StackId"],
+            "Account": instance["Account"],
+            "Region": instance["Region"],
+            "StatusReason": instance["StatusReason"],
+        }
+        logger.error(message)
+
+
+def log_failed_executions(failed_list):
+    logger.error(
+        "\n********************************************************"
+        "\nState Machine Execution(s) Failed. \nNavigate to the "
+        "AWS Step Functions console \nand review the following "
+        "State Machine Executions.\nARN List:\n"
+        "{}\n********************************************************".format(
+            failed_list
+        )
+    )
 
 
 def launch_state_machine_execution(
     sm_input_list, enforce_successful_stack_instances=False
 ):
-    if isinstance(sm_input_list, list):
+    if isinstance(sm_input_list, (list, Iterator)):
         manager = SMExecutionManager(
             logger, sm_input_list, enforce_successful_stack_instances
         )
         try:
             status, failed_list = manager.launch_executions()
         except StackSetHasFailedInstances as error:
-            logger.error(f"{error.stack_set_name} has following failed instances:")
-            for instance in error.failed_stack_set_instances:
-                message = {
-                    "StackID": instance["StackId"],
-                    "Account": instance["Account"],
-                    "Region": instance["Region"],
-                    "StatusReason": instance["StatusReason"],
-                }
-                logger.error(message)
+            log_failed_stack_set_instances(error)
             sys.exit(1)
 
     else:
-        raise TypeError("State Machine Input List must be of list type")
+        raise TypeError("State Machine Input List must be of list or iterator type")
 
     if status == "FAILED":
-        logger.error(
-            "\n********************************************************"
-            "\nState Machine Execution(s) Failed. \nNavigate to the "
-            "AWS Step Functions console \nand review the following "
-            "State Machine Executions.\nARN List:\n"
-            "{}\n********************************************************".format(
-                failed_list
-            )
-        )
+        log_failed_executions(failed_list)
         sys.exit(1)
 
 
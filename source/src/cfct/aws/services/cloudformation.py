@@ -17,14 +17,26 @@
 
 import json
 import os
-from typing import Any, Dict, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
 
 from botocore.exceptions import ClientError
 
 from cfct.aws.utils.boto3_session import Boto3Session
-from cfct.types import ResourcePropertiesTypeDef, StackSetInstanceTypeDef, StackSetRequestTypeDef
+from cfct.aws.utils.operation_preferences import (
+    ADAPTIVE,
+    FIXED,
+    adaptive_operation_preferences,
+    fixed_operation_preferences,
+)
+from cfct.types import ResourcePropertiesTypeDef, StackInstanceSummary, StackSetRequestTypeDef
 from cfct.utils.retry_decorator import try_except_retry
 
+# StackSets managed by CfCT, discovered once per run
+_managed_stack_set_names: Optional[List[str]] = None
+_managed_stack_set_names_lock = threading.Lock()
+
 
 class StackSet(Boto3Session):
     DEPLOYED_BY_CFCT_TAG = {
@@ -40,6 +52,9 @@ class StackSet(Boto3Session):
         self.max_concurrent_percent = int(os.environ.get("MAX_CONCURRENT_PERCENT", 100))
         self.failed_tolerance_percent = int(os.environ.get("FAILED_TOLERANCE_PERCENT", 10))
         self.region_concurrency_type = os.environ.get("REGION_CONCURRENCY_TYPE", "PARALLEL").upper()
+        # fixed: the settings above for every StackSet, adaptive: see
+        # get_operation_preferences
+        self.operation_preferences = os.environ.get("OPERATION_PREFERENCES", FIXED).lower()
         self.max_results_per_page = 100
         super().__init__(logger, __service_name, **kwargs)
         self.cfn_client = super().get_client()
@@ -82,6 +97,31 @@ class StackSet(Boto3Session):
             self.logger.log_unhandled_exception(e)
             raise
 
+    def iter_stack_instances(self, stack_set_name) -> Iterator[StackInstanceSummary]:
+        """Yields the stack instances of the StackSet, the pages are read as
+        the caller consumes the instances.
+        """
+        try:
+            paginator = self.cfn_client.get_paginator("list_stack_instances")
+            pages = paginator.paginate(
+                StackSetName=stack_set_name,
+                PaginationConfig={"PageSize": self.max_results_per_page},
+            )
+            for page in pages:
+                for summary in page.get("Summaries", []):
+                    yield StackInstanceSummary(
+                        account=summary["Account"],
+                        region=summary["Region"],
+                        status=summary.get("Status", ""),
+                        detailed_status=summary.get("StackInstanceStatus", {}).get(
+                            "DetailedStatus", ""
+                        ),
+                        drift_status=summary.get("DriftStatus", ""),
+                    )
+        except ClientError as e:
+            self.logger.log_unhandled_exception(e)
+            raise
+
     def get_accounts_and_regions_per_stack_set(self, stack_name):
         """
             List deployed stack instances for a stack set and returns the list
@@ -91,44 +131,11 @@ class StackSet(Boto3Session):
             list of accounts and regions where provided stack instances are
             deployed
         """
-        try:
-            response = self.cfn_client.list_stack_instances(
-                StackSetName=stack_name, MaxResults=self.max_results_per_page
-            )
-            stack_instance_list = response.get("Summaries", [])
-            # build the account and region list for the stack set
-            # using list(set(LIST)) to remove the duplicate values from the list
-            account_list = list(
-                set([stack_instance["Account"] for stack_instance in stack_instance_list])
-            )
-            region_list = list(
-                set([stack_instance["Region"] for stack_instance in stack_instance_list])
-            )
-            next_token = response.get("NextToken", None)
-
-            while next_token is not None:
-                self.logger.info("Next Token Returned: {}".format(next_token))
-                response = self.cfn_client.list_stack_instances(
-                    StackSetName=stack_name,
-                    MaxResults=self.max_results_per_page,
-                    NextToken=next_token,
-                )
-                stack_instance_list = response.get("Summaries", [])
-                next_token = response.get("NextToken", None)
-
-                # update account and region lists
-                additional_account_list = list(
-                    set([stack_instance["Account"] for stack_instance in stack_instance_list])
-                )
-                additional_region_list = list(
-                    set([stack_instance["Region"] for stack_instance in stack_instance_list])
-                )
-                account_list = account_list + additional_account_list
-                region_list = region_list + additional_region_list
-            return list(set(account_list)), list(set(region_list))
-        except ClientError as e:
-            self.logger.log_unhandled_exception(e)
-            raise
+        accounts, regions = set(), set()
+        for instance in self.iter_stack_instances(stack_name):
+            accounts.add(instance.account)
+            regions.add(instance.region)
+        return list(accounts), list(regions)
 
     def create_stack_set(
         self, stack_set_name, template_url, cf_params, capabilities, tag_key, tag_value
@@ -171,11 +178,9 @@ class StackSet(Boto3Session):
                 StackSetName=stack_set_name,
                 Accounts=account_list,
                 Regions=region_list,
-                OperationPreferences={
-                    "FailureTolerancePercentage": self.failed_tolerance_percent,
-                    "MaxConcurrentPercentage": self.max_concurrent_percent,
-                    "RegionConcurrencyType": self.region_concurrency_type,
-                },
+                OperationPreferences=self.get_operation_preferences(
+                    stack_set_name, account_list, region_list
+                ),
             )
             return response
         except ClientError as e:
@@ -210,11 +215,9 @@ class StackSet(Boto3Session):
                 Accounts=account_list,
                 Regions=region_list,
                 ParameterOverrides=parameters,
-                OperationPreferences={
-                    "FailureTolerancePercentage": self.failed_tolerance_percent,
-                    "MaxConcurrentPercentage": self.max_concurrent_percent,
-                    "RegionConcurrencyType": self.region_concurrency_type,
-                },
+                OperationPreferences=self.get_operation_preferences(
+                    stack_set_name, account_list, region_list
+                ),
             )
             return response
         except ClientError as e:
@@ -251,11 +254,9 @@ class StackSet(Boto3Session):
                 Accounts=account_list,
                 Regions=region_list,
                 ParameterOverrides=parameters,
-                OperationPreferences={
-                    "FailureTolerancePercentage": self.failed_tolerance_percent,
-                    "MaxConcurrentPercentage": self.max_concurrent_percent,
-                    "RegionConcurrencyType": self.region_concurrency_type,
-                },
+                OperationPreferences=self.get_operation_preferences(
+                    stack_set_name, account_list, region_list
+                ),
             )
             return response
         except ClientError as e:
@@ -290,11 +291,7 @@ class StackSet(Boto3Session):
                 Capabilities=json.loads(capabilities),
                 AdministrationRoleARN=os.environ.get("ADMINISTRATION_ROLE_ARN"),
                 ExecutionRoleName=os.environ.get("EXECUTION_ROLE_NAME"),
-                OperationPreferences={
-                    "FailureTolerancePercentage": self.failed_tolerance_percent,
-                    "MaxConcurrentPercentage": self.max_concurrent_percent,
-                    "RegionConcurrencyType": self.region_concurrency_type,
-                },
+                OperationPreferences=self.get_operation_preferences(stack_set_name),
             )
             return response
         except ClientError as e:
@@ -324,11 +321,9 @@ class StackSet(Boto3Session):
                 Accounts=account_list,
                 Regions=region_list,
                 RetainStacks=retain_condition,
-                OperationPreferences={
-                    "FailureTolerancePercentage": self.failed_tolerance_percent,
-                    "MaxConcurrentPercentage": self.max_concurrent_percent,
-                    "RegionConcurrencyType": self.region_concurrency_type,
-                },
+                OperationPreferences=self.get_operation_preferences(
+                    stack_set_name, account_list, region_list
+                ),
             )
             return response
         except ClientError as e:
@@ -361,40 +356,102 @@ class StackSet(Boto3Session):
             self.logger.log_unhandled_exception(e)
             raise
 
+    def get_operation_preferences(
+        self, stack_set_name, account_list=None, region_list=None
+    ) -> Dict[str, Any]:
+        """Returns the operation preferences of a StackSet operation. With
+        OPERATION_PREFERENCES=adaptive, they are picked from the number of
+        accounts of the operation (the accounts of the stack instances if
+        no account list is given) and the last ADAPTIVE_OPERATION_HISTORY
+        (default 5) operations of the StackSet.
+        """
+        if self.operation_preferences == FIXED:
+            return fixed_operation_preferences(
+                self.max_concurrent_percent,
+                self.failed_tolerance_percent,
+                self.region_concurrency_type,
+            )
+        elif self.operation_preferences != ADAPTIVE:
+            raise ValueError("Invalid operation preferences: {}".format(self.operation_preferences))
+
+        if account_list is None or region_list is None:
+            accounts, regions = self.get_accounts_and_regions_per_stack_set(stack_set_name)
+            account_list = account_list if account_list is not None else accounts
+            region_list = region_list if region_list is not None else regions
+        response = self.list_stack_set_operations(
+            StackSetName=stack_set_name,
+            MaxResults=int(os.environ.get("ADAPTIVE_OPERATION_HISTORY", 5)),
+        )
+        preferences = adaptive_operation_preferences(
+            len(set(account_list)),
+            list(region_list),
+            (response or {}).get("Summaries", []),
+            self.max_concurrent_percent,
+            self.failed_tolerance_percent,
+            self.region_concurrency_type,
+            os.environ.get("AWS_REGION"),
+        )
+        self.logger.info(
+            "Operation preferences of StackSet {}: {}".format(stack_set_name, preferences)
+        )
+        return preferences
+
+    def _describe_managed_stack_set_candidate(
+        self, stack_set_name: str
+    ) -> Optional[Dict[str, Any]]:
+        try:
+            return self.cfn_client.describe_stack_set(StackSetName=stack_set_name)
+        except ClientError as error:
+            if error.response["Error"]["Code"] == "StackSetNotFoundException":
+                return None
+            raise
+
     def _filter_managed_stack_set_names(self, list_stackset_response: Dict[str, Any]) -> List[str]:
         """
-        Reduces a list of given stackset summaries to only those considered managed by CfCT
+        Reduces a list of given stackset summaries to only those considered managed by CfCT.
+        Only the StackSets with the CfCT prefix are described, MAX_CONCURRENT_STACK_SET_DESCRIBES
+        at a time.
         """
-        managed_stack_set_names: List[str] = []
-        for summary in list_stackset_response["Summaries"]:
-            stack_set_name = summary["StackSetName"]
-            try:
-                response: Dict[str, Any] = self.cfn_client.describe_stack_set(
-                    StackSetName=stack_set_name
-                )
-            except ClientError as error:
-                if error.response["Error"]["Code"] == "StackSetNotFoundException":
-                    continue
-                raise
+        candidates = [
+            summary["StackSetName"]
+            for summary in list_stackset_response["Summaries"]
+            if summary["StackSetName"].startswith(StackSet.CFCT_STACK_SET_PREFIX)
+        ]
+        if not candidates:
+            return []
 
-            if self.is_managed_by_cfct(describe_stackset_response=response):
-                managed_stack_set_names.append(stack_set_name)
+        max_workers = min(
+            int(os.environ.get("MAX_CONCURRENT_STACK_SET_DESCRIBES", 5)), len(candidates)
+        )
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            responses = list(executor.map(self._describe_managed_stack_set_candidate, candidates))
 
-        return managed_stack_set_names
+        return [
+            stack_set_name
+            for stack_set_name, response in zip(candidates, responses)
+            if response is not None and self.is_managed_by_cfct(describe_stackset_response=response)
+        ]
 
     def get_managed_stack_set_names(self) -> List[str]:
         """
         Discovers all StackSets prefixed with 'CustomControlTower-' and that
-        have the tag {Key: AWS_Solutions, Value: CustomControlTowerStackSet}
+        have the tag {Key: AWS_Solutions, Value: CustomControlTowerStackSet}.
+        The StackSets are discovered once per run.
         """
-
-        managed_stackset_names: List[str] = []
-        paginator = self.cfn_client.get_paginator("list_stack_sets")
-        for page in paginator.paginate(Status="ACTIVE"):
-            managed_stackset_names.extend(
-                self._filter_managed_stack_set_names(list_stackset_response=page)
-            )
-        return managed_stackset_names
+        global _managed_stack_set_names
+        with _managed_stack_set_names_lock:
+            if _managed_stack_set_names is None:
+                managed_stackset_names: List[str] = []
+                paginator = self.cfn_client.get_paginator("list_stack_sets")
+                for page in paginator.paginate(Status="ACTIVE"):
+                    managed_stackset_names.extend(
+                        self._filter_managed_stack_set_names(list_stackset_response=page)
+                    )
+                self.logger.info(
+                    "Found {} StackSet(s) managed by CfCT".format(len(managed_stackset_names))
+                )
+                _managed_stack_set_names = managed_stackset_names
+            return list(_managed_stack_set_names)
 
     def is_managed_by_cfct(self, describe_stackset_response: Dict[str, Any]) -> bool:
         """
@@ -427,7 +484,7 @@ class StackSet(Boto3Session):
     ) -> List[StackSetRequestTypeDef]:
         requests: List[StackSetRequestTypeDef] = []
         for stackset_name in stacksets_to_delete:
-            deployed_instances = self._get_stackset_instances(stackset_name=stackset_name)
+            account_list, region_list = self.get_accounts_and_regions_per_stack_set(stackset_name)
             requests.append(
                 StackSetRequestTypeDef(
                     RequestType="Delete",
@@ -436,8 +493,8 @@ class StackSet(Boto3Session):
                         TemplateURL="DeleteStackSetNoopURL",
                         Capabilities=json.dumps(["CAPABILITY_NAMED_IAM", "CAPABILITY_AUTO_EXPAND"]),
                         Parameters={},
-                        AccountList=list({instance["account"] for instance in deployed_instances}),
-                        RegionList=list({instance["region"] for instance in deployed_instances}),
+                        AccountList=account_list,
+                        RegionList=region_list,
                         SSMParameters={},
                     ),
                     SkipUpdateStackSet="yes",
@@ -445,20 +502,6 @@ class StackSet(Boto3Session):
             )
         return requests
 
-    def _get_stackset_instances(self, stackset_name: str) -> List[StackSetInstanceTypeDef]:
-        instance_regions_and_accounts: List[StackSetInstanceTypeDef] = []
-        paginator = self.cfn_client.get_paginator("list_stack_instances")
-        for page in paginator.paginate(StackSetName=stackset_name):
-            for summary in page["Summaries"]:
-                instance_regions_and_accounts.append(
-                    StackSetInstanceTypeDef(
-                        account=summary["Account"],
-                        region=summary["Region"],
-                    )
-                )
-
-        return instance_regions_and_accounts
-
 
 class Stacks(Boto3Session):
     def __init__(self, logger, region, **kwargs):
@@ -18,7 +18,7 @@
 from botocore.exceptions import ClientError
 
 from cfct.aws.utils.boto3_session import Boto3Session
-from cfct.utils.retry_decorator import try_except_retry
+from cfct.utils.retry_decorator import is_retryable_error, retry_on_throttling, try_except_retry
 
 
 class Organizations(Boto3Session):
@@ -36,6 +36,7 @@ class Organizations(Boto3Session):
         except ClientError as e:
             self.logger.log_unhandled_exception(e)
 
+    @retry_on_throttling()
     def list_organizational_units_for_parent(self, parent_id):
         try:
             response = self.org_client.list_organizational_units_for_parent(ParentId=parent_id)
@@ -54,9 +55,11 @@ class Organizations(Boto3Session):
 
             return ou_list
         except ClientError as e:
-            self.logger.log_unhandled_exception(e)
+            if not is_retryable_error(e):
+                self.logger.log_unhandled_exception(e)
             raise
 
+    @retry_on_throttling()
     def list_accounts_for_parent(self, parent_id):
         try:
             response = self.org_client.list_accounts_for_parent(ParentId=parent_id)
@@ -75,7 +78,8 @@ class Organizations(Boto3Session):
 
             return account_list
         except ClientError as e:
-            self.logger.log_unhandled_exception(e)
+            if not is_retryable_error(e):
+                self.logger.log_unhandled_exception(e)
             raise
 
     def list_accounts(self, **kwargs):
@@ -28,7 +28,16 @@ class S3(Boto3Session):
         __service_name = "s3"
         super().__init__(logger, __service_name, **kwargs)
         self.s3_client = super().get_client()
-        self.s3_resource = super().get_resource()
+        self._s3_resource = None
+
+    @property
+    def s3_resource(self):
+        """The resource is only used for managed transfers, it is created on
+        first use
+        """
+        if self._s3_resource is None:
+            self._s3_resource = super().get_resource()
+        return self._s3_resource
 
     def get_bucket_policy(self, bucket_name):
         try:
@@ -119,3 +128,58 @@ class S3(Boto3Session):
         except ClientError as e:
             self.logger.log_unhandled_exception(e)
             raise
+
+    def get_object(self, bucket_name, key_name, if_none_match=None):
+        """This function returns the S3 object, unless it does not exist or
+        its ETag matches if_none_match.
+
+        :param bucket_name:
+        :param key_name:
+        :param if_none_match: ETag of the copy held by the caller
+        :return: get_object response, None if the object is not found or
+                 not modified
+        """
+        try:
+            kwargs = {"IfNoneMatch": if_none_match} if if_none_match else {}
+            return self.s3_client.get_object(Bucket=bucket_name, Key=key_name, **kwargs)
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "304":
+                self.logger.info("{}/{} is not modified".format(bucket_name, key_name))
+                return None
+            elif e.response["Error"]["Code"] == "NoSuchKey":
+                self.logger.info("{}/{} does not exist".format(bucket_name, key_name))
+                return None
+            else:
+                self.logger.log_unhandled_exception(e)
+                raise
+
+    def put_object(self, bucket_name, key_name, body):
+        """This function uploads the content to the S3 bucket
+
+        :param bucket_name:
+        :param key_name:
+        :param body: bytes or string
+        :return: ETag of the new object
+        """
+        try:
+            response = self.s3_client.put_object(Bucket=bucket_name, Key=key_name, Body=body)
+            return response["ETag"]
+        except ClientError as e:
+            self.logger.log_unhandled_exception(e)
+            raise
+
+    def object_exists(self, bucket_name, key_name):
+        """This function checks whether the object exists, without reading it
+
+        :param bucket_name:
+        :param key_name:
+        :return: boolean
+        """
+        try:
+            self.s3_client.head_object(Bucket=bucket_name, Key=key_name)
+            return True
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                return False
+            self.logger.log_unhandled_exception(e)
+            raise
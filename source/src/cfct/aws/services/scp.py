@@ -21,6 +21,10 @@ from typing import List
 from botocore.exceptions import ClientError
 
 from cfct.aws.utils.boto3_session import Boto3Session
+from cfct.utils.retry_decorator import is_retryable_error, retry_on_throttling
+
+# the policy attachments of a target are updated one at a time
+RETRY_ERROR_CODES = ["ConcurrentModificationException"]
 
 
 class ServiceControlPolicy(Boto3Session):
@@ -79,6 +83,14 @@ class ServiceControlPolicy(Boto3Session):
             self.logger.log_unhandled_exception(e)
             raise
 
+    def describe_policy(self, policy_id):
+        try:
+            response = self.org_client.describe_policy(PolicyId=policy_id)
+            return response
+        except ClientError as e:
+            self.logger.log_unhandled_exception(e)
+            raise
+
     def update_policy(self, policy_id, name, description, content):
         try:
             response = self.org_client.update_policy(
@@ -96,6 +108,7 @@ class ServiceControlPolicy(Boto3Session):
             self.logger.log_unhandled_exception(e)
             raise
 
+    @retry_on_throttling(error_codes=RETRY_ERROR_CODES)
     def attach_policy(self, policy_id, target_id):
         try:
             self.org_client.attach_policy(PolicyId=policy_id, TargetId=target_id)
@@ -108,9 +121,11 @@ class ServiceControlPolicy(Boto3Session):
                 )
                 return
             else:
-                self.logger.log_unhandled_exception(e)
+                if not is_retryable_error(e, RETRY_ERROR_CODES):
+                    self.logger.log_unhandled_exception(e)
                 raise
 
+    @retry_on_throttling(error_codes=RETRY_ERROR_CODES)
     def detach_policy(self, policy_id, target_id):
         try:
             self.org_client.detach_policy(PolicyId=policy_id, TargetId=target_id)
@@ -121,7 +136,8 @@ class ServiceControlPolicy(Boto3Session):
                 )
                 return
             else:
-                self.logger.log_unhandled_exception(e)
+                if not is_retryable_error(e, RETRY_ERROR_CODES):
+                    self.logger.log_unhandled_exception(e)
                 raise
 
     def enable_policy_type(self, root_id, wait_time_sec=5) -> None:
@@ -90,6 +90,24 @@ class SSM(Boto3Session):
             self.logger.log_unhandled_exception(e)
             raise
 
+    def get_parameters(self, names):
+        """Returns the values of the SSM parameters, fetched in batches of
+        10 names (GetParameters limit). Names that are not found are not
+        included in the returned dict.
+        """
+        values = {}
+        try:
+            for index in range(0, len(names), 10):
+                response = self.ssm_client.get_parameters(
+                    Names=names[index : index + 10], WithDecryption=True
+                )
+                for parameter in response.get("Parameters", []):
+                    values[parameter["Name"] + parameter.get("Selector", "")] = parameter["Value"]
+            return values
+        except ClientError as e:
+            self.logger.log_unhandled_exception(e)
+            raise
+
     def delete_parameter(self, name):
         try:
             response = self.ssm_client.delete_parameter(
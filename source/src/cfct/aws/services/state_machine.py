@@ -62,3 +62,26 @@ class StateMachine(Boto3Session):
         except ClientError as e:
             self.logger.log_unhandled_exception(e)
             raise
+
+    def describe_execution(self, execution_arn) -> dict:
+        try:
+            return self.state_machine_client.describe_execution(executionArn=execution_arn)
+        except ClientError as e:
+            self.logger.log_unhandled_exception(e)
+            raise
+
+    def list_running_execution_arns(self, state_machine_arn) -> set:
+        """Returns the ARNs of all the RUNNING executions of a state machine,
+        1000 per API call.
+        """
+        try:
+            paginator = self.state_machine_client.get_paginator("list_executions")
+            pages = paginator.paginate(
+                stateMachineArn=state_machine_arn,
+                statusFilter="RUNNING",
+                PaginationConfig={"PageSize": 1000},
+            )
+            return {execution["executionArn"] for page in pages for execution in page["executions"]}
+        except ClientError as e:
+            self.logger.log_unhandled_exception(e)
+            raise
@@ -15,27 +15,105 @@
 
 # !/bin/python
 
+import threading
+from concurrent.futures import Future
+from datetime import datetime, timedelta, timezone
 from os import environ
 
 from boto3.session import Session
 from botocore.exceptions import ClientError
 
-from cfct.aws.utils.boto3_session import Boto3Session
+from cfct.aws.utils.boto3_session import CREDENTIALS_EXPIRY_MARGIN, Boto3Session
 
 
 class AssumeRole(object):
+    """Returns the temporary credentials of the execution role in the given
+    account. The credentials are cached by the process-wide credential
+    broker.
+    """
+
     def __call__(self, logger, account):
+        try:
+            return _credential_broker.get_credentials(
+                logger, account, environ["EXECUTION_ROLE_NAME"]
+            )
+        except ClientError as e:
+            logger.log_unhandled_exception(e)
+            raise
+
+
+class CredentialBroker:
+    """This class caches the AssumeRole credentials per (account, role name).
+
+    Credentials are returned from the cache while they are valid for more
+    than refresh_before. Below that, they are refreshed in the background
+    and the cached credentials are returned until they are within
+    expire_before of their expiration (the client pool evicts the clients
+    built from them at that point). Concurrent requests for the same
+    (account, role name) share a single AssumeRole call.
+
+    Example:
+        credentials = _credential_broker.get_credentials(logger, account, role_name)
+    """
+
+    def __init__(
+        self,
+        refresh_before=timedelta(seconds=450),
+        expire_before=CREDENTIALS_EXPIRY_MARGIN,
+    ):
+        self.refresh_before = refresh_before
+        self.expire_before = expire_before
+        self.lock = threading.Lock()
+        self.credentials = {}
+        self.pending = {}
+
+    def get_credentials(self, logger, account, role_name):
+        key = (account, role_name)
+        with self.lock:
+            credentials = self.credentials.get(key)
+            if credentials is not None:
+                remaining = credentials["Expiration"] - datetime.now(timezone.utc)
+                if remaining > self.refresh_before:
+                    return credentials
+                if remaining > self.expire_before:
+                    self._refresh(logger, key)
+                    return credentials
+            future = self._refresh(logger, key)
+        return future.result()
+
+    def _refresh(self, logger, key):
+        """Starts an AssumeRole call for the key, unless one is already
+        running. Must be called with the lock held.
+        """
+        future = self.pending.get(key)
+        if future is None:
+            future = Future()
+            self.pending[key] = future
+            threading.Thread(
+                target=self._assume_role, args=(logger, key, future), daemon=True
+            ).start()
+        return future
+
+    def _assume_role(self, logger, key, future):
+        account, role_name = key
         try:
             sts = STS(logger)
-            # assume role
             session_name = "custom-control-tower-session"
             partition = sts.sts_client.meta.partition
-            role_arn = f"arn:{partition}:iam::{account}:role/{environ['EXECUTION_ROLE_NAME']}"
+            role_arn = f"arn:{partition}:iam::{account}:role/{role_name}"
             credentials = sts.assume_role(role_arn, session_name)
-            return credentials
-        except ClientError as e:
-            logger.log_unhandled_exception(e)
-            raise
+        except Exception as e:
+            with self.lock:
+                self.pending.pop(key, None)
+            future.set_exception(e)
+            return
+        with self.lock:
+            self.credentials[key] = credentials
+            self.pending.pop(key, None)
+        future.set_result(credentials)
+
+
+_credential_broker = CredentialBroker()
 
 
 class STS(Boto3Session):
@@ -13,12 +13,40 @@
 #  governing permissions  and limitations under the License.                 #
 ##############################################################################
 
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
 from os import getenv
 
 # !/bin/python
 import boto3
 from botocore.config import Config
 
+# boto3's default session is not thread-safe, so clients and resources
+# built from concurrent threads are created one at a time.
+_default_session_lock = threading.Lock()
+
+# clients are thread-safe, they are shared by all the wrappers of the
+# process. key: (service, region, endpoint, credentials fingerprint),
+# value: (client, expiration of the credentials or None)
+_client_pool = {}
+# clients are evicted this long before their credentials expire
+CREDENTIALS_EXPIRY_MARGIN = timedelta(minutes=5)
+
+
+def _get_credentials_fingerprint(credentials):
+    if credentials is None:
+        return None
+    key = credentials.get("AccessKeyId", "") + credentials.get("SessionToken", "")
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def _evict_expired_clients():
+    now = datetime.now(timezone.utc)
+    for key, (_, expiration) in list(_client_pool.items()):
+        if expiration is not None and expiration - CREDENTIALS_EXPIRY_MARGIN <= now:
+            del _client_pool[key]
+
 
 class Boto3Session:
     """This class initialize boto3 client for a given AWS service name.
@@ -62,10 +90,36 @@ class Boto3Session:
         )
 
     def get_client(self):
-        """Creates a boto3 low-level service client by name.
+        """Returns a boto3 low-level service client by name. The client is
+        created on first use and then reused from the process-wide pool
+        until its credentials are about to expire.
 
         Returns: service client, type: Object
         """
+        key = (
+            self.service_name,
+            self.region,
+            self.endpoint_url,
+            _get_credentials_fingerprint(self.credentials),
+        )
+        with _default_session_lock:
+            _evict_expired_clients()
+            if key not in _client_pool:
+                _client_pool[key] = (self._create_client(), self._get_credentials_expiration())
+            return _client_pool[key][0]
+
+    def _get_credentials_expiration(self):
+        if self.credentials is None:
+            # the default credentials provider refreshes the credentials
+            return None
+        expiration = self.credentials.get("Expiration")
+        if isinstance(expiration, str):
+            expiration = datetime.fromisoformat(expiration.replace("Z", "+00:00"))
+        if isinstance(expiration, datetime) and expiration.tzinfo is None:
+            expiration = expiration.replace(tzinfo=timezone.utc)
+        return expiration if isinstance(expiration, datetime) else None
+
+    def _create_client(self):
         if self.credentials is None:
             if self.endpoint_url is None:
                 return boto3.client(
@@ -98,10 +152,15 @@ class Boto3Session:
                 )
 
     def get_resource(self):
-        """Creates a boto3 resource service client object by name
+        """Creates a boto3 resource service client object by name. Resources
+        are not thread-safe, they are not pooled.
 
         Returns: resource service client, type: Object
         """
+        with _default_session_lock:
+            return self._create_resource()
+
+    def _create_resource(self):
         if self.credentials is None:
             if self.endpoint_url is None:
                 return boto3.resource(
@@ -0,0 +1,108 @@
+###############################################################################
+#  Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.    #
+#                                                                             #
+#  Licensed under the Apache License, Version 2.0 (the "License").            #
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at                                        #
+#                                                                             #
+#      http://www.apache.org/licenses/LICENSE-2.0                             #
+#                                                                             #
+#  or in the "license" file accompanying this file. This file is distributed  #
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, express #
+#  or implied. See the License for the specific language governing permissions#
+#  and limitations under the License.                                         #
+###############################################################################
+
+import math
+import os
+from typing import Any, Dict, List, Optional
+
+FIXED = "fixed"
+ADAPTIVE = "adaptive"
+
+
+def fixed_operation_preferences(
+    max_concurrent_percent: int, failed_tolerance_percent: int, region_concurrency_type: str
+) -> Dict[str, Any]:
+    """Returns the operation preferences set by the MAX_CONCURRENT_PERCENT,
+    FAILED_TOLERANCE_PERCENT and REGION_CONCURRENCY_TYPE environment
+    variables, applied to every StackSet
+    """
+    return {
+        "FailureTolerancePercentage": failed_tolerance_percent,
+        "MaxConcurrentPercentage": max_concurrent_percent,
+        "RegionConcurrencyType": region_concurrency_type,
+    }
+
+
+def adaptive_operation_preferences(
+    account_count: int,
+    region_list: List[str],
+    recent_operations: List[Dict[str, Any]],
+    max_concurrent_percent: int,
+    failed_tolerance_percent: int,
+    region_concurrency_type: str = "PARALLEL",
+    home_region: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Returns the operation preferences of a StackSet operation, based on
+    the number of accounts it targets and the recent operations of the
+    StackSet (ListStackSetOperations summaries):
+
+    - up to ADAPTIVE_SMALL_FLEET_SIZE (default 10) accounts: all the
+      accounts at once, the operation stops at the first failure
+    - recent failed or stopped operations: half of MAX_CONCURRENT_PERCENT,
+      no failure tolerance, one region at a time, home region first
+    - recent operations longer than ADAPTIVE_SLOW_OPERATION_SECONDS
+      (default 1800) and none failed: twice MAX_CONCURRENT_PERCENT (at
+      most 100) of the accounts, with the FAILED_TOLERANCE_PERCENT
+      tolerance
+    - otherwise: MAX_CONCURRENT_PERCENT and FAILED_TOLERANCE_PERCENT of
+      the accounts
+
+    Unless a recent operation failed, the regions are deployed with the
+    REGION_CONCURRENCY_TYPE.
+
+    The counts are computed from the percentages with the
+    SOFT_FAILURE_TOLERANCE concurrency mode, so that the concurrency is not
+    capped by the failure tolerance.
+    """
+    account_count = max(account_count, 1)
+    if account_count <= int(os.environ.get("ADAPTIVE_SMALL_FLEET_SIZE", 10)):
+        return {
+            "ConcurrencyMode": "SOFT_FAILURE_TOLERANCE",
+            "MaxConcurrentCount": account_count,
+            "FailureToleranceCount": 0,
+            "RegionConcurrencyType": region_concurrency_type,
+        }
+
+    healthy = not any(
+        operation.get("Status") in ("FAILED", "STOPPED") for operation in recent_operations
+    )
+    durations = [
+        (operation["EndTimestamp"] - operation["CreationTimestamp"]).total_seconds()
+        for operation in recent_operations
+        if operation.get("EndTimestamp") and operation.get("CreationTimestamp")
+    ]
+    concurrent_percent = max_concurrent_percent
+    tolerance_percent = failed_tolerance_percent
+    if not healthy:
+        concurrent_percent = max(max_concurrent_percent // 2, 1)
+        tolerance_percent = 0
+    elif durations and max(durations) > int(
+        os.environ.get("ADAPTIVE_SLOW_OPERATION_SECONDS", 1800)
+    ):
+        concurrent_percent = min(max_concurrent_percent * 2, 100)
+
+    preferences = {
+        "ConcurrencyMode": "SOFT_FAILURE_TOLERANCE",
+        "MaxConcurrentCount": max(math.ceil(account_count * concurrent_percent / 100), 1),
+        "FailureToleranceCount": math.floor(account_count * tolerance_percent / 100),
+    }
+    if healthy:
+        preferences["RegionConcurrencyType"] = region_concurrency_type
+    elif len(region_list) < 2:
+        preferences["RegionConcurrencyType"] = "PARALLEL"
+    else:
+        preferences["RegionConcurrencyType"] = "SEQUENTIAL"
+        preferences["RegionOrder"] = sorted(region_list, key=lambda region: region != home_region)
+    return preferences
@@ -0,0 +1,137 @@
+###############################################################################
+#  Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.    #
+#                                                                             #
+#  Licensed under the Apache License, Version 2.0 (the "License").            #
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at                                        #
+#                                                                             #
+#      http://www.apache.org/licenses/LICENSE-2.0                             #
+#                                                                             #
+#  or in the "license" file accompanying this file. This file is distributed  #
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, express #
+#  or implied. See the License for the specific language governing permissions#
+#  and limitations under the License.                                         #
+###############################################################################
+
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+_policy_index_caches: Dict[str, "PolicyIndexCache"] = {}
+_policy_index_caches_lock = threading.Lock()
+
+
+def get_policy_content_hash(content: str) -> str:
+    """Returns the SHA-256 digest of the policy content"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def build_policy_index(policy_service, described_names=()) -> Dict[str, Dict[str, str]]:
+    """Lists the policies once and returns {name: {"Id": id, "Arn": arn,
+    "Description": description, "ContentHash": digest}}. The content of the
+    policies in described_names is read with DescribePolicy, ListPolicies
+    does not return it. The ContentHash of the other policies is None.
+
+    :param policy_service: ServiceControlPolicy or ResourceControlPolicy
+    :param described_names: names of the policies to hash
+    """
+    index = {}
+    for page in policy_service.list_policies():
+        for policy in page.get("Policies"):
+            index[policy.get("Name")] = {
+                "Id": policy.get("Id"),
+                "Arn": policy.get("Arn"),
+                "Description": policy.get("Description"),
+                "ContentHash": None,
+            }
+    for name in set(described_names).intersection(index):
+        response = policy_service.describe_policy(index[name]["Id"])
+        content = response.get("Policy").get("Content")
+        index[name]["ContentHash"] = get_policy_content_hash(content)
+    return index
+
+
+def is_policy_unchanged(policy: Optional[Dict[str, str]], description: str, content: str) -> bool:
+    """Returns True if the indexed policy already has the description and
+    the content, the policy is not updated then
+    """
+    return (
+        policy is not None
+        and policy.get("ContentHash") == get_policy_content_hash(content)
+        and policy.get("Description") == description
+    )
+
+
+def add_policy_index(logger, sm_input_list: list, policy_service) -> None:
+    """Adds the 'PolicyIndex' key to the SCP or RCP state machine inputs,
+    with the entries of the policies each execution looks up. The policy
+    managed by the execution is always present, its entry is None if the
+    policy does not exist yet. The entries of the managed policies have a
+    ContentHash.
+    """
+    if not sm_input_list:
+        return
+    managed_policy_names = [
+        sm_input.get("ResourceProperties").get("PolicyDocument", {}).get("Name")
+        for sm_input in sm_input_list
+    ]
+    index = build_policy_index(policy_service, managed_policy_names)
+    logger.info("Indexed {} policies".format(len(index)))
+    for sm_input in sm_input_list:
+        resource_properties = sm_input.get("ResourceProperties")
+        policy_index = {
+            name: index[name] for name in resource_properties.get("PolicyList", []) if name in index
+        }
+        policy_name = resource_properties.get("PolicyDocument", {}).get("Name")
+        if policy_name:
+            policy_index[policy_name] = index.get(policy_name)
+        sm_input.update({"PolicyIndex": policy_index})
+
+
+def get_policy_index_cache(policy_type: str) -> "PolicyIndexCache":
+    """Returns the index cache of the policy type, shared by the
+    invocations of the same Lambda execution environment
+    """
+    with _policy_index_caches_lock:
+        if policy_type not in _policy_index_caches:
+            _policy_index_caches[policy_type] = PolicyIndexCache(
+                int(os.environ.get("POLICY_INDEX_TTL", 60))
+            )
+        return _policy_index_caches[policy_type]
+
+
+class PolicyIndexCache:
+    """This class caches the policy index for ttl seconds. A policy that is
+    not found in the cached index is looked up again in a new listing, it
+    may have been created by another state machine execution.
+
+    Example:
+        cache = get_policy_index_cache("SERVICE_CONTROL_POLICY")
+        policy = cache.get(SCP(logger), "policy-name")
+        if policy:
+            print(policy["Id"], policy["Arn"])
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.index: Dict[str, Dict[str, str]] = {}
+        self.built_at = None
+
+    def get(self, policy_service, policy_name: str) -> Optional[Dict[str, str]]:
+        with self.lock:
+            expired = self.built_at is None or time.monotonic() - self.built_at > self.ttl
+            if expired or policy_name not in self.index:
+                self.index = build_policy_index(policy_service)
+                self.built_at = time.monotonic()
+            return self.index.get(policy_name)
+
+    def put(self, policy_name: str, policy: Dict[str, str]) -> None:
+        with self.lock:
+            self.index[policy_name] = policy
+
+    def remove(self, policy_name: str) -> None:
+        with self.lock:
+            self.index.pop(policy_name, None)
@@ -40,8 +40,8 @@ def cloudformation(event, function_name):
         response = stack_set.describe_stack_set_operation()
     elif function_name == "list_stack_instances":
         response = stack_set.list_stack_instances()
-    elif function_name == "list_stack_instances_account_ids":
-        response = stack_set.list_stack_instances_account_ids()
+    elif function_name == "list_remaining_stack_instances":
+        response = stack_set.list_remaining_stack_instances()
     elif function_name == "create_stack_set":
         response = stack_set.create_stack_set()
     elif function_name == "create_stack_instances":
@@ -108,6 +108,8 @@ def service_control_policy(event, function_name):
         response = scp.attach_policy()
     elif function_name == "detach_policy":
         response = scp.detach_policy()
+    elif function_name == "apply_policy_attachments":
+        response = scp.apply_policy_attachments()
     elif function_name == "detach_policy_from_all_accounts":
         response = scp.detach_policy_from_all_accounts()
     elif function_name == "enable_policy_type":
@@ -204,6 +206,8 @@ def resource_control_policy(event, function_name):
         response = rcp.attach_policy()
     elif function_name == "detach_policy":
         response = rcp.detach_policy()
+    elif function_name == "apply_policy_attachments":
+        response = rcp.apply_policy_attachments()
     elif function_name == "detach_policy_from_all_accounts":
         response = rcp.detach_policy_from_all_accounts()
     elif function_name == "enable_policy_type":
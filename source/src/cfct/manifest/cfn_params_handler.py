@@ -14,16 +14,27 @@
 ###############################################################################
 
 import random
+import threading
 import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from os import environ
+from typing import Dict, List
 
 from cfct.aws.services.ec2 import EC2
 from cfct.aws.services.kms import KMS
 from cfct.aws.services.ssm import SSM
 from cfct.aws.services.sts import AssumeRole
+from cfct.manifest.ssm_parameter_cache import get_ssm_parameter_cache
 from cfct.utils.password_generator import random_pwd_generator
 from cfct.utils.string_manipulation import sanitize, trim_string_from_front
 
+# AZ names of the regions, listed once per run as they do not vary by
+# parameter
+_availability_zones: Dict[str, List[str]] = {}
+_availability_zones_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+_availability_zones_lock = threading.Lock()
+
 
 class CFNParamsHandler(object):
     """This class goes through the cfn parameters passed by users to
@@ -36,8 +47,12 @@ class CFNParamsHandler(object):
     def __init__(self, logger):
         self.logger = logger
         self.ssm = SSM(self.logger)
+        self.ssm_parameter_cache = get_ssm_parameter_cache(self.logger)
         self.kms = KMS(self.logger)
         self.assume_role = AssumeRole()
+        # values of the alfred_genaz and alfred_genkeypair helpers resolved
+        # by prefetch_alfred, by (helper, SSM parameter name)
+        self.alfred_values: Dict[tuple, str] = {}
 
     def _session(self, region, account_id=None):
         # instantiate EC2 session
@@ -52,7 +67,7 @@ class CFNParamsHandler(object):
             )
 
     def _get_ssm_params(self, ssm_parm_name):
-        return self.ssm.get_parameter(ssm_parm_name)
+        return self.ssm_parameter_cache.get(ssm_parm_name)
 
     def _get_kms_key_id(self):
         alias_name = environ.get("KMS_KEY_ALIAS_NAME")
@@ -80,24 +95,33 @@ class CFNParamsHandler(object):
             if existing_param:
                 self.logger.info("Found existing SSM parameter, returning" " existing AZ list.")
                 return self.ssm.get_parameter(key_az)
-        if account is not None:
-            # fetch account from list for cross account assume role workflow
-            # the account id is arbitrary in this case as we need to get the
-            # AZ list for a given region in any account.
-            acct = account[0] if isinstance(account, list) else account
-            ec2 = self._session(region, acct)
-            self.logger.info(
-                "Getting list of AZs in region: {} from" " account: {}".format(region, acct)
-            )
-            return self._get_az(ec2, key_az, qty)
-        else:
-            self.logger.info("Creating EC2 Session in {} region".format(region))
-            ec2 = EC2(self.logger, region)
-            return self._get_az(ec2, key_az, qty)
+        # fetch account from list for cross account assume role workflow
+        # the account id is arbitrary in this case as we need to get the
+        # AZ list for a given region in any account.
+        acct = account[0] if isinstance(account, list) else account
+        return self._get_az(region, acct, key_az, qty)
+
+    def _get_region_azs(self, region, account=None):
+        """Returns the available AZ names of the region, described once per
+        run"""
+        with _availability_zones_lock:
+            region_lock = _availability_zones_locks[region]
+        with region_lock:
+            if region not in _availability_zones:
+                if account is not None:
+                    self.logger.info(
+                        "Getting list of AZs in region: {} from"
+                        " account: {}".format(region, account)
+                    )
+                else:
+                    self.logger.info("Creating EC2 Session in {} region".format(region))
+                ec2 = self._session(region, account)
+                _availability_zones[region] = ec2.describe_availability_zones()
+            return _availability_zones[region]
 
-    def _get_az(self, ec2, key_az, qty):
+    def _get_az(self, region, account, key_az, qty):
         # Get AZs
-        az_list = ec2.describe_availability_zones()
+        az_list = self._get_region_azs(region, account)
         self.logger.info("_get_azs output: %s" % az_list)
         random_az_list = ",".join(random.sample(az_list, qty))
         description = "Contains random AZs selected by Custom Control Tower" "Solution"
@@ -209,6 +233,71 @@ class CFNParamsHandler(object):
                 self.ssm.put_parameter_use_cmk(key_password, password, key_id, description)
         return response
 
+    def prefetch_alfred(self, requests):
+        """Resolves the alfred_genaz and alfred_genkeypair helpers of all the
+        parameters before they are updated, MAX_CONCURRENT_ALFRED_REQUESTS
+        at a time. The helpers that store their value in an SSM parameter
+        are resolved once per parameter name, in the order of the requests,
+        the other ones only have the AZs of their region listed.
+
+        Args:
+            requests: iterable of (params_in, account, region), the arguments
+                      of the update_params calls that will follow
+        """
+        tasks = {}
+        for params_in, account, region in requests:
+            for param in params_in:
+                value = param.get("ParameterValue")
+                if not isinstance(value, str):
+                    continue
+                for nested_value in [x.strip() for x in value.split(",")]:
+                    if not (nested_value.startswith("$[") and nested_value.endswith("]")):
+                        continue
+                    keyword = nested_value[2:-1]
+                    if keyword.startswith("alfred_genaz_"):
+                        no_of_az, az_param_name = self._get_genaz_args(keyword, param)
+                        if az_param_name:
+                            key = ("genaz", az_param_name)
+                            args = (region, no_of_az, account, az_param_name)
+                            func = self.get_azs_from_member_account
+                        else:
+                            if not account:
+                                # no account to list the AZs from, left to
+                                # update_params
+                                continue
+                            acct = account[0] if isinstance(account, list) else account
+                            key = ("azs", region)
+                            args = (region, acct)
+                            func = self._get_region_azs
+                    elif keyword.startswith("alfred_genkeypair"):
+                        ssm_names = self._get_genkeypair_args(param)
+                        if not ssm_names[2]:
+                            # a new key pair is created by each update
+                            continue
+                        key = ("genkeypair", ssm_names[2])
+                        args = (account, region) + ssm_names
+                        func = self._create_key_pair
+                    else:
+                        continue
+                    if key not in tasks and key not in self.alfred_values:
+                        tasks[key] = (func, args)
+        if not tasks:
+            return
+
+        max_workers = int(environ.get("MAX_CONCURRENT_ALFRED_REQUESTS", 5))
+        start_time = time.monotonic()
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(tasks))) as executor:
+            futures = {key: executor.submit(func, *args) for key, (func, args) in tasks.items()}
+            for key, future in futures.items():
+                value = future.result()
+                if key[0] != "azs":
+                    self.alfred_values[key] = value
+        self.logger.info(
+            "Prefetched {} alfred helper value(s) in {:.1f} seconds".format(
+                len(tasks), time.monotonic() - start_time
+            )
+        )
+
     def update_params(self, params_in: list, account=None, region=None, substitute_ssm_values=True):
         """Updates SSM parameters
         Args:
@@ -338,6 +427,16 @@ class CFNParamsHandler(object):
         Return:
             ec2 key pair name
         """
+        ssm_names = self._get_genkeypair_args(param)
+        if ("genkeypair", ssm_names[2]) in self.alfred_values:
+            return self.alfred_values[("genkeypair", ssm_names[2])]
+        value = self._create_key_pair(account, region, *ssm_names)
+        return value
+
+    @staticmethod
+    def _get_genkeypair_args(param):
+        """Returns the SSM parameter names of the key material, fingerprint
+        and name of an 'alfred_genkeypair' parameter"""
         keymaterial_param_name = None
         keyfingerprint_param_name = None
         keyname_param_name = None
@@ -351,14 +450,7 @@ class CFNParamsHandler(object):
                     keyfingerprint_param_name = ssm_parameter.get("name")
                 elif val.lower() == "keyname":
                     keyname_param_name = ssm_parameter.get("name")
-        value = self._create_key_pair(
-            account,
-            region,
-            keymaterial_param_name,
-            keyfingerprint_param_name,
-            keyname_param_name,
-        )
-        return value
+        return keymaterial_param_name, keyfingerprint_param_name, keyname_param_name
 
     def _update_alfred_genpass(self, keyword, param):
         """Creates a random password if SSM parameter name starts with
@@ -402,6 +494,16 @@ class CFNParamsHandler(object):
         Return:
             list of random az's
         """
+        no_of_az, az_param_name = self._get_genaz_args(keyword, param)
+        if ("genaz", az_param_name) in self.alfred_values:
+            return self.alfred_values[("genaz", az_param_name)]
+        value = self.get_azs_from_member_account(region, no_of_az, account, az_param_name)
+        return value
+
+    @staticmethod
+    def _get_genaz_args(keyword, param):
+        """Returns the number of AZs and the SSM parameter name of an
+        'alfred_genaz' parameter"""
         sub_string = trim_string_from_front(keyword, "alfred_genaz_")
         if sub_string:
             no_of_az = int(sub_string)
@@ -415,5 +517,4 @@ class CFNParamsHandler(object):
                 val = ssm_parameter.get("value")[2:-1]
                 if val.lower() == "az":
                     az_param_name = ssm_parameter.get("name")
-        value = self.get_azs_from_member_account(region, no_of_az, account, az_param_name)
-        return value
+        return no_of_az, az_param_name
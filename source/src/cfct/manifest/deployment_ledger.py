@@ -0,0 +1,236 @@
+###############################################################################
+#  Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.    #
+#                                                                             #
+#  Licensed under the Apache License, Version 2.0 (the "License").            #
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at                                        #
+#                                                                             #
+#      http://www.apache.org/licenses/LICENSE-2.0                             #
+#                                                                             #
+#  or in the "license" file accompanying this file. This file is distributed  #
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, express #
+#  or implied. See the License for the specific language governing permissions#
+#  and limitations under the License.                                         #
+###############################################################################
+
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from botocore.exceptions import ClientError
+
+from cfct.aws.services.s3 import S3
+from cfct.manifest.json_cache import CACHE_KEY_PREFIX
+from cfct.manifest.shards import get_shard_file_name
+from cfct.manifest.template_digest import get_digest
+
+LEDGER_FILE_NAME = "deployment_ledger.json"
+
+
+def get_deployment_ledger(logger):
+    """Returns the deployment ledger selected by the DEPLOYMENT_LEDGER
+    environment variable:
+
+    s3: JSON document in the staging bucket, shared by pipeline runs
+    local: JSON file in CACHE_FOLDER
+    not set: the ledger is disabled, every resource is compared with the
+             deployed StackSet
+
+    Each shard of a sharded deployment has its own ledger (see
+    get_shard_file_name).
+
+    DEPLOYMENT_LEDGER_VERIFY_OPERATION=true also checks that the last
+    operation of an up to date StackSet is still the recorded one, for
+    StackSets that are deployed outside of the pipeline.
+    """
+    backend = os.environ.get("DEPLOYMENT_LEDGER", "").lower()
+    ttl = os.environ.get("DEPLOYMENT_LEDGER_TTL", 86400)
+    verify_operation = (
+        os.environ.get("DEPLOYMENT_LEDGER_VERIFY_OPERATION", "false").lower() == "true"
+    )
+    if backend == "s3":
+        return DeploymentLedger(
+            logger,
+            S3LedgerBackend(logger, os.environ.get("STAGING_BUCKET")),
+            ttl,
+            verify_operation,
+        )
+    elif backend == "local":
+        return DeploymentLedger(logger, LocalLedgerBackend(logger), ttl, verify_operation)
+    elif backend:
+        raise ValueError("Invalid deployment ledger backend: {}".format(backend))
+    return None
+
+
+def get_parameters_digest(parameters) -> str:
+    """Returns the digest of the resolved parameters, in
+    [{'ParameterKey': name, 'ParameterValue': value}] or {name: value} form
+    """
+    return get_digest(json.dumps(parameters, sort_keys=True, default=str))
+
+
+class LocalLedgerBackend:
+    def __init__(self, logger):
+        self.logger = logger
+        self.local_file = os.path.join(
+            os.environ.get("CACHE_FOLDER", tempfile.gettempdir()),
+            CACHE_KEY_PREFIX,
+            get_shard_file_name(LEDGER_FILE_NAME),
+        )
+
+    def load(self) -> dict:
+        if not os.path.exists(self.local_file):
+            return {}
+        with open(self.local_file, "r") as ledger_file:
+            return json.load(ledger_file)
+
+    def save(self, records: dict) -> None:
+        os.makedirs(os.path.dirname(self.local_file), exist_ok=True)
+        with open(self.local_file, "w") as ledger_file:
+            json.dump(records, ledger_file, indent=2)
+
+
+class S3LedgerBackend:
+    def __init__(self, logger, bucket_name):
+        self.logger = logger
+        self.bucket_name = bucket_name
+        self.key_name = "{}/{}".format(CACHE_KEY_PREFIX, get_shard_file_name(LEDGER_FILE_NAME))
+        self.s3 = S3(logger)
+
+    def load(self) -> dict:
+        response = self.s3.get_object(self.bucket_name, self.key_name)
+        if response is None:
+            return {}
+        return json.loads(response["Body"].read())
+
+    def save(self, records: dict) -> None:
+        self.s3.put_object(self.bucket_name, self.key_name, json.dumps(records, indent=2))
+
+
+class DeploymentLedger:
+    """This class records, for each StackSet, the inputs of its last
+    successful deployment:
+
+    {"<stack set name>": {"TemplateDigest": "<sha256>",
+                          "ParametersDigest": "<sha256>",
+                          "AccountList": [...], "RegionList": [...],
+                          "OperationId": "<last successful operation id>",
+                          "RecordedAt": <epoch seconds>}}
+
+    A StackSet whose inputs match its record is up to date, it is not
+    described nor compared with the deployed StackSet and no CloudFormation
+    API is called. Records older than ttl seconds are ignored, so that
+    changes made outside of the pipeline are eventually detected. With
+    verify_operation, an up to date StackSet must also have the recorded
+    operation as its last operation (see get_operation_id), which costs one
+    ListStackSetOperations call per StackSet.
+
+    Ledger errors are logged and never raised, the StackSets are compared
+    with the deployed StackSets instead.
+
+    Example:
+        ledger = get_deployment_ledger(logger)
+        record = ledger.build_record(template_digest, parameters, accounts, regions)
+        if not ledger.is_up_to_date(stack_set_name, record) or (
+            ledger.verify_operation
+            and ledger.get_operation_id(stack_set_name) != last_operation_id
+        ):
+            ...
+            ledger.record(stack_set_name, record, operation_id)
+        ledger.save()
+    """
+
+    def __init__(self, logger, backend, ttl=86400, verify_operation=False):
+        self.logger = logger
+        self.backend = backend
+        self.ttl = int(ttl)
+        self.verify_operation = verify_operation
+        self.lock = threading.Lock()
+        self.modified = False
+        self._records = None
+
+    @property
+    def records(self) -> dict:
+        """The records are loaded on first use, stages that never consult
+        the ledger do not read it
+        """
+        if self._records is None:
+            try:
+                self._records = self.backend.load()
+            except (ClientError, OSError, ValueError) as e:
+                self.logger.warning("Unable to load the deployment ledger: {}".format(e))
+                self._records = {}
+        return self._records
+
+    @staticmethod
+    def build_record(template_digest: str, parameters, account_list, region_list) -> dict:
+        return {
+            "TemplateDigest": template_digest,
+            "ParametersDigest": get_parameters_digest(parameters),
+            "AccountList": sorted(set(account_list)),
+            "RegionList": sorted(set(region_list)),
+        }
+
+    def is_up_to_date(self, stack_set_name: str, record: dict) -> bool:
+        """Returns True if the StackSet was deployed successfully with the
+        same template, parameters, accounts and regions
+        """
+        with self.lock:
+            previous = self.records.get(stack_set_name)
+        if previous is None:
+            return False
+        if time.time() - previous.get("RecordedAt", 0) > self.ttl:
+            self.logger.info("Deployment ledger record of {} expired".format(stack_set_name))
+            return False
+        changed = [key for key, value in record.items() if previous.get(key) != value]
+        if changed:
+            self.logger.info(
+                "Deployment ledger: {} changed since operation {}: {}".format(
+                    stack_set_name, previous["OperationId"], changed
+                )
+            )
+            return False
+        return True
+
+    def get_operation_id(self, stack_set_name: str) -> Optional[str]:
+        """Returns the id of the last successful operation recorded for the
+        StackSet
+        """
+        with self.lock:
+            return self.records.get(stack_set_name, {}).get("OperationId")
+
+    def record(self, stack_set_name: str, record: dict, operation_id: Optional[str]) -> None:
+        with self.lock:
+            self.records[stack_set_name] = dict(
+                record, OperationId=operation_id, RecordedAt=time.time()
+            )
+            self.modified = True
+
+    def remove(self, stack_set_name: str) -> None:
+        with self.lock:
+            if self.records.pop(stack_set_name, None) is not None:
+                self.modified = True
+
+    def retain(self, stack_set_names) -> None:
+        """Removes the records of the StackSets that are not in
+        stack_set_names, e.g. StackSets deployed by another shard
+        """
+        stack_set_names = set(stack_set_names)
+        with self.lock:
+            for stack_set_name in list(self.records):
+                if stack_set_name not in stack_set_names:
+                    del self.records[stack_set_name]
+                    self.modified = True
+
+    def save(self) -> None:
+        with self.lock:
+            if not self.modified or self._records is None:
+                return
+            try:
+                self.backend.save(self.records)
+                self.modified = False
+            except (ClientError, OSError) as e:
+                self.logger.warning("Unable to save the deployment ledger: {}".format(e))
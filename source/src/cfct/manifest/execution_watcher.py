@@ -0,0 +1,132 @@
+##############################################################################
+#  Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.   #
+#                                                                            #
+#  Licensed under the Apache License, Version 2.0 (the "License").           #
+#  You may not use this file except in compliance                            #
+#  with the License. A copy of the License is located at                     #
+#                                                                            #
+#      http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                            #
+#  or in the "license" file accompanying this file. This file is             #
+#  distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  #
+#  KIND, express or implied. See the License for the specific language       #
+#  governing permissions  and limitations under the License.                 #
+##############################################################################
+
+import time
+from typing import Dict, List, Tuple
+
+
+def get_state_machine_arn(execution_arn: str) -> str:
+    """Builds the state machine ARN from an execution ARN
+    arn:aws:states:region:account:execution:state-machine-name:execution-name
+    """
+    arn_parts = execution_arn.split(":")
+    return ":".join(arn_parts[:5] + ["stateMachine", arn_parts[6]])
+
+
+class ExecutionWatcher:
+    """This class watches a set of state machine executions until they
+    complete. All outstanding executions are checked in a single pass
+    (one ListExecutions call per state machine, plus one DescribeExecution
+    call for each execution that is no longer running). The wait between two
+    passes starts at min_wait_time and doubles, up to max_wait_time, for as
+    long as no execution completes.
+
+    Example:
+        watcher = ExecutionWatcher(logger, state_machine, max_wait_time=30)
+        watcher.add(execution_arn)
+        status, failed_executions = watcher.wait(fail_fast=True)
+    """
+
+    def __init__(self, logger, state_machine, min_wait_time=5, max_wait_time=60, multiplier=2):
+        self.logger = logger
+        self.state_machine = state_machine
+        self.max_wait_time = max(int(max_wait_time), 1)
+        self.min_wait_time = min(int(min_wait_time), self.max_wait_time)
+        self.multiplier = multiplier
+        self.outstanding: List[str] = []
+        self.statuses: Dict[str, str] = {}
+        self.durations: Dict[str, float] = {}
+        self._added_at: Dict[str, float] = {}
+
+    def add(self, execution_arn: str) -> None:
+        self.outstanding.append(execution_arn)
+        self._added_at[execution_arn] = time.monotonic()
+
+    def poll(self) -> List[str]:
+        """Checks all outstanding executions once.
+
+        :return: list of execution ARNs that completed since the last poll
+        """
+        if len(self.outstanding) > 1:
+            running = set()
+            for state_machine_arn in {get_state_machine_arn(arn) for arn in self.outstanding}:
+                running.update(self.state_machine.list_running_execution_arns(state_machine_arn))
+            candidates = [arn for arn in self.outstanding if arn not in running]
+        else:
+            candidates = list(self.outstanding)
+
+        completed = []
+        for execution_arn in candidates:
+            response = self.state_machine.describe_execution(execution_arn)
+            # ListExecutions is eventually consistent, an execution missing
+            # from the RUNNING list may have just started
+            if response["status"] == "RUNNING":
+                continue
+            self._complete(execution_arn, response)
+            completed.append(execution_arn)
+        return completed
+
+    def wait(self, fail_fast=False, max_outstanding=0) -> Tuple[str, List[str]]:
+        """Waits until no more than max_outstanding executions are still
+        running (every execution by default), or until the first failure is
+        observed if fail_fast is set.
+
+        :return: overall status (SUCCEEDED or FAILED) and the list of failed
+                 execution ARNs
+        """
+        wait_time = self.min_wait_time
+        while len(self.outstanding) > max_outstanding:
+            completed = self.poll()
+            if fail_fast and self.failed_executions:
+                self.logger.info(
+                    "Failure observed, not waiting for {} outstanding "
+                    "execution(s)".format(len(self.outstanding))
+                )
+                break
+            if len(self.outstanding) <= max_outstanding:
+                break
+            if completed:
+                wait_time = self.min_wait_time
+            time.sleep(wait_time)
+            wait_time = min(wait_time * self.multiplier, self.max_wait_time)
+
+        failed_executions = self.failed_executions
+        return ("FAILED" if failed_executions else "SUCCEEDED"), failed_executions
+
+    @property
+    def failed_executions(self) -> List[str]:
+        return [arn for arn, status in self.statuses.items() if status != "SUCCEEDED"]
+
+    def log_durations(self) -> None:
+        """Logs the wall time of each completed execution, longest first"""
+        for execution_arn, duration in sorted(
+            self.durations.items(), key=lambda item: item[1], reverse=True
+        ):
+            self.logger.info(
+                "Execution: {} | Status: {} | Duration: {:.0f}s".format(
+                    execution_arn, self.statuses[execution_arn], duration
+                )
+            )
+
+    def _complete(self, execution_arn, response):
+        status = "SUCCEEDED" if response["status"] == "SUCCEEDED" else "FAILED"
+        self.logger.info("State machine Execution: {} Status: {}".format(execution_arn, status))
+        self.outstanding.remove(execution_arn)
+        self.statuses[execution_arn] = status
+        if response.get("startDate") and response.get("stopDate"):
+            duration = (response["stopDate"] - response["startDate"]).total_seconds()
+        else:
+            duration = time.monotonic() - self._added_at[execution_arn]
+        self.durations[execution_arn] = duration
@@ -0,0 +1,132 @@
+###############################################################################
+#  Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.    #
+#                                                                             #
+#  Licensed under the Apache License, Version 2.0 (the "License").            #
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at                                        #
+#                                                                             #
+#      http://www.apache.org/licenses/LICENSE-2.0                             #
+#                                                                             #
+#  or in the "license" file accompanying this file. This file is distributed  #
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, express #
+#  or implied. See the License for the specific language governing permissions#
+#  and limitations under the License.                                         #
+###############################################################################
+
+import json
+import os
+import tempfile
+import time
+from typing import Optional
+
+from botocore.exceptions import ClientError
+
+from cfct.aws.services.s3 import S3
+
+CACHE_KEY_PREFIX = "_custom_ct_cache"
+
+
+class JsonCache:
+    """This class keeps a JSON document in a local file and, if a bucket is
+    given, in the S3 bucket so that it can be shared between CodeBuild
+    projects. The local copy keeps the ETag of the S3 object: it is used as
+    is while the S3 object is not modified. Entries older than ttl seconds
+    are ignored, a ttl of 0 disables the cache.
+
+    Cache errors are logged and never raised, the caller rebuilds the
+    document instead.
+
+    Example:
+        cache = JsonCache(logger, "org_snapshot/latest.json", ttl=3600,
+                          bucket_name=os.environ.get("STAGING_BUCKET"))
+        data = cache.load()
+        if data is None:
+            data = build()
+            cache.save(data)
+    """
+
+    def __init__(self, logger, name, ttl, bucket_name=None):
+        self.logger = logger
+        self.ttl = int(ttl)
+        self.bucket_name = bucket_name
+        self.key_name = "{}/{}".format(CACHE_KEY_PREFIX, name)
+        self.local_file = os.path.join(
+            os.environ.get("CACHE_FOLDER", tempfile.gettempdir()), CACHE_KEY_PREFIX, name
+        )
+        self.s3 = S3(logger) if bucket_name else None
+        self.created_at = None
+
+    def load(self) -> Optional[dict]:
+        """Returns the cached document, None if it is not found or expired"""
+        if self.ttl <= 0:
+            return None
+
+        local_copy = self._read_local_file()
+        if local_copy is not None and self._is_expired(local_copy["Entry"]):
+            local_copy = None
+
+        if self.s3 is not None:
+            etag = local_copy["ETag"] if local_copy else None
+            try:
+                response = self.s3.get_object(self.bucket_name, self.key_name, if_none_match=etag)
+            except ClientError as e:
+                self.logger.warning("Unable to read {} from S3: {}".format(self.key_name, e))
+                response = None
+            if response is not None:
+                entry = json.loads(response["Body"].read())
+                local_copy = None
+                if not self._is_expired(entry):
+                    local_copy = {"ETag": response["ETag"], "Entry": entry}
+                    self._write_local_file(local_copy)
+
+        if local_copy is None:
+            self.logger.info("No valid cache entry found for {}".format(self.key_name))
+            return None
+
+        self.created_at = local_copy["Entry"]["CreatedAt"]
+        self.logger.info(
+            "Using cache entry {} created {:.0f} seconds ago".format(
+                self.key_name, time.time() - self.created_at
+            )
+        )
+        return local_copy["Entry"]["Data"]
+
+    def save(self, data: dict) -> None:
+        """Stores the document. The creation time of the entry is kept, so
+        that updating a document does not extend its lifetime.
+        """
+        if self.ttl <= 0:
+            return
+
+        if self.created_at is None:
+            self.created_at = time.time()
+        entry = {"CreatedAt": self.created_at, "Data": data}
+
+        etag = None
+        if self.s3 is not None:
+            try:
+                etag = self.s3.put_object(self.bucket_name, self.key_name, json.dumps(entry))
+            except ClientError as e:
+                self.logger.warning("Unable to write {} to S3: {}".format(self.key_name, e))
+        self._write_local_file({"ETag": etag, "Entry": entry})
+
+    def _is_expired(self, entry) -> bool:
+        return time.time() - entry.get("CreatedAt", 0) > self.ttl
+
+    def _read_local_file(self):
+        if not os.path.exists(self.local_file):
+            return None
+        try:
+            with open(self.local_file, "r") as cache_file:
+                return json.load(cache_file)
+        except (OSError, ValueError) as e:
+            self.logger.warning("Ignoring cache file {}: {}".format(self.local_file, e))
+            return None
+
+    def _write_local_file(self, local_copy):
+        try:
+            os.makedirs(os.path.dirname(self.local_file), exist_ok=True)
+            with open(self.local_file, "w") as cache_file:
+                json.dump(local_copy, cache_file)
+        except OSError as e:
+            self.logger.warning("Unable to write cache file {}: {}".format(self.local_file, e))
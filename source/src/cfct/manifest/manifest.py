@@ -1,179 +1,192 @@
-##############################################################################
-#  Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.   #
-#                                                                            #
-#  Licensed under the Apache License, Version 2.0 (the "License").           #
-#  You may not use this file except in compliance                            #
-#  with the License. A copy of the License is located at                     #
-#                                                                            #
-#      http://www.apache.org/licenses/LICENSE-2.0                            #
-#                                                                            #
-#  or in the "license" file accompanying this file. This file is             #
-#  distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  #
-#  KIND, express or implied. See the License for the specific language       #
-#  governing permissions  and limitations under the License.                 #
-##############################################################################
-
-import yorm
-from yorm.types import AttributeDictionary, Boolean, List, String
-
-
-@yorm.attr(name=String)
-@yorm.attr(value=String)
-class SSM(AttributeDictionary):
-    def __init__(self, name, value):
-        super().__init__()
-        self.name = name
-        self.value = value
-
-
-@yorm.attr(all=SSM)
-class SSMList(List):
-    def __init__(self):
-        super().__init__()
-
-
-@yorm.attr(all=String)
-class RegionsList(List):
-    def __init__(self):
-        super().__init__()
-
-
-@yorm.attr(all=String)
-class AccountList(List):
-    def __init__(self):
-        super().__init__()
-
-
-@yorm.attr(all=String)
-class OUList(List):
-    def __init__(self):
-        super().__init__()
-
-
-@yorm.attr(parameter_key=String)
-@yorm.attr(parameter_value=String)
-class Parameter(AttributeDictionary):
-    def __init__(self, key, value):
-        super().__init__()
-        self.parameter_key = key
-        self.parameter_value = value
-
-
-@yorm.attr(all=Parameter)
-class Parameters(List):
-    def __init__(self):
-        super().__init__()
-
-
-@yorm.attr(accounts=AccountList)
-@yorm.attr(organizational_units=OUList)
-class DeployTargets(AttributeDictionary):
-    def __init__(self):
-        super().__init__()
-        self.accounts = []
-        self.organizational_units = []
-
-
-@yorm.attr(all=String)
-class ApplyToOUList(List):
-    def __init__(self):
-        super().__init__()
-
-
-@yorm.attr(name=String)
-@yorm.attr(template_file=String)
-@yorm.attr(parameter_file=String)
-@yorm.attr(deploy_method=String)
-@yorm.attr(ssm_parameters=SSMList)
-@yorm.attr(regions=RegionsList)
-@yorm.attr(deploy_to_account=AccountList)
-@yorm.attr(deploy_to_ou=OUList)
-class CfnResource(AttributeDictionary):
-    def __init__(self, name, template_file, parameter_file, deploy_method):
-        super().__init__()
-        self.name = name
-        self.template_file = template_file
-        self.parameter_file = parameter_file
-        self.deploy_method = deploy_method
-        self.deploy_to_account = []
-        self.deploy_to_ou = []
-        self.regions = []
-        self.ssm_parameters = []
-
-
-@yorm.attr(all=CfnResource)
-class CfnResourcesList(List):
-    def __init__(self):
-        super().__init__()
-
-
-@yorm.attr(name=String)
-@yorm.attr(policy_file=String)
-@yorm.attr(description=String)
-@yorm.attr(apply_to_accounts_in_ou=ApplyToOUList)
-class Policy(AttributeDictionary):
-    def __init__(self, name, policy_file, description, apply_to_accounts_in_ou):
-        super().__init__()
-        self.name = name
-        self.description = description
-        self.policy_file = policy_file
-        self.apply_to_accounts_in_ou = apply_to_accounts_in_ou
-
-
-@yorm.attr(all=Policy)
-class PolicyList(List):
-    def __init__(self):
-        super().__init__()
-
-
-@yorm.attr(name=String)
-@yorm.attr(resource_file=String)
-@yorm.attr(parameter_file=String)
-@yorm.attr(deploy_method=String)
-@yorm.attr(export_outputs=SSMList)
-@yorm.attr(regions=RegionsList)
-@yorm.attr(deployment_targets=DeployTargets)
-@yorm.attr(parameters=Parameters)
-class ResourceProps(AttributeDictionary):
-    def __init__(
-        self,
-        name,
-        resource_file,
-        parameters,
-        parameter_file,
-        deploy_method,
-        deployment_targets,
-        export_outputs,
-        regions,
-    ):
-        super().__init__()
-        self.name = name
-        self.resource_file = resource_file
-        self.parameter_file = parameter_file
-        self.parameters = parameters
-        self.deploy_method = deploy_method
-        self.deployment_targets = deployment_targets
-        self.regions = regions
-        self.export_outputs = export_outputs
-
-
-@yorm.attr(all=ResourceProps)
-class Resources(List):
-    def __init__(self):
-        super().__init__()
-
-
-@yorm.attr(region=String)
-@yorm.attr(version=String)
-@yorm.attr(enable_stack_set_deletion=Boolean)
-@yorm.attr(cloudformation_resources=CfnResourcesList)
-@yorm.attr(organization_policies=PolicyList)
-@yorm.attr(resources=Resources)
-@yorm.sync("{self.manifest_file}", auto_create=False)
-class Manifest:
+###############################################################################
+#  Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.    #
+#                                                                             #
+#  Licensed under the Apache License, Version 2.0 (the "License").            #
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at                                        #
+#                                                                             #
+#      http://www.apache.org/licenses/LICENSE-2.0                             #
+#                                                                             #
+#  or in the "license" file accompanying this file. This file is distributed  #
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, express #
+#  or implied. See the License for the specific language governing permissions#
+#  and limitations under the License.                                         #
+###############################################################################
+
+from typing import Any, Callable, Dict
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # libyaml is not available
+    from yaml import SafeLoader
+
+FALSY = ("false", "f", "no", "n", "disabled", "off", "0")
+
+
+def to_string(obj) -> str:
+    """Converts a YAML scalar to str, e.g. the manifest version (a YAML
+    date) or an account number (a YAML int). Lists are joined with ', '.
+    """
+    if isinstance(obj, str):
+        return obj
+    elif obj is True:
+        return "true"
+    elif obj is False:
+        return "false"
+    elif obj:
+        try:
+            return ", ".join(str(item) for item in obj)
+        except TypeError:
+            return str(obj)
+    return ""
+
+
+def to_boolean(obj) -> bool:
+    if isinstance(obj, str) and obj.lower().strip() in FALSY:
+        return False
+    return bool(obj)
+
+
+def to_list(obj) -> list:
+    """Converts a YAML sequence to a list, a single value or a comma
+    separated string is converted to a list of values. None items are
+    skipped.
+    """
+    if isinstance(obj, (list, tuple)):
+        items = obj
+    elif isinstance(obj, str):
+        text = obj.strip()
+        items = text.split(",") if "," in text and " " not in text else text.split()
+    elif obj is not None:
+        items = [obj]
+    else:
+        items = []
+    return [item for item in items if item is not None]
+
+
+def list_of(convert: Callable[[Any], Any]) -> Callable[[Any], list]:
+    return lambda obj: [convert(item) for item in to_list(obj)]
+
+
+class ManifestNode:
+    """Read-only node of the manifest. The declared fields (FIELDS: name to
+    converter) are always set, to their empty value if the key is missing;
+    the other keys of the YAML mapping are available as parsed. Fields can
+    be read as attributes or as keys, e.g. resource.name or resource["name"].
+    """
+
+    FIELDS: Dict[str, Callable[[Any], Any]] = {}
+    __slots__ = ("_extra",)
+
+    def __init__(self, data=None):
+        data = data if isinstance(data, dict) else {}
+        for name, convert in self.FIELDS.items():
+            object.__setattr__(self, name, convert(data.get(name)))
+        object.__setattr__(
+            self, "_extra", {key: value for key, value in data.items() if key not in self.FIELDS}
+        )
+
+    def __getattr__(self, name):
+        # only called for the keys that are not declared fields
+        try:
+            return object.__getattribute__(self, "_extra")[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        raise AttributeError("{} is read-only".format(type(self).__name__))
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def get(self, name, default=None):
+        return getattr(self, name, default)
+
+    def __repr__(self):
+        fields = ", ".join("{}={!r}".format(name, getattr(self, name)) for name in self.FIELDS)
+        return "{}({})".format(type(self).__name__, fields)
+
+
+class SSM(ManifestNode):
+    FIELDS = {"name": to_string, "value": to_string}
+    __slots__ = tuple(FIELDS)
+
+
+class Parameter(ManifestNode):
+    FIELDS = {"parameter_key": to_string, "parameter_value": to_string}
+    __slots__ = tuple(FIELDS)
+
+
+class DeployTargets(ManifestNode):
+    FIELDS = {"accounts": list_of(to_string), "organizational_units": list_of(to_string)}
+    __slots__ = tuple(FIELDS)
+
+
+class CfnResource(ManifestNode):
+    FIELDS = {
+        "name": to_string,
+        "template_file": to_string,
+        "parameter_file": to_string,
+        "deploy_method": to_string,
+        "ssm_parameters": list_of(SSM),
+        "regions": list_of(to_string),
+        "deploy_to_account": list_of(to_string),
+        "deploy_to_ou": list_of(to_string),
+    }
+    __slots__ = tuple(FIELDS)
+
+
+class Policy(ManifestNode):
+    FIELDS = {
+        "name": to_string,
+        "policy_file": to_string,
+        "description": to_string,
+        "apply_to_accounts_in_ou": list_of(to_string),
+    }
+    __slots__ = tuple(FIELDS)
+
+
+class ResourceProps(ManifestNode):
+    FIELDS = {
+        "name": to_string,
+        "resource_file": to_string,
+        "parameter_file": to_string,
+        "deploy_method": to_string,
+        "export_outputs": list_of(SSM),
+        "regions": list_of(to_string),
+        "deployment_targets": DeployTargets,
+        "parameters": list_of(Parameter),
+    }
+    __slots__ = tuple(FIELDS)
+
+
+class Manifest(ManifestNode):
+    """This class loads the manifest file once, with the libyaml loader when
+    it is available.
+
+    Example:
+        manifest = Manifest(os.environ.get("MANIFEST_FILE_PATH"))
+        for resource in manifest.resources:
+            print(resource.name, resource.deployment_targets.accounts)
+    """
+
+    FIELDS = {
+        "region": to_string,
+        "version": to_string,
+        "enable_stack_set_deletion": to_boolean,
+        "cloudformation_resources": list_of(CfnResource),
+        "organization_policies": list_of(Policy),
+        "resources": list_of(ResourceProps),
+    }
+    __slots__ = tuple(FIELDS) + ("manifest_file",)
+
     def __init__(self, manifest_file):
-        self.manifest_file = manifest_file
-        self.enable_stack_set_deletion = False
-        self.organization_policies = []
-        self.cloudformation_resources = []
-        self.resources = []
+        with open(manifest_file, "r") as content_file:
+            data = yaml.load(content_file, Loader=SafeLoader)
+        super().__init__(data)
+        object.__setattr__(self, "manifest_file", manifest_file)
@@ -15,68 +15,233 @@
 
 import json
 import os
-import sys
-from typing import Any, Dict, List
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Union
 
 from cfct.aws.services.cloudformation import StackSet
 from cfct.aws.services.organizations import Organizations
 from cfct.aws.services.s3 import S3
 from cfct.manifest.cfn_params_handler import CFNParamsHandler
+from cfct.manifest.json_cache import JsonCache
 from cfct.manifest.manifest import Manifest
+from cfct.manifest.org_snapshot import get_organization_snapshot
+from cfct.manifest.ou_tree import OUTreeIndex, split_ou_path
 from cfct.manifest.sm_input_builder import (
     InputBuilder,
     RCPResourceProperties,
     SCPResourceProperties,
     StackSetResourceProperties,
 )
-from cfct.manifest.stage_to_s3 import StageFile
+from cfct.manifest.stage_to_s3 import StageFile, stage_files, start_staging
+from cfct.manifest.template_digest import get_digest, get_template_digests
 from cfct.metrics.solution_metrics import SolutionMetrics
 from cfct.utils.logger import Logger
 from cfct.utils.parameter_manipulation import transform_params
-from cfct.utils.string_manipulation import empty_separator_handler, list_sanitizer
+from cfct.utils.read_ahead import ReadAhead
 
 VERSION_1 = "2020-01-01"
 VERSION_2 = "2021-03-15"
+COMPILED_STAGES = ("scp", "rcp", "stackset")
 
 logger = Logger(loglevel=os.getenv("LOG_LEVEL", "info"))
 
 
 def scp_manifest():
-    # determine manifest version
-    manifest = Manifest(os.environ.get("MANIFEST_FILE_PATH"))
-    if manifest.version == VERSION_1:
-        get_scp_input = SCPParser()
-        return get_scp_input.parse_scp_manifest_v1()
-    elif manifest.version == VERSION_2:
-        get_scp_input = SCPParser()
-        return get_scp_input.parse_scp_manifest_v2()
+    return get_compiled_plan("scp")["Inputs"]["scp"]
 
 
 def rcp_manifest():
-    # determine manifest version
-    manifest = Manifest(os.environ.get("MANIFEST_FILE_PATH"))
-    if manifest.version == VERSION_1:
-        get_rcp_input = RCPParser()
-        return get_rcp_input.parse_rcp_manifest_v1()
-    elif manifest.version == VERSION_2:
-        get_rcp_input = RCPParser()
-        return get_rcp_input.parse_rcp_manifest_v2()
+    return get_compiled_plan("rcp")["Inputs"]["rcp"]
 
 
 def stack_set_manifest():
+    plan = get_compiled_plan("stackset")
     # determine manifest version
-    manifest = Manifest(os.environ.get("MANIFEST_FILE_PATH"))
-    send = SolutionMetrics(logger)
-    if manifest.version == VERSION_1:
-        data = {"ManifestVersion": VERSION_1}
+    if plan["ManifestVersion"] in (VERSION_1, VERSION_2):
+        send = SolutionMetrics(logger)
+        data = {"ManifestVersion": plan["ManifestVersion"]}
         send.solution_metrics(data)
-        get_stack_set_input = StackSetParser()
-        return get_stack_set_input.parse_stack_set_manifest_v1()
-    elif manifest.version == VERSION_2:
-        data = {"ManifestVersion": VERSION_2}
+    return plan["Inputs"]["stackset"]
+
+
+def compiled_stack_set_manifest() -> list:
+    """Returns the StackSet state machine inputs of the plan stored by the
+    CompileManifest stage. The StackSet shards partition these inputs, so
+    the manifest is not parsed again by each shard.
+    """
+    plan = _load_compiled_plan("stackset")
+    if plan is None:
+        raise ValueError(
+            "No compiled plan found for the pipeline execution, the StackSet"
+            " shards require the CompileManifest stage."
+        )
+    return plan["Inputs"]["stackset"]
+
+
+def stream_stack_set_manifest() -> Union[list, Iterator[dict]]:
+    """Returns the StackSet state machine inputs. The list of inputs of the
+    compiled plan is returned if it was compiled from the same manifest,
+    otherwise an iterator yielding each input as soon as it is built, so
+    that the first executions start while the next inputs are built (up to
+    STACK_SET_INPUT_READ_AHEAD inputs ahead of the executions).
+    """
+    plan = _load_compiled_plan("stackset")
+    if plan:
+        manifest_version = plan["ManifestVersion"]
+        inputs = plan["Inputs"]["stackset"]
+    else:
+        parser = StackSetParser()
+        manifest_version = parser.manifest.version
+        iterate = {
+            VERSION_1: parser.iter_stack_set_manifest_v1,
+            VERSION_2: parser.iter_stack_set_manifest_v2,
+        }
+        inputs = []
+        if manifest_version in iterate:
+            # keep building the next inputs while the executions run
+            inputs = ReadAhead(
+                iterate[manifest_version](),
+                size=int(os.environ.get("STACK_SET_INPUT_READ_AHEAD", 5)),
+            )
+    if manifest_version in (VERSION_1, VERSION_2):
+        send = SolutionMetrics(logger)
+        data = {"ManifestVersion": manifest_version}
         send.solution_metrics(data)
-        get_stack_set_input = StackSetParser()
-        return get_stack_set_input.parse_stack_set_manifest_v2()
+    return inputs
+
+
+def compile_manifest() -> dict:
+    """Compiles the state machine inputs of all the stages in a single pass
+    and stores the compiled plan of the pipeline execution in the staging
+    bucket (CompileManifest pipeline stage).
+
+    The plan is kept for COMPILED_PLAN_TTL seconds (default 604800, the
+    longest a pipeline execution can wait for its approval stage).
+    """
+    plan = _compile_plan(COMPILED_STAGES)
+    cache = _get_compiled_plan_cache()
+    if cache is None:
+        logger.warning("PIPELINE_EXECUTION_ID is not set, the compiled plan is not stored.")
+    else:
+        cache.save(plan)
+    return plan
+
+
+def get_compiled_plan(stage_name) -> dict:
+    """Returns the compiled plan holding the state machine inputs of the
+    stage:
+
+    {"ManifestDigest": "<sha256>", "ManifestVersion": "<version>",
+     "Inputs": {"<stage name>": [<state machine input>, ...]},
+     "TemplateDigests": {"<stack set name>": {"TemplateURL", "Digest"}}}
+
+    The plan stored by compile_manifest is loaded if it was compiled from
+    the same manifest, otherwise only the inputs of the stage are compiled.
+    """
+    return _load_compiled_plan(stage_name) or _compile_plan((stage_name,))
+
+
+def _load_compiled_plan(stage_name):
+    """Returns the plan stored by compile_manifest if it holds the inputs of
+    the stage and was compiled from the same manifest, otherwise None
+    """
+    cache = _get_compiled_plan_cache()
+    if cache is not None:
+        plan = cache.load()
+        if (
+            plan
+            and plan.get("ManifestDigest") == _get_manifest_digest()
+            and stage_name in plan["Inputs"]
+        ):
+            logger.info("Using the compiled plan of the pipeline execution.")
+            get_template_digests(logger).update(plan.get("TemplateDigests", {}))
+            return plan
+    return None
+
+
+def _get_compiled_plan_cache():
+    pipeline_execution_id = os.environ.get("PIPELINE_EXECUTION_ID")
+    if not pipeline_execution_id:
+        return None
+    return JsonCache(
+        logger,
+        "compiled_plan/{}.json".format(pipeline_execution_id),
+        ttl=os.environ.get("COMPILED_PLAN_TTL", 604800),
+        bucket_name=os.environ.get("STAGING_BUCKET"),
+    )
+
+
+def _get_manifest_digest():
+    with open(os.environ.get("MANIFEST_FILE_PATH"), "rb") as manifest_file:
+        return get_digest(manifest_file.read())
+
+
+def _compile_plan(stage_names) -> dict:
+    compiler = ManifestCompiler()
+    return {
+        "ManifestDigest": _get_manifest_digest(),
+        "ManifestVersion": compiler.manifest.version,
+        "Inputs": compiler.compile(stage_names),
+        "TemplateDigests": get_template_digests(logger).digests,
+    }
+
+
+class ManifestCompiler:
+    """
+    This class parses the manifest once and builds the state machine inputs
+    of several stages, sharing the manifest, the organization data and the
+    staged files between the parsers.
+
+    Example:
+        compiler = ManifestCompiler()
+        inputs = compiler.compile(("scp", "rcp", "stackset"))
+        scp_inputs = inputs["scp"]
+    """
+
+    def __init__(self):
+        self.logger = logger
+        self.manifest = Manifest(os.environ.get("MANIFEST_FILE_PATH"))
+        self.build = BuildStateMachineInput(self.manifest.region)
+        self.org_data = OrganizationsData()
+
+    def compile(self, stage_names) -> Dict[str, list]:
+        """
+        :param stage_names: names of the stages (scp, rcp, stackset)
+        :return: key: stage name, value: list of state machine inputs
+        """
+        start_time = time.monotonic()
+        inputs = {}
+        for stage_name in stage_names:
+            if stage_name == "scp":
+                parser = SCPParser(self.manifest, self.build, self.org_data)
+                parse = {
+                    VERSION_1: parser.parse_scp_manifest_v1,
+                    VERSION_2: parser.parse_scp_manifest_v2,
+                }
+            elif stage_name == "rcp":
+                parser = RCPParser(self.manifest, self.build, self.org_data)
+                parse = {
+                    VERSION_1: parser.parse_rcp_manifest_v1,
+                    VERSION_2: parser.parse_rcp_manifest_v2,
+                }
+            elif stage_name == "stackset":
+                parser = StackSetParser(self.manifest, self.build, self.org_data)
+                parse = {
+                    VERSION_1: parser.parse_stack_set_manifest_v1,
+                    VERSION_2: parser.parse_stack_set_manifest_v2,
+                }
+            else:
+                raise ValueError("Invalid stage name: {}".format(stage_name))
+            inputs[stage_name] = (
+                parse[self.manifest.version]() if self.manifest.version in parse else []
+            )
+        self.logger.info(
+            "Compiled the inputs of {} in {:.1f} seconds".format(
+                ", ".join(stage_names), time.monotonic() - start_time
+            )
+        )
+        return inputs
 
 
 class SCPParser:
@@ -91,20 +256,22 @@ class SCPParser:
         list_of_inputs = get_scp_input.parse_scp_manifest_v1|2()
     """
 
-    def __init__(self):
+    def __init__(self, manifest=None, build=None, org_data=None):
         self.logger = logger
-        self.manifest = Manifest(os.environ.get("MANIFEST_FILE_PATH"))
+        self.manifest = manifest or Manifest(os.environ.get("MANIFEST_FILE_PATH"))
+        self.build = build or BuildStateMachineInput(self.manifest.region)
+        self.org_data = org_data or OrganizationsData()
 
     def parse_scp_manifest_v1(self) -> list:
         state_machine_inputs = []
         self.logger.info(
             "Processing SCPs from {} file".format(os.environ.get("MANIFEST_FILE_PATH"))
         )
-        build = BuildStateMachineInput(self.manifest.region)
-        org_data = OrganizationsData()
+        build = self.build
+        org_data = self.org_data
+        build.prestage(policy.policy_file for policy in self.manifest.organization_policies)
         for policy in self.manifest.organization_policies:
-            local_file = StageFile(self.logger, policy.policy_file)
-            policy_url = local_file.get_staged_file()
+            policy_url = build.get_staged_file(policy.policy_file).url
             # Generate the list of OUs to attach this SCP to
             attach_ou_list = set(policy.apply_to_accounts_in_ou)
 
@@ -117,12 +284,9 @@ class SCPParser:
 
             state_machine_inputs.append(build.scp_sm_input(final_ou_list, policy, policy_url))
 
-        # Exit if there are no organization policies
         if len(state_machine_inputs) == 0:
             self.logger.info("Organization policies not found" " in the manifest.")
-            sys.exit(0)
-        else:
-            return state_machine_inputs
+        return state_machine_inputs
 
     def parse_scp_manifest_v2(self) -> list:
         state_machine_inputs = []
@@ -131,12 +295,16 @@ class SCPParser:
                 os.environ.get("MANIFEST_FILE_PATH")
             )
         )
-        build = BuildStateMachineInput(self.manifest.region)
-        org_data = OrganizationsData()
+        build = self.build
+        org_data = self.org_data
+        build.prestage(
+            resource.resource_file
+            for resource in self.manifest.resources
+            if resource.deploy_method == "scp"
+        )
         for resource in self.manifest.resources:
             if resource.deploy_method == "scp":
-                local_file = StageFile(self.logger, resource.resource_file)
-                policy_url = local_file.get_staged_file()
+                policy_url = build.get_staged_file(resource.resource_file).url
                 attach_ou_list = set(resource.deployment_targets.organizational_units)
 
                 self.logger.debug(
@@ -150,12 +318,9 @@ class SCPParser:
 
                 state_machine_inputs.append(build.scp_sm_input(final_ou_list, resource, policy_url))
 
-        # Exit if there are no organization policies
         if len(state_machine_inputs) == 0:
             self.logger.info("Organization policies not found" " in the manifest.")
-            sys.exit(0)
-        else:
-            return state_machine_inputs
+        return state_machine_inputs
 
 
 class RCPParser:
@@ -170,13 +335,15 @@ class RCPParser:
         list_of_inputs = get_rcp_input.parse_rcp_manifest_v1|2()
     """
 
-    def __init__(self):
+    def __init__(self, manifest=None, build=None, org_data=None):
         self.logger = logger
-        self.manifest = Manifest(os.environ.get("MANIFEST_FILE_PATH"))
+        self.manifest = manifest or Manifest(os.environ.get("MANIFEST_FILE_PATH"))
+        self.build = build or BuildStateMachineInput(self.manifest.region)
+        self.org_data = org_data or OrganizationsData()
 
     def parse_rcp_manifest_v1(self) -> list:
         self.logger.info("Resource Control Policy not supported in V1")
-        sys.exit(0)
+        return []
 
     def parse_rcp_manifest_v2(self) -> list:
         state_machine_inputs = []
@@ -185,12 +352,16 @@ class RCPParser:
                 os.environ.get("MANIFEST_FILE_PATH")
             )
         )
-        build = BuildStateMachineInput(self.manifest.region)
-        org_data = OrganizationsData()
+        build = self.build
+        org_data = self.org_data
+        build.prestage(
+            resource.resource_file
+            for resource in self.manifest.resources
+            if resource.deploy_method == "rcp"
+        )
         for resource in self.manifest.resources:
             if resource.deploy_method == "rcp":
-                local_file = StageFile(self.logger, resource.resource_file)
-                policy_url = local_file.get_staged_file()
+                policy_url = build.get_staged_file(resource.resource_file).url
                 attach_ou_list = set(resource.deployment_targets.organizational_units)
 
                 self.logger.debug(
@@ -204,12 +375,9 @@ class RCPParser:
 
                 state_machine_inputs.append(build.rcp_sm_input(final_ou_list, resource, policy_url))
 
-        # Exit if there are no organization policies
         if len(state_machine_inputs) == 0:
             self.logger.info("Organization policies not found" " in the manifest.")
-            sys.exit(0)
-        else:
-            return state_machine_inputs
+        return state_machine_inputs
 
 
 class StackSetParser:
@@ -222,22 +390,40 @@ class StackSetParser:
     Example:
         get_scp_input = StackSetParser()
         list_of_inputs = get_scp_input.parse_stack_set_manifest_v1|2()
+        for sm_input in get_scp_input.iter_stack_set_manifest_v1|2():
+            ...
     """
 
-    def __init__(self):
+    def __init__(self, manifest=None, build=None, org_data=None):
         self.logger = logger
         self.stack_set = StackSet(logger)
-        self.manifest = Manifest(os.environ.get("MANIFEST_FILE_PATH"))
+        self.manifest = manifest or Manifest(os.environ.get("MANIFEST_FILE_PATH"))
         self.manifest_folder = os.environ.get("MANIFEST_FOLDER")
+        self.build = build or BuildStateMachineInput(self.manifest.region)
+        self.org_data = org_data or OrganizationsData()
 
     def parse_stack_set_manifest_v1(self) -> list:
+        return list(self.iter_stack_set_manifest_v1())
+
+    def iter_stack_set_manifest_v1(self) -> Iterator[dict]:
+        """Yields the state machine input of each resource once it is built.
+        The files are staged in the background while the accounts and the
+        parameters of the resources are resolved; nothing is yielded before
+        all the resources are resolved and staged.
+        """
         self.logger.info(
             "Parsing Core Resources from {} file".format(os.environ.get("MANIFEST_FILE_PATH"))
         )
-        build = BuildStateMachineInput(self.manifest.region)
-        org = OrganizationsData()
+        build = self.build
+        org = self.org_data
         organizations_data = org.get_organization_details()
-        state_machine_inputs = []
+        accounts_in_all_ous = set(organizations_data.get("AccountsInAllOUs"))
+        state_machine_input_count = 0
+        resource_accounts = []
+        build.prestage(
+            (resource.template_file for resource in self.manifest.cloudformation_resources),
+            wait=False,
+        )
 
         for resource in self.manifest.cloudformation_resources:
             self.logger.info(f">>>> START : {resource.name} >>>>")
@@ -245,11 +431,7 @@ class StackSetParser:
 
             # build OU to accounts map if OU list present in manifest
             if resource.deploy_to_ou:
-                accounts_in_ou = org.get_accounts_in_ou(
-                    organizations_data.get("OuIdToAccountMap"),
-                    organizations_data.get("OuNameToIdMap"),
-                    resource.deploy_to_ou,
-                )
+                accounts_in_ou = org.get_accounts_in_ou(resource.deploy_to_ou)
 
             # convert account numbers to string type
             account_list = list(map(str, resource.deploy_to_account))
@@ -258,9 +440,9 @@ class StackSetParser:
 
             sanitized_account_list = org.get_final_account_list(
                 account_list,
-                organizations_data.get("AccountsInAllOUs"),
+                accounts_in_all_ous,
                 accounts_in_ou,
-                organizations_data.get("NameToAccountMap"),
+                organizations_data.get("AccountNameIndex"),
             )
 
             self.logger.info(
@@ -268,32 +450,53 @@ class StackSetParser:
             )
             self.logger.info(sanitized_account_list)
 
-            if resource.deploy_method.lower() == "stack_set":
-                sm_input = build.stack_set_state_machine_input_v1(resource, sanitized_account_list)
-                state_machine_inputs.append(sm_input)
-            else:
+            if resource.deploy_method.lower() != "stack_set":
                 raise ValueError(
                     f"Unsupported deploy_method: {resource.deploy_method} "
                     f"found for resource {resource.name}"
                 )
+            resource_accounts.append((resource, sanitized_account_list))
             self.logger.info(f"<<<<<<<<< FINISH : {resource.name} <<<<<<<<<")
 
-        # Exit if there are no CloudFormation resources
-        if len(state_machine_inputs) == 0:
+        build.prefetch_alfred(resource_accounts, build.get_parameters_v1)
+        build.wait_for_staging()
+        for resource, sanitized_account_list in resource_accounts:
+            yield build.stack_set_state_machine_input_v1(resource, sanitized_account_list)
+            state_machine_input_count += 1
+
+        if state_machine_input_count == 0:
             self.logger.info("CloudFormation resources not found in the " "manifest")
-            sys.exit(0)
-        else:
-            return state_machine_inputs
 
     def parse_stack_set_manifest_v2(self) -> list:
+        return list(self.iter_stack_set_manifest_v2())
+
+    def iter_stack_set_manifest_v2(self) -> Iterator[dict]:
+        """Yields the delete requests of the StackSets removed from the
+        manifest first, then the state machine input of each resource once
+        it is built. The files are staged in the background while the
+        accounts and the parameters of the resources are resolved; nothing
+        is yielded before all the resources are resolved and staged, so
+        that a manifest error never leaves the StackSets half deployed.
+        """
         self.logger.info(
             "Parsing Core Resources from {} file".format(os.environ.get("MANIFEST_FILE_PATH"))
         )
-        build = BuildStateMachineInput(self.manifest.region)
-        org = OrganizationsData()
+        build = self.build
+        org = self.org_data
         organizations_data = org.get_organization_details()
+        accounts_in_all_nested_ous = set(organizations_data.get("AccountsInAllNestedOUs"))
 
-        state_machine_inputs: List[Dict[str, Any]] = []
+        state_machine_input_count = 0
+        resource_accounts = []
+        delete_requests = []
+        build.prestage(
+            (
+                resource.resource_file
+                for resource in self.manifest.resources
+                if resource.deploy_method == StackSet.DEPLOY_METHOD
+            ),
+            wait=False,
+        )
 
         if self.manifest.enable_stack_set_deletion:
             manifest_stacksets: List[str] = []
@@ -304,8 +507,8 @@ class StackSetParser:
             stacksets_to_be_deleted = self.stack_set.get_stack_sets_not_present_in_manifest(
                 manifest_stack_sets=manifest_stacksets
             )
-            state_machine_inputs.extend(
-                self.stack_set.generate_delete_request(stacksets_to_delete=stacksets_to_be_deleted)
+            delete_requests = self.stack_set.generate_delete_request(
+                stacksets_to_delete=stacksets_to_be_deleted
             )
 
         for resource in self.manifest.resources:
@@ -316,9 +519,7 @@ class StackSetParser:
                 # build OU to accounts map if OU list present in manifest
                 if resource.deployment_targets.organizational_units:
                     accounts_in_ou = org.get_accounts_in_ou(
-                        organizations_data.get("OuIdToAccountMap"),
-                        organizations_data.get("OuNameToIdMap"),
-                        resource.deployment_targets.organizational_units,
+                        resource.deployment_targets.organizational_units
                     )
 
                 # convert account numbers to string type
@@ -328,9 +529,9 @@ class StackSetParser:
 
                 sanitized_account_list = org.get_final_account_list(
                     account_list,
-                    organizations_data.get("AccountsInAllNestedOUs"),
+                    accounts_in_all_nested_ous,
                     accounts_in_ou,
-                    organizations_data.get("NameToAccountMap"),
+                    organizations_data.get("AccountNameIndex"),
                 )
 
                 self.logger.info(
@@ -339,24 +540,25 @@ class StackSetParser:
                 )
                 self.logger.info(sanitized_account_list)
 
-                if resource.deploy_method.lower() == "stack_set":
-                    sm_input = build.stack_set_state_machine_input_v2(
-                        resource, sanitized_account_list
-                    )
-                    state_machine_inputs.append(sm_input)
-                else:
+                if resource.deploy_method.lower() != "stack_set":
                     raise ValueError(
                         f"Unsupported deploy_method: {resource.deploy_method} "
                         f"found for resource {resource.name}"
                     )
+                resource_accounts.append((resource, sanitized_account_list))
                 self.logger.info(f"<<<<<<<<< FINISH : {resource.name} <<<<<<<<")
 
-        # Exit if there are no CloudFormation resources
-        if len(state_machine_inputs) == 0:
+        build.prefetch_alfred(resource_accounts, build.get_parameters_v2)
+        build.wait_for_staging()
+        for sm_input in delete_requests:
+            yield sm_input
+            state_machine_input_count += 1
+        for resource, sanitized_account_list in resource_accounts:
+            yield build.stack_set_state_machine_input_v2(resource, sanitized_account_list)
+            state_machine_input_count += 1
+
+        if state_machine_input_count == 0:
             self.logger.info("CloudFormation resources not found in the " "manifest")
-            sys.exit(0)
-        else:
-            return state_machine_inputs
 
 
 class BuildStateMachineInput:
@@ -371,6 +573,85 @@ class BuildStateMachineInput:
         self.manifest_folder = os.environ.get("MANIFEST_FOLDER")
         self.region = region
         self.s3 = S3(logger)
+        self.template_digests = get_template_digests(logger)
+        self.staged_files: Dict[str, StageFile] = {}
+        # files being staged in the background, see prestage(wait=False)
+        self.staging: Dict[str, Future] = {}
+        self.resource_parameters: Dict[str, list] = {}
+
+    def prestage(self, relative_file_paths, wait=True):
+        """Stages all the files of the manifest concurrently, before the
+        state machine inputs are built. With wait=False, the files are
+        staged in the background and get_staged_file waits for each file.
+        """
+        paths = set(relative_file_paths) - set(self.staged_files) - set(self.staging)
+        if not wait:
+            self.staging.update(start_staging(self.logger, paths))
+            return
+        start_time = time.monotonic()
+        self.staged_files.update(stage_files(self.logger, paths))
+        self.logger.info(
+            "Staged {} file(s) in {:.1f} seconds".format(len(paths), time.monotonic() - start_time)
+        )
+
+    def wait_for_staging(self) -> None:
+        """Waits for the files staged in the background, the first upload
+        error is raised
+        """
+        for relative_file_path in list(self.staging):
+            self.staged_files[relative_file_path] = self.staging.pop(relative_file_path).result()
+
+    def get_staged_file(self, relative_file_path) -> StageFile:
+        if relative_file_path in self.staging:
+            self.staged_files[relative_file_path] = self.staging.pop(relative_file_path).result()
+        if relative_file_path not in self.staged_files:
+            self.prestage([relative_file_path])
+        return self.staged_files[relative_file_path]
+
+    def prefetch_alfred(self, resource_accounts, get_parameters):
+        """Resolves the alfred_genaz and alfred_genkeypair helpers of the
+        parameters of all the resources concurrently, before the state
+        machine inputs are built
+
+        Args:
+            resource_accounts: list of (resource, account list)
+            get_parameters: get_parameters_v1 or get_parameters_v2
+        """
+        self.param_handler.prefetch_alfred(
+            (
+                get_parameters(resource),
+                account_list,
+                resource.regions[0] if len(resource.regions) > 0 else self.region,
+            )
+            for resource, account_list in resource_accounts
+        )
+
+    def get_parameters_v1(self, resource) -> list:
+        if resource.name not in self.resource_parameters:
+            # if parameter file link is provided for the CFN resource
+            if resource.parameter_file:
+                parameters = self._load_params_from_file(resource.parameter_file)
+            else:
+                parameters = []
+            self.resource_parameters[resource.name] = parameters
+        return self.resource_parameters[resource.name]
+
+    def get_parameters_v2(self, resource) -> list:
+        if resource.name not in self.resource_parameters:
+            parameters = {}
+            # if parameter file link is provided for the CFN resource
+            if resource.parameter_file == "":
+                self.logger.info("parameter_file property not found in the " "manifest")
+                self.logger.info(resource.parameter_file)
+                self.logger.info(resource.parameters)
+                parameters = self._load_params_from_manifest(resource.parameters)
+            elif not resource.parameters:
+                self.logger.info("parameters property not found in the " "manifest")
+                self.logger.info(resource.parameter_file)
+                self.logger.info(resource.parameters)
+                parameters = self._load_params_from_file(resource.parameter_file)
+            self.resource_parameters[resource.name] = parameters
+        return self.resource_parameters[resource.name]
 
     def scp_sm_input(self, attach_ou_list, policy, policy_url) -> dict:
         ou_list = []
@@ -381,7 +662,7 @@ class BuildStateMachineInput:
         resource_properties = SCPResourceProperties(
             policy.name, policy.description, policy_url, ou_list
         )
-        scp_input = InputBuilder(resource_properties.get_scp_input_map())
+        scp_input = InputBuilder(resource_properties.get_scp_input_map(), stage_name="scp")
         sm_input = scp_input.input_map()
 
         self.logger.debug("&&&&& [manifest_parser.scp_sm_input] scp_input &&&&&&")
@@ -400,7 +681,7 @@ class BuildStateMachineInput:
         resource_properties = RCPResourceProperties(
             policy.name, policy.description, policy_url, ou_list
         )
-        rcp_input = InputBuilder(resource_properties.get_rcp_input_map())
+        rcp_input = InputBuilder(resource_properties.get_rcp_input_map(), stage_name="rcp")
         sm_input = rcp_input.input_map()
 
         self.logger.debug("&&&&& [manifest_parser.rcp_sm_input] rcp_input &&&&&&")
@@ -411,8 +692,10 @@ class BuildStateMachineInput:
         return sm_input
 
     def stack_set_state_machine_input_v1(self, resource, account_list) -> dict:
-        local_file = StageFile(self.logger, resource.template_file)
-        template_url = local_file.get_staged_file()
+        local_file = self.get_staged_file(resource.template_file)
+        template_url = local_file.url
+        stack_set_name = "CustomControlTower-{}".format(resource.name)
+        self.template_digests.put(stack_set_name, template_url, local_file.digest)
 
         # set region variables
         if len(resource.regions) > 0:
@@ -422,18 +705,12 @@ class BuildStateMachineInput:
             region = self.region
             region_list = [region]
 
-        # if parameter file link is provided for the CFN resource
-        if resource.parameter_file:
-            parameters = self._load_params_from_file(resource.parameter_file)
-        else:
-            parameters = []
-
+        parameters = self.get_parameters_v1(resource)
         sm_params = self.param_handler.update_params(parameters, account_list, region, False)
 
         ssm_parameters = self._create_ssm_input_map(resource.ssm_parameters)
 
         # generate state machine input list
-        stack_set_name = "CustomControlTower-{}".format(resource.name)
         resource_properties = StackSetResourceProperties(
             stack_set_name,
             template_url,
@@ -443,14 +720,17 @@ class BuildStateMachineInput:
             region_list,
             ssm_parameters,
         )
-        ss_input = InputBuilder(resource_properties.get_stack_set_input_map())
+        ss_input = InputBuilder(
+            resource_properties.get_stack_set_input_map(), stage_name="stackset"
+        )
         return ss_input.input_map()
 
     def stack_set_state_machine_input_v2(self, resource, account_list) -> dict:
-        local_file = StageFile(self.logger, resource.resource_file)
-        template_url = local_file.get_staged_file()
+        local_file = self.get_staged_file(resource.resource_file)
+        template_url = local_file.url
+        stack_set_name = "CustomControlTower-{}".format(resource.name)
+        self.template_digests.put(stack_set_name, template_url, local_file.digest)
 
-        parameters = {}
         # set region variables
         if len(resource.regions) > 0:
             region = resource.regions[0]
@@ -459,18 +739,7 @@ class BuildStateMachineInput:
             region = self.region
             region_list = [region]
 
-        # if parameter file link is provided for the CFN resource
-        if resource.parameter_file == "":
-            self.logger.info("parameter_file property not found in the " "manifest")
-            self.logger.info(resource.parameter_file)
-            self.logger.info(resource.parameters)
-            parameters = self._load_params_from_manifest(resource.parameters)
-        elif not resource.parameters:
-            self.logger.info("parameters property not found in the " "manifest")
-            self.logger.info(resource.parameter_file)
-            self.logger.info(resource.parameters)
-            parameters = self._load_params_from_file(resource.parameter_file)
-
+        parameters = self.get_parameters_v2(resource)
         sm_params = self.param_handler.update_params(parameters, account_list, region, False)
 
         self.logger.info("Input Parameters for State Machine: {}".format(sm_params))
@@ -478,7 +747,6 @@ class BuildStateMachineInput:
         ssm_parameters = self._create_ssm_input_map(resource.export_outputs)
 
         # generate state machine input list
-        stack_set_name = "CustomControlTower-{}".format(resource.name)
         resource_properties = StackSetResourceProperties(
             stack_set_name,
             template_url,
@@ -488,7 +756,9 @@ class BuildStateMachineInput:
             region_list,
             ssm_parameters,
         )
-        ss_input = InputBuilder(resource_properties.get_stack_set_input_map())
+        ss_input = InputBuilder(
+            resource_properties.get_stack_set_input_map(), stage_name="stackset"
+        )
         return ss_input.input_map()
 
     def _load_params_from_manifest(self, parameter_list: list):
@@ -543,174 +813,188 @@ class OrganizationsData:
             if os.getenv("CONTROL_TOWER_BASELINE_CONFIG_STACKSET") is not None
             else "AWSControlTowerBP-BASELINE-CONFIG"
         )
-
-    def get_accounts_in_ou(self, ou_id_to_account_map, ou_name_to_id_map, ou_list):
-        accounts_in_ou = []
-        ou_ids_manifest = []
-        accounts_in_nested_ou = []
-
+        self.snapshot = get_organization_snapshot(logger)
+        self._org = None
+        self._ou_tree = None
+        self._account_name_index = None
+        self._ou_accounts_index = None
+        self.max_concurrent_requests = int(os.environ.get("MAX_CONCURRENT_ORG_REQUESTS", 5))
+
+    @property
+    def org(self):
+        if self._org is None:
+            self._org = Organizations(self.logger)
+        return self._org
+
+    def get_accounts_in_ou(self, ou_list):
+        """Returns the active accounts in the OUs of the manifest. 'Root'
+        stands for the accounts of the Control Tower baseline config stack
+        set, nested OUs are given as 'TestOU1:TestOU2:TestOU3'.
+        """
         if "Root" in ou_list:
             (
                 accounts_list,
                 region_list,
             ) = self.get_accounts_in_ct_baseline_config_stack_set()
-            accounts_in_ou = accounts_list
+            accounts_in_ou = set(accounts_list)
         else:
-            # convert OU Name to OU IDs
+            ou_accounts_index = self.get_ou_accounts_index()
+            accounts_in_ou = set()
             for ou_name in ou_list:
-                if ":" in ou_name:  # Process nested OU. For example: TestOU1:TestOU2:TestOU3
-                    ou_id = self.get_ou_id(ou_name, ":")
-                    accounts_in_nested_ou.extend(self.get_active_accounts_in_ou(ou_id))
-                    self.logger.debug(
-                        "[manifest_parser.get_accounts_in_ou] ou_name: {}; ou_id: {}; accounts_in_nested_ou: {}".format(
-                            ou_name, ou_id, accounts_in_nested_ou
-                        )
-                    )
+                ou_path = split_ou_path(ou_name)
+                if ou_path in ou_accounts_index:
+                    accounts_in_ou.update(ou_accounts_index[ou_path])
+                elif ":" in ou_name:  # Process nested OU. For example: TestOU1:TestOU2:TestOU3
+                    raise ValueError("OU id is not found for {}".format(ou_name))
                 else:
-                    ou_id = [value for key, value in ou_name_to_id_map.items() if ou_name == key]
-                    ou_ids_manifest.extend(ou_id)
                     self.logger.debug(
-                        "[manifest_parser.get_accounts_in_ou] ou_name: {}; ou_id: {}; ou_ids_manifest for non-nested ous: {}".format(
-                            ou_name, ou_id, ou_ids_manifest
+                        "[manifest_parser.get_accounts_in_ou] OU: {} not found, ignoring".format(
+                            ou_name
                         )
                     )
 
-            for ou_id, accounts in ou_id_to_account_map.items():
-                if ou_id in ou_ids_manifest:
-                    accounts_in_ou.extend(accounts)
-
-            self.logger.debug(
-                "[manifest_parser.get_accounts_in_ou] Accounts in non_nested OUs: {}".format(
-                    accounts_in_ou
-                )
-            )
-
-            self.logger.debug(
-                "[manifest_parser.get_accounts_in_ou] Accounts in nested OUs: {}".format(
-                    accounts_in_nested_ou
-                )
-            )
-
-            # add accounts for nested ous
-            accounts_in_ou.extend(accounts_in_nested_ou)
-
+        accounts_in_ou = sorted(accounts_in_ou)
         self.logger.info(">>> Accounts: {} in OUs: {}".format(accounts_in_ou, ou_list))
 
         return accounts_in_ou
 
     def get_final_account_list(
-        self, account_list, accounts_in_all_ous, accounts_in_ou, name_to_account_map
+        self, account_list, accounts_in_all_ous, accounts_in_ou, account_name_index
     ):
-        # separate account id and emails
-        name_list = []
-        new_account_list = []
-        self.logger.info(account_list)
+        """Merges the accounts of the manifest with the accounts in the OUs of
+        the manifest.
+
+        :param account_list: account ids and account names (case insensitive)
+        :param accounts_in_all_ous: set of valid account ids, the other
+                                    account ids of account_list are ignored
+        :param accounts_in_ou: accounts in the OUs of the manifest
+        :param account_name_index: see get_account_name_index
+        :return: sorted list of account ids
+        """
+        manifest_account_ids = set()
         for item in account_list:
             # if an actual account ID
             if item.isdigit() and len(item) == 12:
-                new_account_list.append(item)
-                self.logger.info(new_account_list)
+                manifest_account_ids.add(item)
             else:
-                name_list.append(item)
-                self.logger.info(name_list)
-        # check if name list is empty
-        if name_list:
-            # convert OU Name to OU IDs
-            for name in name_list:
-                name_account = [
-                    value
-                    for key, value in name_to_account_map.items()
-                    if name.lower() == key.lower()
-                ]
-                self.logger.info(f"==== name_account: {name_account}")
-                self.logger.info("%%%%%%% Name {} -  Account {}".format(name, name_account))
-                new_account_list.extend(name_account)
+                name_account = account_name_index.get(item.lower(), set())
+                self.logger.info("%%%%%%% Name {} -  Account {}".format(item, sorted(name_account)))
+                manifest_account_ids.update(name_account)
         # Remove account ids from the manifest that is not
         # in the organization or not active
-        sanitized_account_list = list(set(new_account_list).intersection(set(accounts_in_all_ous)))
+        sanitized_account_ids = manifest_account_ids.intersection(accounts_in_all_ous)
         self.logger.info("Print Updated Manifest Account List")
-        self.logger.info(sanitized_account_list)
+        self.logger.info(sorted(sanitized_account_ids))
         # merge account lists manifest account list and
-        # accounts under OUs in the manifest
-        sanitized_account_list.extend(accounts_in_ou)
-        # remove duplicate accounts
-        return list(set(sanitized_account_list))
+        # accounts under OUs in the manifest, without duplicates
+        return sorted(sanitized_account_ids.union(accounts_in_ou))
 
     def get_organization_details(self) -> dict:
         """
         Return:
             dict with following properties:
-            accounts_in_all_ous: list. Active accounts
-            ou_id_to_account_map: dictionary. Accounts for each OU at the root
-                                  level
-            ou_name_to_id_map: dictionary. OU Name to OU ID mapping
-            name_to_account_map: dictionary. account names in manifest to
-                                 account ID mapping
+            AccountsInAllOUs: list. Active accounts in the OUs at the root
+                              level
+            AccountsInAllNestedOUs: list. Active accounts in all the OUs
+                                    (including nested OUs) and master account
+            AccountNameIndex: dictionary. lower case account name to account
+                              ids (see get_account_name_index)
         """
 
-        # Returns 1) OU Name to OU ID mapping (dict)
-        # key: OU Name (in the manifest); value: OU ID (at root level)
-        # 2) all OU IDs under root (dict)
-        org = Organizations(self.logger)
-        all_ou_ids, ou_name_to_id_map = self._get_ou_ids(org)
+        # Returns all OU IDs under root
+        all_ou_ids, ou_name_to_id_map = self._get_ou_ids()
 
-        # Returns 1) active accounts (list) under an OU.
+        # Returns active accounts (list) in the OUs at the root level.
         # use case: used to validate accounts in the manifest file
-        # 2) Accounts for each OU at the root level.
-        # use case: map OU Name to account IDs
-        # key: OU ID (str); value: Active accounts (list)
-        accounts_in_all_ous, ou_id_to_account_map = self._get_accounts_in_ou(org, all_ou_ids)
-
-        # Returns account name in manifest to account id mapping.
-        # key: account name; value: account id
-        name_to_account_map, active_account_list = self.get_account_for_name(org)
+        accounts_by_parent = self._get_accounts_by_parent()
+        accounts_in_all_ous = []
+        for ou_id in all_ou_ids:
+            accounts_in_all_ous.extend(accounts_by_parent.get(ou_id, []))
 
         # Get all accounts in all ous/nested ous and master account
         accounts_in_all_nested_ous = self.get_all_accounts_in_all_nested_ous()
 
+        # Returns lower case account name to account ids index.
+        account_name_index = self.get_account_name_index()
+
         return {
             "AccountsInAllOUs": accounts_in_all_ous,
-            "OuIdToAccountMap": ou_id_to_account_map,
-            "OuNameToIdMap": ou_name_to_id_map,
-            "NameToAccountMap": name_to_account_map,
-            "ActiveAccountsForRoot": active_account_list,
             "AccountsInAllNestedOUs": accounts_in_all_nested_ous,
+            "AccountNameIndex": account_name_index,
         }
 
-    def _get_ou_ids(self, org):
-        """Get list of accounts under each OU
-        :param
-        org: Organization service client
+    def _get_ou_ids(self):
+        """Get the OUs at the root level
         return:
         _all_ou_ids: OU IDs of the OUs in the Organization at the root level
-        _ou_name_to_id_map: Account name to account id mapping
+        _ou_name_to_id_map: OU name to OU id mapping
         """
-
-        # get root id
-        root_id = self._get_root_id(org)
-
-        # get OUs under the Org root
-        ou_list_at_root_level = self._list_ou_for_parent(org, root_id)
+        root_id = self._get_root_id()
 
         _ou_name_to_id_map = {}
         _all_ou_ids = []
 
-        for ou_at_root_level in ou_list_at_root_level:
+        ou_tree = self._get_ou_tree()
+        for ou_id in ou_tree.get_children(root_id):
+            ou_name = ou_tree.names[ou_id]
             # build list of all the OU IDs under Org root
-            _all_ou_ids.append(ou_at_root_level.get("Id"))
+            _all_ou_ids.append(ou_id)
             # build a list of ou id
-            _ou_name_to_id_map.update({ou_at_root_level.get("Name"): ou_at_root_level.get("Id")})
+            _ou_name_to_id_map.update({ou_name: ou_id})
 
         self.logger.info("Print OU Name to OU ID Map")
         self.logger.info(_ou_name_to_id_map)
 
         return _all_ou_ids, _ou_name_to_id_map
 
-    def _get_root_id(self, org):
-        response = org.list_roots()
+    def _get_root_id(self):
+        return self.snapshot.get("Roots", self._list_root_ids)[0]
+
+    def _list_root_ids(self):
+        response = self.org.list_roots()
         self.logger.info("Response: List Roots")
         self.logger.info(response)
-        return response["Roots"][0].get("Id")
+        return [root.get("Id") for root in response["Roots"]]
+
+    def _get_organizational_units(self):
+        """Returns all the OUs of the organization, key: OU id;
+        value: {"Name": OU name, "ParentId": parent id}
+        """
+        return self.snapshot.get("OrganizationalUnits", self._list_organizational_units)
+
+    def _list_organizational_units(self):
+        organizational_units = {}
+        parent_ids = [self._get_root_id()]
+        # breadth-first walk of the OU tree, the OUs of a level are listed
+        # concurrently
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_requests) as executor:
+            while parent_ids:
+                start_time = time.monotonic()
+                child_ids = []
+                ou_lists = list(
+                    executor.map(
+                        lambda parent_id: self._list_ou_for_parent(self.org, parent_id), parent_ids
+                    )
+                )
+                for parent_id, ou_list in zip(parent_ids, ou_lists):
+                    for ou in ou_list:
+                        organizational_units[ou.get("Id")] = {
+                            "Name": ou.get("Name"),
+                            "ParentId": parent_id,
+                        }
+                        child_ids.append(ou.get("Id"))
+                self.logger.info(
+                    "Listed the OUs under {} parent(s) in {:.1f} seconds, found {} OU(s)".format(
+                        len(parent_ids), time.monotonic() - start_time, len(child_ids)
+                    )
+                )
+                parent_ids = child_ids
+        return organizational_units
+
+    def _get_ou_tree(self):
+        if self._ou_tree is None:
+            self._ou_tree = OUTreeIndex(self._get_root_id(), self._get_organizational_units())
+        return self._ou_tree
 
     def _list_ou_for_parent(self, org, parent_id):
         _ou_list = org.list_organizational_units_for_parent(parent_id)
@@ -718,52 +1002,99 @@ class OrganizationsData:
         self.logger.info(_ou_list)
         return _ou_list
 
+    def _get_accounts_by_parent(self):
+        """Returns the active accounts directly under the root and each OU"""
+        return self.snapshot.get("AccountsByParent", self._list_accounts_by_parent)
+
+    def _list_accounts_by_parent(self):
+        parent_ids = [self._get_root_id()] + list(self._get_organizational_units())
+        accounts_in_all_ous, ou_id_to_account_map = self._get_accounts_in_ou(self.org, parent_ids)
+        return ou_id_to_account_map
+
     def _get_accounts_in_ou(self, org, ou_id_list):
-        _accounts_in_ou = []
-        accounts_in_all_ous = []
-        ou_id_to_account_map = {}
+        """Lists the active accounts under each OU, up to
+        MAX_CONCURRENT_ORG_REQUESTS OUs at a time.
 
-        for _ou_id in ou_id_list:
-            _account_list = org.list_accounts_for_parent(_ou_id)
-            for _account in _account_list:
-                # filter ACTIVE and CREATED accounts
-                if _account.get("Status") == "ACTIVE":
-                    # create a list of accounts in OU
-                    accounts_in_all_ous.append(_account.get("Id"))
-                    _accounts_in_ou.append(_account.get("Id"))
+        :param org: Organization service client, shared by all the threads
+        :param ou_id_list: list of root or OU ids
+        :return: active accounts in all the OUs (in ou_id_list order) and
+                 the OU id to active accounts mapping
+        """
+        start_time = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_requests) as executor:
+            account_lists = list(executor.map(org.list_accounts_for_parent, ou_id_list))
+        self.logger.info(
+            "Listed the accounts of {} OU(s) with up to {} concurrent requests in {:.1f} "
+            "seconds".format(
+                len(ou_id_list), self.max_concurrent_requests, time.monotonic() - start_time
+            )
+        )
 
+        accounts_in_all_ous = []
+        ou_id_to_account_map = {}
+        for _ou_id, _account_list in zip(ou_id_list, account_lists):
+            # filter ACTIVE and CREATED accounts
+            _accounts_in_ou = [
+                _account.get("Id")
+                for _account in _account_list
+                if _account.get("Status") == "ACTIVE"
+            ]
             # create a map of accounts for each ou
-            self.logger.info(
-                "Creating Key:Value Mapping - "
-                "OU ID: {} ; Account List: {}".format(_ou_id, _accounts_in_ou)
-            )
             ou_id_to_account_map.update({_ou_id: _accounts_in_ou})
-            self.logger.info(ou_id_to_account_map)
-
-            # reset list of accounts in the OU
-            _accounts_in_ou = []
+            accounts_in_all_ous.extend(_accounts_in_ou)
 
         self.logger.info("All accounts in OU List: {}".format(accounts_in_all_ous))
         self.logger.info("OU to Account ID mapping")
         self.logger.info(ou_id_to_account_map)
         return accounts_in_all_ous, ou_id_to_account_map
 
-    def get_account_for_name(self, org):
-        # get all accounts in the organization
-        account_list = org.get_accounts_in_org()
-        active_account_list = []
+    def get_account_for_name(self):
+        # get all active accounts in the organization
+        accounts = self.snapshot.get("Accounts", self._list_active_accounts)
+        active_account_list = list(accounts)
 
         _name_to_account_map = {}
-        for account in account_list:
-            if account.get("Status") == "ACTIVE":
-                active_account_list.append(account.get("Id"))
-                _name_to_account_map.update({account.get("Name"): account.get("Id")})
+        for account_id, account_name in accounts.items():
+            _name_to_account_map.update({account_name: account_id})
 
         self.logger.info("Print Account Name > Account Mapping")
         self.logger.info(_name_to_account_map)
 
         return _name_to_account_map, active_account_list
 
+    def get_account_name_index(self):
+        """Returns the account ids for each lower case account name, built
+        once from the organization snapshot. As before the index, a name of
+        the manifest resolves to the ids of all the accounts whose names only
+        differ in case, e.g. 'Dev' and 'dev'. Accounts with the very same
+        name resolve to the last one listed (see get_account_for_name).
+        """
+        if self._account_name_index is None:
+            name_to_account_map, active_account_list = self.get_account_for_name()
+            self._account_name_index = {}
+            for account_name, account_id in name_to_account_map.items():
+                self._account_name_index.setdefault(account_name.lower(), set()).add(account_id)
+        return self._account_name_index
+
+    def get_ou_accounts_index(self):
+        """Returns the active accounts directly under each OU, key: OU path
+        (see split_ou_path), built once from the organization snapshot
+        """
+        if self._ou_accounts_index is None:
+            accounts_by_parent = self._get_accounts_by_parent()
+            self._ou_accounts_index = {
+                ou_path: frozenset(accounts_by_parent.get(ou_id, []))
+                for ou_path, ou_id in self._get_ou_tree().path_to_id.items()
+            }
+        return self._ou_accounts_index
+
+    def _list_active_accounts(self):
+        return {
+            account.get("Id"): account.get("Name")
+            for account in self.org.get_accounts_in_org()
+            if account.get("Status") == "ACTIVE"
+        }
+
     def get_final_ou_list(self, ou_list):
         # Get ou id given an ou name
         final_ou_list = []
@@ -787,9 +1118,7 @@ class OrganizationsData:
         return final_ou_list
 
     def get_ou_id(self, nested_ou_name, delimiter):
-        org = Organizations(self.logger)
-        response = org.list_roots()
-        root_id = response["Roots"][0].get("Id")
+        root_id = self._get_root_id()
         self.logger.info("[manifest_parser.get_ou_id] Organizations Root Id: {}".format(root_id))
 
         if nested_ou_name == "Root":
@@ -799,84 +1128,21 @@ class OrganizationsData:
                 "[manifest_parser.get_ou_id] Looking up the OU Id for OUName: {} with nested"
                 " ou delimiter: '{}'".format(nested_ou_name, delimiter)
             )
-            ou_id = self._get_ou_id(org, root_id, nested_ou_name, delimiter)
+            ou_id = self._get_ou_tree().get_ou_id(nested_ou_name, delimiter)
             if ou_id is None or len(ou_id) == 0:
                 raise ValueError("OU id is not found for {}".format(nested_ou_name))
 
             return ou_id
 
-    def _get_ou_id(self, org, parent_id, nested_ou_name, delimiter):
-        nested_ou_name_list = empty_separator_handler(delimiter, nested_ou_name)
-        response = self.list_ou_for_parent(org, parent_id, list_sanitizer(nested_ou_name_list))
-        self.logger.info(
-            "[manifest_parser._get_ou_id] _list_ou_for_parent response: {}".format(response)
-        )
-        return response
-
-    def list_ou_for_parent(self, org, parent_id, nested_ou_name_list):
-        ou_list = org.list_organizational_units_for_parent(parent_id)
-        index = 0  # always process the first item
-
-        self.logger.debug(
-            "[manifest_parser.list_ou_id_for_parent] nested_ou_name_list: {}".format(
-                nested_ou_name_list
-            )
-        )
-        self.logger.debug(
-            "[manifest_parser.list_ou_id_for_parent] ou_list: {} for parent id {}".format(
-                ou_list, parent_id
-            )
-        )
-
-        for dictionary in ou_list:
-            self.logger.debug(
-                "[manifest_parser.list_ou_id_for_parent] dictionary:{}".format(dictionary)
-            )
-            if dictionary.get("Name") == nested_ou_name_list[index]:
-                self.logger.info(
-                    "[manifest_parser.list_ou_id_for_parent] OU Name: {} exists under parent id: {}".format(
-                        dictionary.get("Name"), parent_id
-                    )
-                )
-                # pop the first item in the list
-                nested_ou_name_list.pop(index)
-                if len(nested_ou_name_list) == 0:
-                    self.logger.info(
-                        "[manifest_parser.list_ou_id_for_parent] Returning last level OU ID: {}".format(
-                            dictionary.get("Id")
-                        )
-                    )
-                    return dictionary.get("Id")
-                else:
-                    return self.list_ou_for_parent(org, dictionary.get("Id"), nested_ou_name_list)
-
-    def get_active_accounts_in_ou(self, ou_id):
-        """
-        This function gets active accounts in an ou given an ou_id
-        """
-        org = Organizations(self.logger)
-        active_accounts_in_ou = []
-        account_list = org.list_accounts_for_parent(ou_id)
-        for account in account_list:
-            # filter ACTIVE and CREATED accounts
-            if account.get("Status") == "ACTIVE":
-                active_accounts_in_ou.append(account.get("Id"))
-
-        self.logger.info("All active accounts in nested OU %s:" % (ou_id))
-        self.logger.info(active_accounts_in_ou)
-
-        return active_accounts_in_ou
-
     def get_accounts_in_ct_baseline_config_stack_set(self):
         """
         This function gets active accounts which the control tower baseline config stackset deploys to
         """
-        (
-            accounts_list,
-            region_list,
-        ) = self.stack_set.get_accounts_and_regions_per_stack_set(
-            self.control_tower_baseline_config_stackset
+        baseline_stack_set = self.snapshot.get(
+            "BaselineStackSet", self._list_baseline_stack_set_accounts_and_regions
         )
+        accounts_list = list(baseline_stack_set["Accounts"])
+        region_list = list(baseline_stack_set["Regions"])
 
         self.logger.info(
             "[manifest_parser.get_accounts_in_ct_baseline_config_stack_set] All active accounts in control tower baseline config stackset: {}".format(
@@ -891,13 +1157,23 @@ class OrganizationsData:
 
         return accounts_list, region_list
 
+    def _list_baseline_stack_set_accounts_and_regions(self):
+        (
+            accounts_list,
+            region_list,
+        ) = self.stack_set.get_accounts_and_regions_per_stack_set(
+            self.control_tower_baseline_config_stackset
+        )
+        return {"Accounts": list(accounts_list), "Regions": list(region_list)}
+
     def get_master_account_id_in_org(self):
         """
         This function gets master account id for the organization which the user's account belongs to
         """
-        org = Organizations(self.logger)
-        response = org.describe_organization()
-        master_account_id = response["Organization"].get("MasterAccountId")
+        master_account_id = self.snapshot.get(
+            "MasterAccountId",
+            lambda: self.org.describe_organization()["Organization"].get("MasterAccountId"),
+        )
 
         self.logger.info(
             "[manifest_parser.get_master_account_id_in_org] Master account id: %s"
@@ -0,0 +1,218 @@
+###############################################################################
+#  Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.    #
+#                                                                             #
+#  Licensed under the Apache License, Version 2.0 (the "License").            #
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at                                        #
+#                                                                             #
+#      http://www.apache.org/licenses/LICENSE-2.0                             #
+#                                                                             #
+#  or in the "license" file accompanying this file. This file is distributed  #
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, express #
+#  or implied. See the License for the specific language governing permissions#
+#  and limitations under the License.                                         #
+###############################################################################
+
+import json
+import os
+import statistics
+import tempfile
+import threading
+from typing import Dict, List, Optional
+
+from botocore.exceptions import ClientError
+
+from cfct.aws.services.s3 import S3
+from cfct.manifest.json_cache import CACHE_KEY_PREFIX
+from cfct.manifest.shards import get_shard_file_name
+
+TIMINGS_FILE_NAME = "operation_timings.jsonl"
+
+
+def get_operation_timing_store(logger):
+    """Returns the operation timing store selected by the
+    OPERATION_TIMING_STORE environment variable:
+
+    s3: JSON lines object in the staging bucket, shared by pipeline runs
+    local: JSON lines file in CACHE_FOLDER
+    not set: the timings are not recorded and no ETA is predicted
+
+    Each shard of a sharded deployment has its own store (see
+    get_shard_file_name).
+    """
+    backend = os.environ.get("OPERATION_TIMING_STORE", "").lower()
+    history = os.environ.get("OPERATION_TIMING_HISTORY", 10)
+    if backend == "s3":
+        return OperationTimingStore(
+            logger, S3TimingBackend(logger, os.environ.get("STAGING_BUCKET")), history
+        )
+    elif backend == "local":
+        return OperationTimingStore(logger, LocalTimingBackend(logger), history)
+    elif backend:
+        raise ValueError("Invalid operation timing store backend: {}".format(backend))
+    return None
+
+
+def to_json_lines(records: List[dict]) -> str:
+    return "".join(json.dumps(record, sort_keys=True) + "\n" for record in records)
+
+
+def from_json_lines(content: str) -> List[dict]:
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+
+class LocalTimingBackend:
+    def __init__(self, logger):
+        self.logger = logger
+        self.local_file = os.path.join(
+            os.environ.get("CACHE_FOLDER", tempfile.gettempdir()),
+            CACHE_KEY_PREFIX,
+            get_shard_file_name(TIMINGS_FILE_NAME),
+        )
+
+    def load(self) -> List[dict]:
+        if not os.path.exists(self.local_file):
+            return []
+        with open(self.local_file, "r") as timings_file:
+            return from_json_lines(timings_file.read())
+
+    def append(self, records: List[dict], compacted: Optional[List[dict]]) -> None:
+        os.makedirs(os.path.dirname(self.local_file), exist_ok=True)
+        if compacted is not None:
+            with open(self.local_file, "w") as timings_file:
+                timings_file.write(to_json_lines(compacted))
+        else:
+            with open(self.local_file, "a") as timings_file:
+                timings_file.write(to_json_lines(records))
+
+
+class S3TimingBackend:
+    """S3 objects can not be appended to, the object is read and written
+    back with the new records. The object is never written by two workers
+    at once, the shards have their own objects.
+    """
+
+    def __init__(self, logger, bucket_name):
+        self.logger = logger
+        self.bucket_name = bucket_name
+        self.key_name = "{}/{}".format(CACHE_KEY_PREFIX, get_shard_file_name(TIMINGS_FILE_NAME))
+        self.s3 = S3(logger)
+
+    def load(self) -> List[dict]:
+        response = self.s3.get_object(self.bucket_name, self.key_name)
+        if response is None:
+            return []
+        return from_json_lines(response["Body"].read().decode("utf-8"))
+
+    def append(self, records: List[dict], compacted: Optional[List[dict]]) -> None:
+        if compacted is None:
+            compacted = self.load() + records
+        self.s3.put_object(self.bucket_name, self.key_name, to_json_lines(compacted))
+
+
+class OperationTimingStore:
+    """This class records the StackSet state machine executions, one JSON
+    line per execution:
+
+    {"StackSetName": "<name>", "RequestType": "Create" | "Update" | "Delete",
+     "Status": "SUCCEEDED" | "FAILED", "StartedAt": <epoch seconds>,
+     "EndedAt": <epoch seconds>, "Duration": <seconds>,
+     "Accounts": <account count>, "Regions": <region count>}
+
+    Only the last 'history' records of each StackSet are kept. The
+    durations of the successful executions are used to predict the
+    duration of the next ones.
+
+    Store errors are logged and never raised, no ETA is predicted instead.
+
+    Example:
+        store = get_operation_timing_store(logger)
+        eta = store.predict(stack_set_name, accounts=12, regions=2)
+        ...
+        store.record(stack_set_name, "Update", "SUCCEEDED", started_at, ended_at, 12, 2)
+        store.save()
+    """
+
+    def __init__(self, logger, backend, history=10):
+        self.logger = logger
+        self.backend = backend
+        self.history = int(history)
+        self.lock = threading.Lock()
+        self.new_records: List[dict] = []
+        self._records = None
+
+    @property
+    def records(self) -> List[dict]:
+        """The records are loaded on first use"""
+        if self._records is None:
+            try:
+                self._records = self.backend.load()
+            except (ClientError, OSError, ValueError) as e:
+                self.logger.warning("Unable to load the operation timings: {}".format(e))
+                self._records = []
+        return self._records
+
+    def record(
+        self, stack_set_name, request_type, status, started_at, ended_at, accounts, regions
+    ) -> None:
+        record = {
+            "StackSetName": stack_set_name,
+            "RequestType": request_type,
+            "Status": status,
+            "StartedAt": round(started_at, 3),
+            "EndedAt": round(ended_at, 3),
+            "Duration": round(ended_at - started_at, 3),
+            "Accounts": accounts,
+            "Regions": regions,
+        }
+        with self.lock:
+            self.records.append(record)
+            self.new_records.append(record)
+
+    def predict(self, stack_set_name, accounts, regions) -> Optional[float]:
+        """Returns the predicted duration in seconds of an execution of the
+        StackSet on accounts x regions stack instances: the median duration
+        of its successful executions, scaled by the number of instances.
+        A StackSet without history gets the median duration per instance
+        of all the StackSets. None if there is no history at all.
+        """
+        instances = max(accounts * regions, 1)
+        with self.lock:
+            succeeded = [record for record in self.records if record["Status"] == "SUCCEEDED"]
+        if not succeeded:
+            return None
+        own = [record for record in succeeded if record["StackSetName"] == stack_set_name]
+        if own:
+            own_instances = statistics.median(
+                max(record["Accounts"] * record["Regions"], 1) for record in own
+            )
+            return statistics.median(record["Duration"] for record in own) * (
+                instances / own_instances
+            )
+        return instances * statistics.median(
+            record["Duration"] / max(record["Accounts"] * record["Regions"], 1)
+            for record in succeeded
+        )
+
+    def _compact(self) -> List[dict]:
+        kept: Dict[str, List[dict]] = {}
+        for record in self.records:
+            kept.setdefault(record["StackSetName"], []).append(record)
+        compacted = [record for records in kept.values() for record in records[-self.history :]]
+        return sorted(compacted, key=lambda record: record["EndedAt"])
+
+    def save(self) -> None:
+        """Appends the new records. The store is rewritten with the last
+        records of each StackSet once it holds twice as many records.
+        """
+        with self.lock:
+            if not self.new_records:
+                return
+            compacted = self._compact()
+            if len(self.records) < 2 * len(compacted):
+                compacted = None
+            try:
+                self.backend.append(self.new_records, compacted)
+                self.new_records = []
+            except (ClientError, OSError) as e:
+                self.logger.warning("Unable to save the operation timings: {}".format(e))
@@ -0,0 +1,94 @@
+###############################################################################
+#  Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.    #
+#                                                                             #
+#  Licensed under the Apache License, Version 2.0 (the "License").            #
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at                                        #
+#                                                                             #
+#      http://www.apache.org/licenses/LICENSE-2.0                             #
+#                                                                             #
+#  or in the "license" file accompanying this file. This file is distributed  #
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, express #
+#  or implied. See the License for the specific language governing permissions#
+#  and limitations under the License.                                         #
+###############################################################################
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from cfct.manifest.json_cache import JsonCache
+
+_organization_snapshot = None
+_organization_snapshot_lock = threading.Lock()
+
+
+def get_organization_snapshot(logger):
+    """Returns the organization snapshot shared by all the parsers of the
+    current stage.
+
+    The snapshot is cached for ORG_SNAPSHOT_TTL seconds (default 3600, 0
+    disables the cache). When the PIPELINE_EXECUTION_ID environment variable
+    is set, the cache is also stored in the staging bucket, so that the SCP,
+    RCP and StackSet stages of a pipeline execution share the same snapshot.
+    """
+    global _organization_snapshot
+    with _organization_snapshot_lock:
+        if _organization_snapshot is None:
+            pipeline_execution_id = os.environ.get("PIPELINE_EXECUTION_ID")
+            cache = JsonCache(
+                logger,
+                "org_snapshot/{}.json".format(pipeline_execution_id or "local"),
+                ttl=os.environ.get("ORG_SNAPSHOT_TTL", 3600),
+                bucket_name=os.environ.get("STAGING_BUCKET") if pipeline_execution_id else None,
+            )
+            _organization_snapshot = OrganizationSnapshot(logger, cache)
+        return _organization_snapshot
+
+
+class OrganizationSnapshot:
+    """This class holds a point-in-time view of the organization, split in
+    sections that are built on first use and then saved to the cache:
+
+    Roots: list of root ids
+    OrganizationalUnits: OU id to {"Name", "ParentId"} for all nested OUs
+    AccountsByParent: root or OU id to the list of active accounts directly
+                      under it
+    Accounts: active account id to account name
+    BaselineStackSet: accounts and regions of the Control Tower baseline
+                      config stack set
+    MasterAccountId: management account id
+
+    Stages only build the sections they need, e.g. the SCP stage never lists
+    the accounts of the organization.
+
+    Example:
+        snapshot = get_organization_snapshot(logger)
+        root_ids = snapshot.get("Roots", list_root_ids)
+    """
+
+    def __init__(self, logger, cache=None):
+        self.logger = logger
+        self.cache = cache
+        self.sections: Dict[str, Any] = (cache.load() if cache else None) or {}
+        self.lock = threading.RLock()
+
+    def get(self, name: str, builder: Callable[[], Any]) -> Any:
+        """Returns the section, building it if it is not in the snapshot yet.
+
+        :param name: section name
+        :param builder: function returning the JSON serializable section
+        """
+        with self.lock:
+            if name not in self.sections:
+                start_time = time.monotonic()
+                self.sections[name] = builder()
+                self.logger.info(
+                    "Organization snapshot section {} built in {:.1f} seconds".format(
+                        name, time.monotonic() - start_time
+                    )
+                )
+                if self.cache:
+                    self.cache.save(self.sections)
+            return self.sections[name]
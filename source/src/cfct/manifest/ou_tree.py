@@ -0,0 +1,71 @@
+###############################################################################
+#  Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.    #
+#                                                                             #
+#  Licensed under the Apache License, Version 2.0 (the "License").            #
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at                                        #
+#                                                                             #
+#      http://www.apache.org/licenses/LICENSE-2.0                             #
+#                                                                             #
+#  or in the "license" file accompanying this file. This file is distributed  #
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, express #
+#  or implied. See the License for the specific language governing permissions#
+#  and limitations under the License.                                         #
+###############################################################################
+
+from typing import Dict, List, Optional, Tuple
+
+from cfct.utils.string_manipulation import empty_separator_handler, list_sanitizer
+
+ROOT_OU_NAME = "Root"
+
+
+def split_ou_path(nested_ou_name: str, delimiter: str = ":") -> Tuple[str, ...]:
+    """Splits a manifest OU path (e.g. 'TestOU1:TestOU2:TestOU3') into the
+    tuple of OU names used as key by the OUTreeIndex.
+    """
+    return tuple(list_sanitizer(empty_separator_handler(delimiter, nested_ou_name)))
+
+
+class OUTreeIndex:
+    """This class indexes the OU tree of the organization:
+
+    path -> OU id: ('TestOU1', 'TestOU2') -> 'ou-xxxx-22222222'
+    OU id -> child OU ids
+
+    The root is indexed with the 'Root' path.
+
+    Example:
+        index = OUTreeIndex(root_id, organizational_units)
+        ou_id = index.get_ou_id("TestOU1:TestOU2")
+    """
+
+    def __init__(self, root_id: str, organizational_units: Dict[str, dict]):
+        """
+        :param root_id: organization root id
+        :param organizational_units: key: OU id,
+                                     value: {"Name": OU name, "ParentId": parent id}
+        """
+        self.root_id = root_id
+        self.names = {ou_id: ou["Name"] for ou_id, ou in organizational_units.items()}
+        self.children: Dict[str, List[str]] = {root_id: []}
+        for ou_id, ou in organizational_units.items():
+            self.children.setdefault(ou_id, [])
+            self.children.setdefault(ou["ParentId"], []).append(ou_id)
+
+        self.path_to_id: Dict[Tuple[str, ...], str] = {(ROOT_OU_NAME,): root_id}
+        # parents are always indexed before their children
+        breadth_first_order = [root_id]
+        paths = {root_id: ()}
+        for parent_id in breadth_first_order:
+            for ou_id in self.children[parent_id]:
+                paths[ou_id] = paths[parent_id] + (self.names[ou_id],)
+                self.path_to_id[paths[ou_id]] = ou_id
+                breadth_first_order.append(ou_id)
+
+    def get_ou_id(self, nested_ou_name: str, delimiter: str = ":") -> Optional[str]:
+        """Returns the id of the OU, None if the path is not found"""
+        return self.path_to_id.get(split_ou_path(nested_ou_name, delimiter))
+
+    def get_children(self, ou_id: str) -> List[str]:
+        return self.children.get(ou_id, [])
@@ -0,0 +1,173 @@
+###############################################################################
+#  Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.    #
+#                                                                             #
+#  Licensed under the Apache License, Version 2.0 (the "License").            #
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at                                        #
+#                                                                             #
+#      http://www.apache.org/licenses/LICENSE-2.0                             #
+#                                                                             #
+#  or in the "license" file accompanying this file. This file is distributed  #
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, express #
+#  or implied. See the License for the specific language governing permissions#
+#  and limitations under the License.                                         #
+###############################################################################
+
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from cfct.manifest.json_cache import JsonCache
+from cfct.manifest.stack_set_dependencies import build_dependency_graph, is_delete_request
+
+
+def partition_shards(sm_input_list: List[Dict[str, Any]], shard_count: int) -> List[List[int]]:
+    """Partitions the StackSet state machine inputs into shards that can be
+    deployed by separate workers. The inputs connected by a dependency edge
+    (see build_dependency_graph) are kept in the same shard. The deletions
+    are assigned to shard 0, the other shards wait for them (see
+    ShardResults.wait_for_deletions) instead of depending on them. The
+    components are assigned largest first to the shard with the fewest
+    inputs, so every worker computes the same partition.
+
+    :param sm_input_list: list of state machine inputs in manifest order
+    :param shard_count: number of shards
+    :return: input indexes of each shard, in manifest order
+    """
+    if shard_count < 1:
+        raise ValueError("Invalid shard count: {}".format(shard_count))
+
+    # union-find of the inputs connected by a dependency edge
+    parents = list(range(len(sm_input_list)))
+
+    def find(index):
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    for index, dependencies in build_dependency_graph(sm_input_list).items():
+        for dependency in dependencies:
+            if not is_delete_request(sm_input_list[dependency]):
+                parents[find(index)] = find(dependency)
+
+    shards: List[List[int]] = [[] for _ in range(shard_count)]
+    components: Dict[int, List[int]] = {}
+    for index, sm_input in enumerate(sm_input_list):
+        if is_delete_request(sm_input):
+            shards[0].append(index)
+        else:
+            components.setdefault(find(index), []).append(index)
+
+    for component in sorted(components.values(), key=lambda indexes: (-len(indexes), indexes[0])):
+        shard = min(range(shard_count), key=lambda shard_index: len(shards[shard_index]))
+        shards[shard].extend(component)
+    return [sorted(shard) for shard in shards]
+
+
+def get_shard_file_name(file_name: str) -> str:
+    """Returns the name of the file of the current shard (SHARD_INDEX and
+    SHARD_COUNT environment variables). The shards run in parallel, a file
+    shared by the pipeline runs is kept per shard so that the shards do not
+    overwrite each other's records:
+
+    deployment_ledger.json -> deployment_ledger.shard-1-of-4.json
+    """
+    shard_count = int(os.environ.get("SHARD_COUNT", 1))
+    if shard_count <= 1:
+        return file_name
+    root, extension = os.path.splitext(file_name)
+    return "{}.shard-{}-of-{}{}".format(
+        root, int(os.environ.get("SHARD_INDEX", 0)), shard_count, extension
+    )
+
+
+class ShardResults:
+    """This class stores the result of each shard of a pipeline execution
+    in the staging bucket, so that the merge step and the other shards can
+    read it:
+
+    {"ShardIndex": 0, "ShardCount": 2, "Status": "SUCCEEDED" | "FAILED",
+     "StackSetNames": [...], "FailedExecutions": [<execution arn>, ...]}
+
+    Example:
+        results = ShardResults(logger, shard_count=2)
+        results.save(0, "SUCCEEDED", ["CustomControlTower-a"], [])
+        status, failed_executions = results.merge()
+    """
+
+    def __init__(self, logger, shard_count: int):
+        self.logger = logger
+        self.shard_count = shard_count
+        self.pipeline_execution_id = os.environ.get("PIPELINE_EXECUTION_ID")
+        if not self.pipeline_execution_id:
+            raise ValueError("PIPELINE_EXECUTION_ID is required to deploy in shards")
+        self.ttl = os.environ.get("SHARD_RESULT_TTL", 86400)
+
+    def _get_cache(self, name) -> JsonCache:
+        return JsonCache(
+            self.logger,
+            "shard_results/{}/{}.json".format(self.pipeline_execution_id, name),
+            ttl=self.ttl,
+            bucket_name=os.environ.get("STAGING_BUCKET"),
+        )
+
+    def save(self, shard_index: int, status, stack_set_names, failed_executions) -> None:
+        self._get_cache(shard_index).save(
+            {
+                "ShardIndex": shard_index,
+                "ShardCount": self.shard_count,
+                "Status": status or "SUCCEEDED",
+                "StackSetNames": list(stack_set_names),
+                "FailedExecutions": list(failed_executions),
+            }
+        )
+
+    def load(self, shard_index: int) -> Optional[dict]:
+        return self._get_cache(shard_index).load()
+
+    def save_deletions(self, status, failed_executions) -> None:
+        """Called by shard 0 once the StackSet deletions are completed"""
+        self._get_cache("deletions").save(
+            {"Status": status or "SUCCEEDED", "FailedExecutions": list(failed_executions)}
+        )
+
+    def wait_for_deletions(self, wait_time, timeout) -> bool:
+        """Waits for shard 0 to complete the StackSet deletions.
+
+        :return: True if the deletions succeeded, False if they failed or
+                 did not complete within timeout seconds
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            deletions = self._get_cache("deletions").load()
+            if deletions is not None:
+                return deletions["Status"] != "FAILED"
+            if time.monotonic() >= deadline:
+                self.logger.error("StackSet deletions did not complete within the timeout.")
+                return False
+            self.logger.info("Waiting for shard 0 to complete the StackSet deletions.")
+            time.sleep(wait_time)
+
+    def merge(self):
+        """Merges the results of all the shards. A missing shard result is
+        reported as a failure.
+
+        :return: (status, failed execution list)
+        """
+        status, failed_executions = "SUCCEEDED", []
+        for shard_index in range(self.shard_count):
+            result = self.load(shard_index)
+            if result is None:
+                self.logger.error("No result found for shard {}".format(shard_index))
+                status = "FAILED"
+                continue
+            self.logger.info(
+                "Shard {}: {} | StackSets: {}".format(
+                    shard_index, result["Status"], result["StackSetNames"]
+                )
+            )
+            failed_executions.extend(result["FailedExecutions"])
+            if result["Status"] == "FAILED":
+                status = "FAILED"
+        return status, failed_executions
@@ -13,10 +13,9 @@
 #  and limitations under the License.                                         #
 ###############################################################################
 
-import filecmp
 import os
-import tempfile
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from uuid import uuid4
 
 from botocore.exceptions import ClientError
@@ -27,26 +26,79 @@ from cfct.aws.services.state_machine import StateMachine
 from cfct.aws.utils.url_conversion import parse_bucket_key_names
 from cfct.exceptions import StackSetHasFailedInstances
 from cfct.manifest.cfn_params_handler import CFNParamsHandler
+from cfct.manifest.deployment_ledger import get_deployment_ledger
+from cfct.manifest.execution_watcher import ExecutionWatcher
+from cfct.manifest.operation_timings import get_operation_timing_store
+from cfct.manifest.ssm_parameter_cache import get_ssm_parameter_cache
+from cfct.manifest.stack_set_dependencies import (
+    build_dependency_graph,
+    get_critical_path_lengths,
+    get_ssm_exports,
+    get_ssm_references,
+)
+from cfct.manifest.template_digest import get_digest, get_template_digests
 from cfct.metrics.solution_metrics import SolutionMetrics
 from cfct.utils.list_comparision import compare_lists
 from cfct.utils.parameter_manipulation import reverse_transform_params, transform_params
+from cfct.utils.rate_limiter import TokenBucket
 
 
 class SMExecutionManager:
+    """This class starts and monitors the state machine executions of a
+    stage. sm_input_list is a list of state machine inputs or an iterator
+    yielding them while the manifest is parsed (see
+    manifest_parser.stream_stack_set_manifest); the sequential and parallel
+    modes start each execution as soon as its input is yielded.
+    """
+
     def __init__(self, logger, sm_input_list, enforce_successful_stack_instances=False):
         self.logger = logger
         self.sm_input_list = sm_input_list
         self.list_sm_exec_arns = []
         self.solution_metrics = SolutionMetrics(logger)
         self.param_handler = CFNParamsHandler(logger)
+        self.ssm_parameter_cache = get_ssm_parameter_cache(logger)
         self.state_machine = StateMachine(logger)
         self.stack_set = StackSet(logger)
+        self.template_digests = get_template_digests(logger)
+        # template URL -> digest of the templates read from S3 in this run
+        self.url_template_digests = {}
+        self.deployment_ledger = get_deployment_ledger(logger)
+        self.timing_store = get_operation_timing_store(logger)
         self.wait_time = os.environ.get("WAIT_TIME")
         self.execution_mode = os.environ.get("EXECUTION_MODE")
+        self.max_concurrent_stack_sets = int(os.environ.get("MAX_CONCURRENT_STACK_SETS", 5))
+        self.fail_fast = os.environ.get("FAIL_FAST", "false").lower() == "true"
+        self.execution_starts_per_second = float(os.environ.get("EXECUTION_STARTS_PER_SECOND", 1))
+        self.execution_start_burst = int(os.environ.get("EXECUTION_START_BURST", 5))
+        self.max_in_flight_executions = int(os.environ.get("MAX_IN_FLIGHT_EXECUTIONS", 25))
+        self.execution_durations = {}
         self.enforce_successful_stack_instances = enforce_successful_stack_instances
 
     def launch_executions(self):
         self.logger.info("%%% Launching State Machine Execution %%%")
+        if self.execution_mode.upper() == "DAG":
+            # the dependency graph needs all the inputs
+            self.sm_input_list = list(self.sm_input_list)
+        if isinstance(self.sm_input_list, list):
+            self.prefetch_ssm_parameters()
+        if self.timing_store and self.execution_mode.upper() in ("SEQUENTIAL", "DAG"):
+            if isinstance(self.sm_input_list, list):
+                self.log_run_estimate()
+            else:
+                self.logger.info(
+                    "The StackSet inputs are streamed, the run duration is not "
+                    "estimated. The ETA of each StackSet is logged when it starts."
+                )
+        try:
+            return self._launch_executions()
+        finally:
+            if self.deployment_ledger:
+                self.deployment_ledger.save()
+            if self.timing_store:
+                self.timing_store.save()
+
+    def _launch_executions(self):
         if self.execution_mode.upper() == "PARALLEL":
             self.logger.info(" | | | | |  Running Parallel Mode. | | | | |")
             return self.run_execution_parallel_mode()
@@ -54,6 +106,10 @@ class SMExecutionManager:
         elif self.execution_mode.upper() == "SEQUENTIAL":
             self.logger.info(" > > > > >  Running Sequential Mode. > > > > >")
             return self.run_execution_sequential_mode()
+
+        elif self.execution_mode.upper() == "DAG":
+            self.logger.info(" = > = > =  Running Dependency Graph Mode. = > = > =")
+            return self.run_execution_dag_mode()
         else:
             raise ValueError("Invalid execution mode: {}".format(self.execution_mode))
 
@@ -61,82 +117,411 @@ class SMExecutionManager:
         status, failed_execution_list = None, []
         # start executions at given intervals
         for sm_input in self.sm_input_list:
-            updated_sm_input = self.populate_ssm_params(sm_input)
-            stack_set_name = sm_input.get("ResourceProperties").get("StackSetName", "")
-            is_deletion = sm_input.get("RequestType").lower() == "Delete".lower()
-            if is_deletion:
-                start_execution_flag = True
-            else:
-                (
-                    template_matched,
-                    parameters_matched,
-                    stack_set_exist,
-                ) = self.compare_template_and_params(sm_input, stack_set_name)
+            result = self.run_stack_set_execution(sm_input)
+            if result is None:
+                continue
 
-                self.logger.info(
-                    "Stack Set Name: {} | "
-                    "Same Template?: {} | "
-                    "Same Parameters?: {}".format(
-                        stack_set_name, template_matched, parameters_matched
-                    )
-                )
+            status, failed_execution_list = result
+            if status == "FAILED":
+                return status, failed_execution_list
+        self.logger.info("All State Machine executions completed.")
+        return status, failed_execution_list
 
-                stackset_unchanged = all([template_matched, parameters_matched, stack_set_exist])
-                if stackset_unchanged:
-                    start_execution_flag = self.compare_stack_instances(sm_input, stack_set_name)
-                    # template and parameter does not require update
-                    updated_sm_input.update({"SkipUpdateStackSet": "yes"})
-                else:
-                    # the template or parameters needs to be updated
-                    # start SM execution
-                    start_execution_flag = True
-
-            if start_execution_flag:
-                sm_exec_name = self.get_sm_exec_name(updated_sm_input)
-                sm_exec_arn = self.setup_execution(updated_sm_input, sm_exec_name)
-                self.list_sm_exec_arns.append(sm_exec_arn)
-
-                # In sequential mode, monitor 1 execution at a time
-                (
-                    status,
-                    failed_execution_list,
-                ) = self.monitor_state_machines_execution_status(
-                    sm_execution_arns=[sm_exec_arn], retry_wait_time=self.wait_time
-                )
+    def run_execution_dag_mode(self):
+        """Runs the StackSet state machine executions concurrently, up to
+        MAX_CONCURRENT_STACK_SETS at a time. An execution starts only after
+        the executions it depends on (SSM parameter producers, see
+        build_dependency_graph) have completed. No new execution is started
+        once a failure is observed. With an operation timing store, the
+        ready executions with the longest predicted critical path start
+        first. The executions are started by a thread pool and watched
+        together by a single ExecutionWatcher. With FAIL_FAST, the running
+        executions are not waited for once a failure is observed.
+        """
+        dependencies = build_dependency_graph(self.sm_input_list)
+        self.logger.info("StackSet dependency graph: {}".format(dependencies))
+        priorities = get_critical_path_lengths(dependencies, self.predict_durations())
 
-                if status == "FAILED":
-                    return status, failed_execution_list
-
-                if self.enforce_successful_stack_instances:
-                    try:
-                        self.enforce_stack_set_deployment_successful(stack_set_name)
-                    except ClientError as error:
-                        if (
-                            is_deletion
-                            and error.response["Error"]["Code"] == "StackSetNotFoundException"
-                        ):
-                            pass
+        status, failed_execution_list = None, []
+        pending = {index: set(parents) for index, parents in dependencies.items()}
+        completed = set()
+        # start future -> input index
+        starting = {}
+        # execution arn -> (input index, started execution)
+        running = {}
+        watcher = self.get_execution_watcher(self.wait_time)
+        wait_time = watcher.min_wait_time
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_stack_sets) as executor:
+            while True:
+                if status != "FAILED":
+                    ready = sorted(
+                        (index for index in pending if pending[index] <= completed),
+                        key=lambda index: (-priorities[index], index),
+                    )
+                    available = self.max_concurrent_stack_sets - len(starting) - len(running)
+                    for index in ready[:available]:
+                        pending.pop(index)
+                        future = executor.submit(
+                            self.start_stack_set_execution, self.sm_input_list[index]
+                        )
+                        starting[future] = index
+
+                if not starting and not running:
+                    break
+
+                results = []
+                if starting:
+                    # a started execution is watched as soon as it starts
+                    done, _ = wait(
+                        starting,
+                        timeout=wait_time if running else None,
+                        return_when=FIRST_COMPLETED,
+                    )
+                    for future in done:
+                        index = starting.pop(future)
+                        execution = future.result()
+                        if execution is None:
+                            results.append((index, None))
                         else:
-                            raise error
-
+                            running[execution["ExecutionArn"]] = (index, execution)
+                            watcher.add(execution["ExecutionArn"])
                 else:
+                    time.sleep(wait_time)
+
+                if running:
+                    for execution_arn in watcher.poll():
+                        index, execution = running.pop(execution_arn)
+                        exec_status = watcher.statuses[execution_arn]
+                        results.append(
+                            (
+                                index,
+                                self.complete_stack_set_execution(
+                                    execution,
+                                    exec_status,
+                                    [execution_arn] if exec_status == "FAILED" else [],
+                                ),
+                            )
+                        )
+
+                # the polls are spaced out while no execution completes
+                if results:
+                    wait_time = watcher.min_wait_time
+                else:
+                    wait_time = min(wait_time * watcher.multiplier, watcher.max_wait_time)
+
+                for index, result in results:
+                    completed.add(index)
+                    if result is None:
+                        continue
+
+                    exec_status, failed_executions = result
+                    failed_execution_list.extend(failed_executions)
+                    if exec_status == "FAILED":
+                        status = "FAILED"
+                    elif status is None:
+                        status = exec_status
+
+                if status == "FAILED" and self.fail_fast:
+                    self.logger.error(
+                        "State Machine execution failed, not waiting for {} running "
+                        "execution(s).".format(len(starting) + len(running))
+                    )
+                    break
+
+        self.execution_durations.update(watcher.durations)
+        watcher.log_durations()
+        if status == "FAILED":
+            self.logger.error(
+                "State Machine execution(s) failed, {} StackSet(s) were not "
+                "started.".format(len(pending))
+            )
+        else:
+            self.logger.info("All State Machine executions completed.")
+        return status, failed_execution_list
+
+    def run_stack_set_execution(self, sm_input):
+        """Starts and monitors the state machine execution for a single
+        StackSet, unless the StackSet, its parameters and its stack
+        instances are already up to date.
+
+        :param sm_input: state machine input
+        :return: (status, failed execution list) or None if no execution
+                 was required
+        """
+        execution = self.start_stack_set_execution(sm_input)
+        if execution is None:
+            return None
+
+        # monitor 1 execution at a time
+        (
+            status,
+            failed_execution_list,
+        ) = self.monitor_state_machines_execution_status(
+            sm_execution_arns=[execution["ExecutionArn"]], retry_wait_time=self.wait_time
+        )
+        return self.complete_stack_set_execution(execution, status, failed_execution_list)
+
+    def start_stack_set_execution(self, sm_input):
+        """Starts the state machine execution for a single StackSet, unless
+        the StackSet, its parameters and its stack instances are already up
+        to date.
+
+        :param sm_input: state machine input
+        :return: the started execution, passed to
+                 complete_stack_set_execution once it completes, or None if
+                 no execution was required
+        """
+        updated_sm_input = self.populate_ssm_params(sm_input)
+        stack_set_name = sm_input.get("ResourceProperties").get("StackSetName", "")
+        is_deletion = sm_input.get("RequestType").lower() == "Delete".lower()
+        ledger_record = None
+        if is_deletion:
+            start_execution_flag = True
+        else:
+            if self.deployment_ledger:
+                ledger_record = self.get_ledger_record(updated_sm_input, stack_set_name)
+                if self.deployment_ledger.is_up_to_date(stack_set_name, ledger_record) and (
+                    not self.deployment_ledger.verify_operation
+                    or self.is_last_recorded_operation(stack_set_name)
+                ):
                     self.logger.info(
-                        "State Machine execution completed. " "Starting next execution..."
+                        "StackSet {} is unchanged since its last successful "
+                        "deployment, skipping.".format(stack_set_name)
                     )
-        self.logger.info("All State Machine executions completed.")
+                    return None
+            (
+                template_matched,
+                parameters_matched,
+                stack_set_exist,
+            ) = self.compare_template_and_params(sm_input, stack_set_name)
+
+            self.logger.info(
+                "Stack Set Name: {} | "
+                "Same Template?: {} | "
+                "Same Parameters?: {}".format(stack_set_name, template_matched, parameters_matched)
+            )
+
+            stackset_unchanged = all([template_matched, parameters_matched, stack_set_exist])
+            if stackset_unchanged:
+                start_execution_flag = self.compare_stack_instances(sm_input, stack_set_name)
+                # template and parameter does not require update
+                updated_sm_input.update({"SkipUpdateStackSet": "yes"})
+            else:
+                # the template or parameters needs to be updated
+                # start SM execution
+                start_execution_flag = True
+
+        if not start_execution_flag:
+            self.record_deployment(stack_set_name, ledger_record)
+            return None
+
+        if self.timing_store:
+            eta = self.predict_duration(sm_input)
+            if eta is not None:
+                self.logger.info("StackSet {} ETA: {:.0f} seconds".format(stack_set_name, eta))
+        started_at = time.time()
+        sm_exec_name = self.get_sm_exec_name(updated_sm_input)
+        sm_exec_arn = self.setup_execution(updated_sm_input, sm_exec_name)
+        self.list_sm_exec_arns.append(sm_exec_arn)
+        return {
+            "ExecutionArn": sm_exec_arn,
+            "StackSetName": stack_set_name,
+            "StateMachineInput": sm_input,
+            "IsDeletion": is_deletion,
+            "LedgerRecord": ledger_record,
+            "StartedAt": started_at,
+        }
+
+    def complete_stack_set_execution(self, execution, status, failed_execution_list):
+        """Records the completed state machine execution of a StackSet
+        started by start_stack_set_execution
+
+        :return: (status, failed execution list)
+        """
+        sm_input = execution["StateMachineInput"]
+        stack_set_name = execution["StackSetName"]
+        is_deletion = execution["IsDeletion"]
+        ledger_record = execution["LedgerRecord"]
+        if self.timing_store:
+            resource_properties = sm_input.get("ResourceProperties")
+            self.timing_store.record(
+                stack_set_name,
+                sm_input.get("RequestType"),
+                status or "SUCCEEDED",
+                execution["StartedAt"],
+                time.time(),
+                len(resource_properties.get("AccountList", [])),
+                len(resource_properties.get("RegionList", [])),
+            )
+
+        # the exported values are read by the next StackSets
+        self.ssm_parameter_cache.invalidate(get_ssm_exports(sm_input))
+
+        if status == "FAILED":
+            if self.deployment_ledger:
+                self.deployment_ledger.remove(stack_set_name)
+            return status, failed_execution_list
+
+        if self.enforce_successful_stack_instances:
+            try:
+                self.enforce_stack_set_deployment_successful(stack_set_name)
+            except ClientError as error:
+                if is_deletion and error.response["Error"]["Code"] == "StackSetNotFoundException":
+                    pass
+                else:
+                    raise error
+
+        else:
+            self.logger.info("State Machine execution completed. " "Starting next execution...")
+
+        if is_deletion:
+            if self.deployment_ledger:
+                self.deployment_ledger.remove(stack_set_name)
+        else:
+            self.record_deployment(stack_set_name, ledger_record)
         return status, failed_execution_list
 
+    def predict_duration(self, sm_input):
+        """Returns the predicted duration in seconds of the state machine
+        execution of a StackSet, None if it can not be predicted
+        """
+        resource_properties = sm_input.get("ResourceProperties")
+        return self.timing_store.predict(
+            resource_properties.get("StackSetName", ""),
+            len(resource_properties.get("AccountList", [])),
+            len(resource_properties.get("RegionList", [])),
+        )
+
+    def predict_durations(self):
+        """Returns the predicted durations of the state machine inputs, by
+        input index, the inputs without prediction are left out
+        """
+        if not self.timing_store:
+            return {}
+        durations = {}
+        for index, sm_input in enumerate(self.sm_input_list):
+            duration = self.predict_duration(sm_input)
+            if duration is not None:
+                durations[index] = duration
+        return durations
+
+    def log_run_estimate(self):
+        """Logs the predicted duration of each StackSet and of the run, the
+        sum of the durations in sequential mode, the critical path of the
+        dependency graph in dag mode. The StackSets that are up to date are
+        skipped during the run, the estimate is an upper bound. It needs all
+        the inputs: it is logged for the compiled plan and in dag mode, not
+        for inputs streamed from the manifest in sequential mode.
+        """
+        durations = self.predict_durations()
+        for index, sm_input in enumerate(self.sm_input_list):
+            stack_set_name = sm_input.get("ResourceProperties").get("StackSetName", "")
+            if index in durations:
+                self.logger.info(
+                    "StackSet {} ETA: {:.0f} seconds".format(stack_set_name, durations[index])
+                )
+            else:
+                self.logger.info("StackSet {} ETA: unknown".format(stack_set_name))
+        if not durations:
+            return
+        if self.execution_mode.upper() == "DAG":
+            lengths = get_critical_path_lengths(
+                build_dependency_graph(self.sm_input_list), durations
+            )
+            estimate = max(lengths.values(), default=0)
+        else:
+            estimate = sum(durations.values())
+        self.logger.info(
+            "Estimated run duration: {:.0f} seconds, {} of {} StackSet(s) "
+            "without history".format(
+                estimate, len(self.sm_input_list) - len(durations), len(self.sm_input_list)
+            )
+        )
+
+    def get_ledger_record(self, sm_input, stack_set_name):
+        """Builds the deployment ledger record of the StackSet from the
+        state machine input, with the SSM parameter values resolved. No
+        CloudFormation API is called. Templates staged by the manifest
+        parser are already hashed, a template referenced by URL is read from
+        S3 since its object may have changed behind the same URL.
+        """
+        resource_properties = sm_input.get("ResourceProperties")
+        template_digest = None
+        template_http_url = resource_properties.get("TemplateURL", "")
+        if template_http_url:
+            template_digest = self.get_template_digest(stack_set_name, template_http_url)
+        return self.deployment_ledger.build_record(
+            template_digest,
+            resource_properties.get("Parameters", []),
+            resource_properties.get("AccountList", []),
+            resource_properties.get("RegionList", []),
+        )
+
+    def is_last_recorded_operation(self, stack_set_name) -> bool:
+        """Returns True if the last operation of the StackSet is the one
+        recorded in the deployment ledger. Another operation means that the
+        StackSet was deployed since, e.g. by another pipeline run or shard.
+        """
+        response = self.stack_set.list_stack_set_operations(
+            StackSetName=stack_set_name, MaxResults=1
+        )
+        summaries = (response or {}).get("Summaries", [])
+        operation_id = summaries[0].get("OperationId") if summaries else None
+        if operation_id != self.deployment_ledger.get_operation_id(stack_set_name):
+            self.logger.info(
+                "Deployment ledger: the last operation of {} is {}, not the "
+                "recorded one".format(stack_set_name, operation_id)
+            )
+            return False
+        return True
+
+    def record_deployment(self, stack_set_name, ledger_record):
+        """Records the last successful operation of an up to date StackSet
+        in the deployment ledger
+        """
+        if not self.deployment_ledger or ledger_record is None:
+            return
+        response = self.stack_set.list_stack_set_operations(
+            StackSetName=stack_set_name, MaxResults=1
+        )
+        summaries = (response or {}).get("Summaries", [])
+        if summaries and summaries[0].get("Status") == "SUCCEEDED":
+            self.deployment_ledger.record(
+                stack_set_name, ledger_record, summaries[0].get("OperationId")
+            )
+        else:
+            self.deployment_ledger.remove(stack_set_name)
+
     def run_execution_parallel_mode(self):
-        # start executions at given intervals
+        """Starts the state machine executions through a token bucket
+        (EXECUTION_STARTS_PER_SECOND, EXECUTION_START_BURST) with at most
+        MAX_IN_FLIGHT_EXECUTIONS running at the same time, then waits for
+        the remaining executions to complete.
+        """
+        bucket = TokenBucket(
+            rate=self.execution_starts_per_second, burst=self.execution_start_burst
+        )
+        watcher = self.get_execution_watcher(self.wait_time)
         for sm_input in self.sm_input_list:
+            if len(watcher.outstanding) >= self.max_in_flight_executions:
+                watcher.wait(
+                    fail_fast=self.fail_fast, max_outstanding=self.max_in_flight_executions - 1
+                )
+            if self.fail_fast and watcher.failed_executions:
+                self.logger.error("State Machine execution failed, no new execution is started.")
+                break
+
+            bucket.acquire()
             sm_exec_name = self.get_sm_exec_name(sm_input)
             sm_exec_arn = self.setup_execution(sm_input, sm_exec_name)
             self.list_sm_exec_arns.append(sm_exec_arn)
-            time.sleep(int(self.wait_time))
+            watcher.add(sm_exec_arn)
+
         # monitor execution status
-        status, failed_execution_list = self.monitor_state_machines_execution_status(
-            sm_execution_arns=self.list_sm_exec_arns, retry_wait_time=self.wait_time
-        )
+        status, failed_execution_list = watcher.wait(fail_fast=self.fail_fast)
+        self.execution_durations.update(watcher.durations)
+        watcher.log_durations()
         return status, failed_execution_list
 
     @staticmethod
@@ -163,6 +548,17 @@ class SMExecutionManager:
         # execute all SM at regular interval of wait_time
         return self.state_machine.start_execution(os.environ.get("SM_ARN"), sm_input, exec_name)
 
+    def prefetch_ssm_parameters(self):
+        """Fetches the SSM parameters read by all the state machine inputs
+        in batches, instead of one GetParameter call per parameter value.
+        The parameters of streamed inputs are fetched when they are used.
+        """
+        names = set()
+        for sm_input in self.sm_input_list:
+            names.update(get_ssm_references(sm_input))
+        if names:
+            self.ssm_parameter_cache.prefetch(names)
+
     def populate_ssm_params(self, sm_input):
         """The scenario is if you have one CFN resource that exports output
         from CFN stack to SSM parameter and then the next CFN resource
@@ -209,14 +605,7 @@ class SMExecutionManager:
                 )
 
                 template_http_url = sm_input.get("ResourceProperties").get("TemplateURL", "")
-                if template_http_url:
-                    bucket_name, key_name, region = parse_bucket_key_names(template_http_url)
-                    local_template_file = tempfile.mkstemp()[1]
-
-                    s3_endpoint_url = "https://s3.%s.amazonaws.com" % region
-                    s3 = S3(self.logger, region=region, endpoint_url=s3_endpoint_url)
-                    s3.download_file(bucket_name, key_name, local_template_file)
-                else:
+                if not template_http_url:
                     self.logger.error(
                         "TemplateURL in state machine input "
                         "is empty. Check state_machine_event"
@@ -224,11 +613,12 @@ class SMExecutionManager:
                     )
                     return template_compare, params_compare, stack_set_exist
 
-                cfn_template_file = tempfile.mkstemp()[1]
-                with open(cfn_template_file, "w") as f:
-                    f.write(describe_response.get("StackSet").get("TemplateBody"))
-                # cmp function return true of the contents are same
-                template_compare = filecmp.cmp(local_template_file, cfn_template_file, False)
+                local_template_digest = self.get_template_digest(stack_name, template_http_url)
+                cfn_template_digest = get_digest(
+                    describe_response.get("StackSet").get("TemplateBody")
+                )
+                # digests are the same if the contents are the same
+                template_compare = local_template_digest == cfn_template_digest
                 self.logger.info(
                     "Comparing the parameters of the StackSet"
                     ": {} with local copy of JSON parameters"
@@ -261,6 +651,27 @@ class SMExecutionManager:
 
         return template_compare, params_compare, stack_set_exist
 
+    def get_template_digest(self, stack_name, template_http_url):
+        """Returns the digest of the manifest template. Templates staged by
+        the manifest parser are already hashed, the others are read from S3
+        in memory. Their digests are kept for the current run only, as the
+        S3 object may be overwritten behind the same URL.
+        """
+        digest = self.template_digests.get(stack_name, template_http_url)
+        if digest is None:
+            digest = self.url_template_digests.get(template_http_url)
+        if digest is None:
+            bucket_name, key_name, region = parse_bucket_key_names(template_http_url)
+            s3_endpoint_url = "https://s3.%s.amazonaws.com" % region
+            s3 = S3(self.logger, region=region, endpoint_url=s3_endpoint_url)
+            response = s3.get_object(bucket_name, key_name)
+            if response is None:
+                raise ValueError("Template not found: {}".format(template_http_url))
+            digest = get_digest(response["Body"].read())
+            self.url_template_digests[template_http_url] = digest
+        self.logger.info("Template digest of {}: {}".format(stack_name, digest))
+        return digest
+
     def get_stack_set_operation_status(self, stack_name):
         self.logger.info(
             "Checking the status of last stack set " "operation on {}".format(stack_name)
@@ -330,27 +741,24 @@ class SMExecutionManager:
             self.logger.info("Stack instance(s) creation or deletion needed.")
             return True
 
+    def get_execution_watcher(self, retry_wait_time: int) -> ExecutionWatcher:
+        return ExecutionWatcher(
+            self.logger,
+            self.state_machine,
+            min_wait_time=min(5, int(retry_wait_time)),
+            max_wait_time=int(retry_wait_time),
+        )
+
     def monitor_state_machines_execution_status(
-        self, sm_execution_arns: list, retry_wait_time: int
+        self, sm_execution_arns: list, retry_wait_time: int, fail_fast: bool = False
     ):
-        # Assume we succeed until a failure is observed
-        overall_status = "SUCCEEDED"
-        failed_executions = []
-
+        watcher = self.get_execution_watcher(retry_wait_time)
         for exec_arn in sm_execution_arns:
-            # Check-sleep cycle until the execution finishes
-            exec_status = self.state_machine.check_state_machine_status(exec_arn)
-            while exec_status == "RUNNING":
-                time.sleep(int(retry_wait_time))
-                exec_status = self.state_machine.check_state_machine_status(exec_arn)
-
-            if exec_status == "SUCCEEDED":
-                continue
-            else:
-                # One observed failure -> report overall failure
-                overall_status = "FAILED"
-                failed_executions.append(exec_arn)
+            watcher.add(exec_arn)
 
+        overall_status, failed_executions = watcher.wait(fail_fast=fail_fast)
+        self.execution_durations.update(watcher.durations)
+        watcher.log_durations()
         return overall_status, failed_executions
 
     def enforce_stack_set_deployment_successful(self, stack_set_name: str) -> None:
@@ -35,17 +35,21 @@ class InputBuilder(StateMachineInput):
 
     """
 
-    def __init__(self, resource_properties, request_type="Create", skip_stack_set="no"):
+    def __init__(
+        self, resource_properties, request_type="Create", skip_stack_set="no", stage_name=None
+    ):
         self._request_type = request_type
         self._resource_properties = resource_properties
         self._skip_stack_set = skip_stack_set
+        # the manifest compiler builds the inputs of all the stages at once
+        self._stage_name = stage_name or os.environ["STAGE_NAME"]
 
     def input_map(self) -> dict:
         input_map = {
             "RequestType": self._request_type,
             "ResourceProperties": self._resource_properties,
         }
-        if os.environ["STAGE_NAME"].upper() == "STACKSET":
+        if self._stage_name.upper() == "STACKSET":
             input_map.update({"SkipUpdateStackSet": self._skip_stack_set})
         return input_map
 
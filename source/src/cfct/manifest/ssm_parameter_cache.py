@@ -0,0 +1,80 @@
+###############################################################################
+#  Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.    #
+#                                                                             #
+#  Licensed under the Apache License, Version 2.0 (the "License").            #
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at                                        #
+#                                                                             #
+#      http://www.apache.org/licenses/LICENSE-2.0                             #
+#                                                                             #
+#  or in the "license" file accompanying this file. This file is distributed  #
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, express #
+#  or implied. See the License for the specific language governing permissions#
+#  and limitations under the License.                                         #
+###############################################################################
+
+import threading
+from typing import Dict, Iterable
+
+from cfct.aws.services.ssm import SSM
+
+_ssm_parameter_cache = None
+_ssm_parameter_cache_lock = threading.Lock()
+
+
+def get_ssm_parameter_cache(logger):
+    """Returns the SSM parameter values cache of the current run"""
+    global _ssm_parameter_cache
+    with _ssm_parameter_cache_lock:
+        if _ssm_parameter_cache is None:
+            _ssm_parameter_cache = SSMParameterCache(logger)
+        return _ssm_parameter_cache
+
+
+class SSMParameterCache:
+    """This class memoizes the values of the SSM parameters read through
+    '$[alfred_ssm_<name>]' parameter values. The names referenced by the
+    manifest are prefetched with GetParameters, 10 names per call. A
+    parameter exported by a StackSet must be invalidated once the StackSet
+    execution completes, so that the resources reading it get the new value.
+
+    Example:
+        cache = get_ssm_parameter_cache(logger)
+        cache.prefetch(["/org/member/logging/account_id", ...])
+        value = cache.get("/org/member/logging/account_id")
+        cache.invalidate(exported_names)
+    """
+
+    def __init__(self, logger, ssm=None):
+        self.logger = logger
+        self.ssm = ssm or SSM(logger)
+        self.lock = threading.Lock()
+        self.values: Dict[str, str] = {}
+
+    def prefetch(self, names: Iterable[str]) -> None:
+        """Fetches the values of the names that are not cached yet. Names
+        that do not exist yet are fetched again on first use.
+        """
+        with self.lock:
+            missing = sorted(set(names) - set(self.values))
+        if not missing:
+            return
+        values = self.ssm.get_parameters(missing)
+        self.logger.info("Prefetched {} of {} SSM parameter(s)".format(len(values), len(missing)))
+        with self.lock:
+            self.values.update(values)
+
+    def get(self, name: str) -> str:
+        with self.lock:
+            if name in self.values:
+                return self.values[name]
+        # raises if the parameter does not exist
+        value = self.ssm.get_parameter(name)
+        with self.lock:
+            self.values[name] = value
+        return value
+
+    def invalidate(self, names: Iterable[str]) -> None:
+        with self.lock:
+            for name in names:
+                self.values.pop(name, None)
@@ -0,0 +1,120 @@
+##############################################################################
+#  Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.   #
+#                                                                            #
+#  Licensed under the Apache License, Version 2.0 (the "License").           #
+#  You may not use this file except in compliance                            #
+#  with the License. A copy of the License is located at                     #
+#                                                                            #
+#      http://www.apache.org/licenses/LICENSE-2.0                            #
+#                                                                            #
+#  or in the "license" file accompanying this file. This file is             #
+#  distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  #
+#  KIND, express or implied. See the License for the specific language       #
+#  governing permissions  and limitations under the License.                 #
+##############################################################################
+
+from typing import Any, Dict, List, Set
+
+ALFRED_SSM_PREFIX = "$[alfred_ssm_"
+
+
+def get_ssm_references(sm_input: Dict[str, Any]) -> Set[str]:
+    """Returns the SSM parameter names read by a StackSet state machine input
+    through '$[alfred_ssm_<name>]' parameter values.
+
+    :param sm_input: state machine input
+    :return: set of SSM parameter names
+    """
+    references = set()
+    parameters = sm_input.get("ResourceProperties", {}).get("Parameters", {})
+    for value in parameters.values():
+        values = value if isinstance(value, list) else [value]
+        for item in values:
+            if isinstance(item, str) and item.startswith(ALFRED_SSM_PREFIX) and item.endswith("]"):
+                references.add(item[len(ALFRED_SSM_PREFIX) : -1])
+    return references
+
+
+def get_ssm_exports(sm_input: Dict[str, Any]) -> Set[str]:
+    """Returns the SSM parameter names written by a StackSet state machine
+    input through the 'export_outputs' (or 'ssm_parameters') manifest property.
+
+    :param sm_input: state machine input
+    :return: set of SSM parameter names
+    """
+    return set(sm_input.get("ResourceProperties", {}).get("SSMParameters", {}).keys())
+
+
+def is_delete_request(sm_input: Dict[str, Any]) -> bool:
+    return sm_input.get("RequestType", "").lower() == "delete"
+
+
+def build_dependency_graph(sm_input_list: List[Dict[str, Any]]) -> Dict[int, Set[int]]:
+    """Infers the execution order constraints between StackSet state machine
+    inputs. The manifest order is the order the sequential mode would use, so
+    every edge points from an earlier input to a later one:
+
+    - a resource reading an SSM parameter waits for the last earlier
+      resource exporting to that parameter
+    - a resource exporting to an SSM parameter waits for the earlier
+      resources reading or exporting to that parameter
+    - StackSet deletions run before any create/update, as they do in
+      sequential mode, so renamed resources never collide with their
+      previous StackSet
+
+    :param sm_input_list: list of state machine inputs in manifest order
+    :return: map of input index to the set of input indexes it depends on
+    """
+    dependencies: Dict[int, Set[int]] = {index: set() for index in range(len(sm_input_list))}
+    last_writer: Dict[str, int] = {}
+    readers_since_write: Dict[str, Set[int]] = {}
+    delete_indexes: Set[int] = set()
+
+    for index, sm_input in enumerate(sm_input_list):
+        if is_delete_request(sm_input):
+            delete_indexes.add(index)
+            continue
+
+        dependencies[index].update(delete_indexes)
+
+        for name in get_ssm_references(sm_input):
+            if name in last_writer:
+                dependencies[index].add(last_writer[name])
+            readers_since_write.setdefault(name, set()).add(index)
+
+        for name in get_ssm_exports(sm_input):
+            if name in last_writer:
+                dependencies[index].add(last_writer[name])
+            dependencies[index].update(readers_since_write.get(name, set()))
+            last_writer[name] = index
+            readers_since_write[name] = set()
+
+        dependencies[index].discard(index)
+
+    return dependencies
+
+
+def get_critical_path_lengths(
+    dependencies: Dict[int, Set[int]], durations: Dict[int, float]
+) -> Dict[int, float]:
+    """Returns, for each input, the duration of the longest chain of
+    executions starting with it (its duration plus the longest chain of the
+    inputs depending on it). The longest of them is the critical path of
+    the run, the minimum run duration with unlimited concurrency.
+
+    :param dependencies: graph returned by build_dependency_graph
+    :param durations: map of input index to its predicted duration
+    :return: map of input index to its critical path length
+    """
+    dependents: Dict[int, Set[int]] = {index: set() for index in dependencies}
+    for index, parents in dependencies.items():
+        for parent in parents:
+            dependents[parent].add(index)
+
+    lengths: Dict[int, float] = {}
+    # every edge points from an earlier input to a later one
+    for index in sorted(dependencies, reverse=True):
+        lengths[index] = durations.get(index, 0) + max(
+            (lengths[dependent] for dependent in dependents[index]), default=0
+        )
+    return lengths
@@ -15,9 +15,12 @@
 
 # !/bin/python
 import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable
 
 from cfct.aws.services.s3 import S3
 from cfct.aws.utils.url_conversion import build_http_url, convert_s3_url_to_http_url
+from cfct.manifest.template_digest import get_digest
 
 
 class StageFile(S3):
@@ -39,6 +42,9 @@ class StageFile(S3):
         """
         self.logger = logger
         self.relative_file_path = relative_file_path
+        # SHA-256 digest of the file, set when a local file is staged
+        self.digest = None
+        self.url = None
         super().__init__(logger)
 
     def get_staged_file(self):
@@ -48,11 +54,12 @@ class StageFile(S3):
         """
 
         if self.relative_file_path.lower().startswith("s3"):
-            return self.convert_url()
+            self.url = self.convert_url()
         elif self.relative_file_path.lower().startswith("http"):
-            return self.relative_file_path
+            self.url = self.relative_file_path
         else:
-            return self.stage_file()
+            self.url = self.stage_file()
+        return self.url
 
     def convert_url(self):
         """Convert the S3 URL s3://bucket-name/object
@@ -62,16 +69,71 @@ class StageFile(S3):
 
     def stage_file(self):
         """Uploads local file to S3 bucket and returns S3 URL
-           for the local file.
+           for the local file. The key is derived from the content of the
+           file (<prefix>/<sha256>/<file name>), the upload is skipped if
+           the object already exists.
 
         :return: S3 URL, type: String
         """
         local_file = os.path.join(os.environ.get("MANIFEST_FOLDER"), self.relative_file_path)
-        key_name = "{}/{}".format(os.environ.get("TEMPLATE_KEY_PREFIX"), self.relative_file_path)
-        self.logger.info(
-            "Uploading the template file: {} to S3 bucket: {} "
-            "and key: {}".format(local_file, os.environ.get("STAGING_BUCKET"), key_name)
+        with open(local_file, "rb") as content_file:
+            self.digest = get_digest(content_file.read())
+        key_name = "{}/{}/{}".format(
+            os.environ.get("TEMPLATE_KEY_PREFIX"),
+            self.digest,
+            os.path.basename(self.relative_file_path),
         )
-        super().upload_file(os.environ.get("STAGING_BUCKET"), local_file, key_name)
+        if super().object_exists(os.environ.get("STAGING_BUCKET"), key_name):
+            self.logger.info(
+                "The template file: {} is already staged in S3 bucket: {} "
+                "with key: {}".format(local_file, os.environ.get("STAGING_BUCKET"), key_name)
+            )
+        else:
+            self.logger.info(
+                "Uploading the template file: {} to S3 bucket: {} "
+                "and key: {}".format(local_file, os.environ.get("STAGING_BUCKET"), key_name)
+            )
+            super().upload_file(os.environ.get("STAGING_BUCKET"), local_file, key_name)
         http_url = build_http_url(os.environ.get("STAGING_BUCKET"), key_name)
         return http_url
+
+
+def stage_files(logger, relative_file_paths: Iterable[str]) -> Dict[str, StageFile]:
+    """Stages the files referenced by the manifest concurrently, up to
+    MAX_CONCURRENT_UPLOADS (default 10) at a time.
+
+    :param relative_file_paths: local paths relative to the manifest folder,
+                                S3 or HTTP URLs
+    :return: key: relative file path, value: staged file (url, digest)
+    """
+    staged_files = {path: StageFile(logger, path) for path in relative_file_paths}
+    max_workers = int(os.environ.get("MAX_CONCURRENT_UPLOADS", 10))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # list() re-raises the first upload error
+        list(executor.map(StageFile.get_staged_file, staged_files.values()))
+    return staged_files
+
+
+def start_staging(logger, relative_file_paths: Iterable[str]) -> Dict[str, Future]:
+    """Starts staging the files in the background, up to
+    MAX_CONCURRENT_UPLOADS (default 10) at a time, and returns without
+    waiting for the uploads.
+
+    :param relative_file_paths: local paths relative to the manifest folder,
+                                S3 or HTTP URLs
+    :return: key: relative file path, value: future of the staged file, its
+             result() re-raises the upload error
+    """
+    max_workers = int(os.environ.get("MAX_CONCURRENT_UPLOADS", 10))
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = {
+        path: executor.submit(_stage_file, StageFile(logger, path)) for path in relative_file_paths
+    }
+    # the submitted uploads keep running after the shutdown
+    executor.shutdown(wait=False)
+    return futures
+
+
+def _stage_file(staged_file: StageFile) -> StageFile:
+    staged_file.get_staged_file()
+    return staged_file
@@ -0,0 +1,112 @@
+###############################################################################
+#  Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.    #
+#                                                                             #
+#  Licensed under the Apache License, Version 2.0 (the "License").            #
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at                                        #
+#                                                                             #
+#      http://www.apache.org/licenses/LICENSE-2.0                             #
+#                                                                             #
+#  or in the "license" file accompanying this file. This file is distributed  #
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, express #
+#  or implied. See the License for the specific language governing permissions#
+#  and limitations under the License.                                         #
+###############################################################################
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Optional, Union
+
+from cfct.manifest.json_cache import CACHE_KEY_PREFIX
+
+_template_digests = None
+_template_digests_lock = threading.Lock()
+
+
+def get_digest(content: Union[bytes, str]) -> str:
+    """Returns the SHA-256 hex digest of a template, str content is UTF-8
+    encoded, as CloudFormation returns the TemplateBody.
+    """
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.sha256(content).hexdigest()
+
+
+def get_template_digests(logger):
+    """Returns the template digests of the current stage"""
+    global _template_digests
+    with _template_digests_lock:
+        if _template_digests is None:
+            _template_digests = TemplateDigests(logger)
+        return _template_digests
+
+
+class TemplateDigests:
+    """This class records, for each StackSet, the digest of the template
+    in the manifest, in a JSON state file:
+
+    {"<stack set name>": {"TemplateURL": "<url>", "Digest": "<sha256>"}}
+
+    The digest of a local template is computed when the template is staged
+    to S3. Templates referenced by URL are recorded with Digest: None, they
+    are hashed on demand and their digest is never written to the state
+    file.
+
+    Example:
+        digests = get_template_digests(logger)
+        digests.put(stack_set_name, template_url, get_digest(template_body))
+        digest = digests.get(stack_set_name, template_url)
+    """
+
+    def __init__(self, logger):
+        self.logger = logger
+        self.state_file = os.path.join(
+            os.environ.get("CACHE_FOLDER", tempfile.gettempdir()),
+            CACHE_KEY_PREFIX,
+            "template_digests.json",
+        )
+        self.lock = threading.Lock()
+        self.digests = self._read_state_file()
+
+    def get(self, stack_set_name: str, template_url: str) -> Optional[str]:
+        """Returns the digest of the template, None if it is not known for
+        this template URL
+        """
+        entry = self.digests.get(stack_set_name, {})
+        if entry.get("TemplateURL") == template_url:
+            return entry.get("Digest")
+        return None
+
+    def put(self, stack_set_name: str, template_url: str, digest: Optional[str]) -> None:
+        with self.lock:
+            self.digests[stack_set_name] = {"TemplateURL": template_url, "Digest": digest}
+            self._write_state_file()
+
+    def update(self, digests: dict) -> None:
+        """Records the digests computed by another stage, e.g. the stage
+        that compiled the manifest
+        """
+        with self.lock:
+            self.digests.update(digests)
+            self._write_state_file()
+
+    def _read_state_file(self):
+        if not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, "r") as state_file:
+                return json.load(state_file)
+        except (OSError, ValueError) as e:
+            self.logger.warning("Ignoring state file {}: {}".format(self.state_file, e))
+            return {}
+
+    def _write_state_file(self):
+        try:
+            os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+            with open(self.state_file, "w") as state_file:
+                json.dump(self.digests, state_file, indent=2)
+        except OSError as e:
+            self.logger.warning("Unable to write state file {}: {}".format(self.state_file, e))
@@ -16,8 +16,10 @@
 # !/bin/python
 import inspect
 import json
+import os
 import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor
 from random import randint
 
 from botocore.exceptions import ClientError
@@ -29,6 +31,7 @@ from cfct.aws.services.s3 import S3
 from cfct.aws.services.scp import ServiceControlPolicy as SCP
 from cfct.aws.services.ssm import SSM
 from cfct.aws.services.sts import AssumeRole
+from cfct.aws.utils.policy_index import get_policy_index_cache, is_policy_unchanged
 from cfct.aws.utils.url_conversion import parse_bucket_key_names
 from cfct.metrics.solution_metrics import SolutionMetrics
 
@@ -49,10 +52,6 @@ class CloudFormation(object):
         self.logger.info("Executing: " + self.__class__.__name__ + "/" + inspect.stack()[0][3])
         self.logger.info(self.params)
 
-        # add loop flag to handle Skip StackSet Update choice
-        if self.event.get("LoopFlag") is None:
-            self.event.update({"LoopFlag": "not-applicable"})
-
         # To prevent CFN from throwing 'Response object is too long.'
         # when the event payload gets overloaded Deleting the
         # 'OldResourceProperties' from event, since it not being used in
@@ -131,29 +130,13 @@ class CloudFormation(object):
         self.event.update({"OperationStatus": operation_status})
         return self.event
 
-    def list_stack_instances_account_ids(self):
-        self.logger.info("Executing: " + self.__class__.__name__ + "/" + inspect.stack()[0][3])
-        self.logger.info(self.params)
-
-        stack_set = StackSet(self.logger)
-
-        accounts = []
-        paginator = stack_set.cfn_client.get_paginator("list_stack_instances")
-        pages = paginator.paginate(
-            StackSetName=self.params.get("StackSetName"), PaginationConfig={"PageSize": 100}
-        )
-        for page in pages:
-            for summary in page["Summaries"]:
-                accounts.append(summary["Account"])
-
-        self.event.update({"StackInstanceAccountList": list(set(accounts))})
-        return self.event
-
     def list_stack_instances(self):
-        """Set values for AccountList, RegionList, LoopFlag, etc.
-           that will be used by step functions as input to determine
-           its operations: create, update or delete stackset or
-           stack instances
+        """Plan the stack instance operations of the StackSet from all
+           its stack instances: the account and region pairs of the
+           manifest without a stack instance are created, the stack
+           instances outside of them are deleted. Step functions runs
+           one operation per item of CreateInstanceOperations and
+           DeleteInstanceOperations.
 
         Returns:
             event
@@ -170,222 +153,92 @@ class CloudFormation(object):
             self.logger.info("Override parameters NOT found in the event")
             self.event.update({"OverrideParametersExist": "no"})
 
-        # Check if stack instances exist
-        stack_set = StackSet(self.logger)
-
         # if account list is not present then only create StackSet
         # and skip stack instance creation
         if type(self.params.get("AccountList")) is not list or not self.params.get("AccountList"):
             self._set_skip_stack_instance_operation()
             return self.event
-        else:  # proceed if account list exists
-            account_id = self.params.get("AccountList")[0]
-
-            # if this is 2nd round, fetch one of the existing accounts
-            # that hasn't been processed in the first round
-            if (
-                self.event.get("ActiveAccountList") is not None
-                and self.event.get("ActiveRegionList") is not None
-                and self.params.get("AccountList") != self.event.get("ActiveAccountList")
-            ):
-                account_id = self._add_list(
-                    self.params.get("AccountList"), self.event.get("ActiveAccountList")
-                )[0]
-
-            self.logger.info("Account Id for list stack instance: {}".format(account_id))
-
-            if (
-                self.event.get("NextToken") is not None
-                and self.event.get("NextToken") != "Complete"
-            ):
-                self.logger.info("Found next token")
-                response = stack_set.list_stack_instances(
-                    StackSetName=self.params.get("StackSetName"),
-                    StackInstanceAccount=account_id,
-                    MaxResults=100,
-                    NextToken=self.event.get("NextToken"),
-                )
-            else:
-                self.logger.info("Next token not found.")
-                response = stack_set.list_stack_instances(
-                    StackSetName=self.params.get("StackSetName"),
-                    StackInstanceAccount=account_id,
-                    MaxResults=100,
-                )
-            self.logger.info("List Stack Instance Response" " for account: {}".format(account_id))
-            self.logger.info(response)
-
-            if response is not None:
-                # If no stack instances are found for new accounts
-                # in manifest file entered by user AND no other
-                # existing stack instances, then only create stack
-                # instance operation is needed.
-                # Therefore here set values as input for step functions
-                # to trigger create operation accordingly.
-                if (
-                    not response.get("Summaries")
-                    and self.event.get("StackInstanceAccountList") is None
-                ):
-                    self._set_only_create_stack_instance_operation()
-                    return self.event
-
-                # If there are stack instances, follow the route below
-                # to determine what operations (create, update, delete)
-                # that step functions should perform.
-                else:
-                    existing_region_list = (
-                        []
-                        if self.event.get("ExistingRegionList") is None
-                        else self.event.get("ExistingRegionList")
-                    )
-                    existing_account_list = (
-                        []
-                        if self.event.get("StackInstanceAccountList") is None
-                        else self.event.get("StackInstanceAccountList")
-                    )
-
-                    if response.get("Summaries"):
-                        self.logger.info("Found existing stack instance for " "AccountList.")
-                        self.event.update({"InstanceExist": "yes"})
-                        existing_region_list = self._get_existing_stack_instance_info(
-                            response.get("Summaries"), existing_region_list
-                        )
-                    # If there are no stack instances for new account list
-                    # but there are some for existing accounts that are
-                    # not in the new account list, get the info about
-                    # those stack instances.
-                    elif (
-                        self.event.get("StackInstanceAccountList") is not None
-                        and len(existing_region_list) == 0
-                    ):
-                        account_id = self.event.get("StackInstanceAccountList")[0]
-                        response = stack_set.list_stack_instances(
-                            StackSetName=self.params.get("StackSetName"),
-                            StackInstanceAccount=account_id,
-                            MaxResults=100,
-                        )
-                        self.logger.info(
-                            "List Stack Instance Response for" " StackInstanceAccountList"
-                        )
-                        self.logger.info(response)
 
-                        if response.get("Summaries"):
-                            self.logger.info(
-                                "Found existing stack instances " "for StackInstanceAccountList."
-                            )
-                            self.event.update({"InstanceExist": "yes"})
-                            existing_region_list = self._get_existing_stack_instance_info(
-                                response.get("Summaries"), existing_region_list
-                            )
-                        else:
-                            existing_region_list = self.params.get("RegionList")
+        stack_set = StackSet(self.logger)
+        existing_instances = {
+            (instance.account, instance.region)
+            for instance in stack_set.iter_stack_instances(self.params.get("StackSetName"))
+        }
+        self.logger.info(
+            "Found {} stack instance(s) in {}".format(
+                len(existing_instances), self.params.get("StackSetName")
+            )
+        )
 
-                    self.logger.info(
-                        "Updated existing region List: {}".format(existing_region_list)
-                    )
+        # If no stack instances are found, then only create stack
+        # instance operation is needed, for all the accounts and regions
+        if not existing_instances:
+            self._set_only_create_stack_instance_operation()
+            return self.event
 
-                    self.logger.info("Next Token Returned: {}".format(response.get("NextToken")))
+        existing_region_list = sorted({region for _, region in existing_instances})
+        self.logger.info("Existing region list: {}".format(existing_region_list))
+        self.event.update({"InstanceExist": "yes"})
+        self.event.update({"ExistingRegionList": existing_region_list})
+
+        # all the stack instances are deleted with the StackSet
+        manifest_instances = set()
+        if self.event.get("RequestType") != "Delete":
+            manifest_instances = {
+                (account, region)
+                for account in self.params.get("AccountList")
+                for region in self.params.get("RegionList")
+            }
+        create_operations = self._get_stack_instance_operations(
+            manifest_instances - existing_instances
+        )
+        delete_operations = self._get_stack_instance_operations(
+            existing_instances - manifest_instances
+        )
+        self.logger.info("Create stack instance operations: {}".format(create_operations))
+        self.logger.info("Delete stack instance operations: {}".format(delete_operations))
 
-                    if response.get("NextToken") is None:
-                        (
-                            add_region_list,
-                            delete_region_list,
-                            add_account_list,
-                            delete_account_list,
-                        ) = self._get_add_delete_region_account_list(
-                            existing_region_list, existing_account_list
-                        )
-                        self._set_loop_flag(
-                            add_region_list,
-                            delete_region_list,
-                            add_account_list,
-                            delete_account_list,
-                        )
-                        self._update_event_for_add(add_account_list, add_region_list)
-                        self._update_event_for_delete(delete_account_list, delete_region_list)
-                        self.event.update({"ExistingRegionList": existing_region_list})
-                    else:
-                        self.event.update({"NextToken": response.get("NextToken")})
-                        # Update the self.event with existing_region_list
-                        self.event.update({"ExistingRegionList": existing_region_list})
-                    return self.event
+        self.event.update({"CreateInstanceOperations": create_operations})
+        self.event.update({"CreateInstance": "yes" if create_operations else "no"})
+        self.event.update({"DeleteInstanceOperations": delete_operations})
+        self.event.update({"DeleteInstance": "yes" if delete_operations else "no"})
         return self.event
 
-    def _set_loop_flag(
-        self, add_region_list, delete_region_list, add_account_list, delete_account_list
-    ):
-        """set LoopFlag used to determine if state machine will run
-           more than once.
-           LoopFlag - Yes. State machine executes twice
-           LoopFlag - No. State machine executes once
+    @staticmethod
+    def _get_stack_instance_operations(instances):
+        """Group the (account, region) pairs by the regions of each
+           account: the accounts with the same regions share one
+           operation, as a stack instances operation deploys to all its
+           accounts in all its regions.
 
         Returns:
-            None
+            list of {"AccountList": [...], "RegionList": [...]}
         """
-        # both are not empty - region and account was added
-        if add_account_list and add_region_list:
-            self.event.update({"LoopFlag": "yes"})
-        # both are not empty - region and account was deleted
-        elif delete_account_list and delete_region_list:
-            self.event.update({"LoopFlag": "yes"})
-        else:
-            self.event.update({"LoopFlag": "no"})
-
-    def _get_add_delete_region_account_list(self, existing_region_list, existing_account_list):
-        """build region and account list for adding and deleting
-           stack instances operations.
+        account_regions = {}
+        for account, region in instances:
+            account_regions.setdefault(account, set()).add(region)
+        region_accounts = {}
+        for account, regions in account_regions.items():
+            region_accounts.setdefault(tuple(sorted(regions)), []).append(account)
+        return [
+            {"AccountList": sorted(accounts), "RegionList": list(regions)}
+            for regions, accounts in sorted(region_accounts.items())
+        ]
+
+    def list_remaining_stack_instances(self):
+        """Check if stack instances remain after the delete stack
+           instances operation, the StackSet is deleted when none does.
 
         Returns:
-            None
+            event
         """
-        self.logger.info("Existing region list: {}".format(existing_region_list))
-        self.logger.info("Existing account list: {}".format(existing_account_list))
-
-        # replace the region list in the self.event
-        add_region_list = self._add_list(self.params.get("RegionList"), existing_region_list)
-        self.logger.info("Add region list: {}".format(add_region_list))
-
-        # Build a region list if the event is from AVM
-        delete_region_list = self._delete_list(self.params.get("RegionList"), existing_region_list)
-        self.logger.info("Delete region list: {}".format(delete_region_list))
-
-        add_account_list = self._add_list(self.params.get("AccountList"), existing_account_list)
-        self.logger.info("Add account list: {}".format(add_account_list))
-
-        delete_account_list = self._delete_list(
-            self.params.get("AccountList"), existing_account_list
-        )
-        self.logger.info("Delete account list: {}".format(delete_account_list))
-
-        return (
-            add_region_list,
-            delete_region_list,
-            add_account_list,
-            delete_account_list,
-        )
-
-    def _get_existing_stack_instance_info(self, response_summary, existing_region_list):
-        """Iterate through response to check if stack instance
-           exists in account and region in the given self.event.
-           Fetch region and account list for existing stack instances.
+        self.logger.info("Executing: " + self.__class__.__name__ + "/" + inspect.stack()[0][3])
+        self.logger.info(self.params)
 
-        Returns:
-            None
-        """
-        for instance in response_summary:
-            if instance.get("Region") not in existing_region_list:
-                self.logger.info(
-                    "Region {} not in the region list."
-                    "Adding it...".format(instance.get("Region"))
-                )
-                # appending to the list
-                existing_region_list.append(instance.get("Region"))
-            else:
-                self.logger.info(
-                    "Region {} already in the region list."
-                    "Skipping...".format(instance.get("Region"))
-                )
-        return existing_region_list
+        stack_set = StackSet(self.logger)
+        instance = next(stack_set.iter_stack_instances(self.params.get("StackSetName")), None)
+        self.event.update({"InstanceExist": "no" if instance is None else "yes"})
+        return self.event
 
     def _set_only_create_stack_instance_operation(self):
         """Set values as input for step function to
@@ -395,8 +248,6 @@ class CloudFormation(object):
             event
         """
         self.event.update({"InstanceExist": "no"})
-        # exit loop
-        self.event.update({"NextToken": "Complete"})
         # create stack instance set to yes
         self.event.update({"CreateInstance": "yes"})
         # delete stack instance set to no
@@ -411,56 +262,9 @@ class CloudFormation(object):
             event
         """
         self.event.update({"InstanceExist": "no"})
-        self.event.update({"NextToken": "Complete"})
         self.event.update({"CreateInstance": "no"})
         self.event.update({"DeleteInstance": "no"})
 
-    def _update_event_for_delete(self, delete_account_list, delete_region_list):
-        if delete_account_list or delete_region_list:
-            self.event.update({"DeleteAccountList": delete_account_list})
-            self.event.update({"DeleteRegionList": delete_region_list})
-            self.event.update({"DeleteInstance": "yes"})
-            self.event.update({"NextToken": "Complete"})
-        else:
-            self.event.update({"DeleteInstance": "no"})
-            self.event.update({"NextToken": "Complete"})
-
-    def _update_event_for_add(self, add_account_list, add_region_list):
-        if add_account_list or add_region_list:
-            self.event.update({"AddAccountList": add_account_list})
-            self.event.update({"AddRegionList": add_region_list})
-            self.event.update({"CreateInstance": "yes"})
-            self.event.update({"NextToken": "Complete"})
-        else:
-            self.event.update({"CreateInstance": "no"})
-            self.event.update({"NextToken": "Complete"})
-
-    def _add_list(self, new_list, existing_list):
-        if isinstance(new_list, list) and isinstance(existing_list, list):
-            event_set = set(new_list)
-            existing_set = set(existing_list)
-            add_list = list(event_set - event_set.intersection(existing_set))
-            return add_list
-        else:
-            raise ValueError(
-                "Both variables must be list.\n"
-                "Variable 1: {}  \n "
-                "Variable 2: {}".format(new_list, existing_list)
-            )
-
-    def _delete_list(self, new_list, existing_list):
-        if isinstance(new_list, list) and isinstance(existing_list, list):
-            event_set = set(new_list)
-            existing_set = set(existing_list)
-            delete_list = list(event_set.union(existing_set) - event_set)
-            return delete_list
-        else:
-            raise ValueError(
-                "Both variables must be list.\n"
-                "Variable 1: {}  \n "
-                "Variable 2: {}".format(new_list, existing_list)
-            )
-
     def _get_ssm_secure_string(self, parameters):
         if parameters.get("ALZRegion"):
             ssm = SSM(self.logger, parameters.get("ALZRegion"))
@@ -524,39 +328,12 @@ class CloudFormation(object):
         account_list = self.params.get("AccountList")
         region_list = self.params.get("RegionList")
 
-        # if AddAccountList is not empty
-        if (
-            self.event.get("AddAccountList") is not None
-            and len(self.event.get("AddAccountList")) != 0
-        ):
-            account_list = self.event.get("AddAccountList")
-
-        # if AddRegionList is not empty
-        if (
-            self.event.get("AddRegionList") is not None
-            and len(self.event.get("AddRegionList")) != 0
-        ):
-            region_list = self.event.get("AddRegionList")
-
-        # both AddAccountList and AddRegionList are not empty
-        if self.event.get("LoopFlag") == "yes":
-            # create new stack instance in new account only with
-            # all regions. new stack instances in new region
-            # for existing accounts will be deployed in the second round
-            if self.event.get("ActiveAccountList") is not None:
-                if self.event.get("ActiveAccountList") == self.event.get("AddAccountList"):
-                    account_list = self._add_list(
-                        self.params.get("AccountList"),
-                        self.event.get("ActiveAccountList"),
-                    )
-            else:
-                account_list = self.event.get("AddAccountList")
-                region_list = self.params.get("RegionList")
+        # next operation planned by list_stack_instances
+        create_operations = self.event.get("CreateInstanceOperations")
+        if create_operations:
+            account_list = create_operations[0].get("AccountList")
+            region_list = create_operations[0].get("RegionList")
 
-        self.event.update({"ActiveAccountList": account_list})
-        self.event.update({"ActiveRegionList": region_list})
-
-        self.logger.info("LoopFlag: {}".format(self.event.get("LoopFlag")))
         self.logger.info("Create stack instances for accounts: {}".format(account_list))
         self.logger.info("Create stack instances in regions:  {}".format(region_list))
 
@@ -574,6 +351,10 @@ class CloudFormation(object):
         self.logger.info(response)
         self.logger.info("Operation ID: {}".format(response.get("OperationId")))
         self.event.update({"OperationId": response.get("OperationId")})
+        # the same operation is started again when another operation
+        # is in progress
+        if create_operations and response.get("OperationId") != "OperationInProgressException":
+            self.event.update({"CreateInstanceOperations": create_operations[1:]})
         return self.event
 
     def update_stack_set(self):
@@ -636,35 +417,20 @@ class CloudFormation(object):
         self.logger.info("Executing: " + self.__class__.__name__ + "/" + inspect.stack()[0][3])
         self.logger.info(self.params)
 
-        # set to default values (new instance creation)
+        # set to default values (all the stack instances)
         account_list = self.params.get("AccountList")
         # full region list
         region_list = self.event.get("ExistingRegionList")
 
-        # if DeleteAccountList is not empty
-        if (
-            self.event.get("DeleteAccountList") is not None
-            and len(self.event.get("DeleteAccountList")) != 0
-        ):
-            account_list = self.event.get("DeleteAccountList")
-            # full region list
-            region_list = self.event.get("ExistingRegionList")
-
-        # if DeleteRegionList is not empty
-        if (
-            self.event.get("DeleteRegionList") is not None
-            and len(self.event.get("DeleteRegionList")) != 0
-        ):
-            region_list = self.event.get("DeleteRegionList")
-
-        # both  DeleteAccountList and DeleteRegionList is not empty
-        if self.event.get("LoopFlag") == "yes":
-            # delete stack instance in deleted account with all regions
-            # stack instances in all regions for existing accounts
-            # will be deletion in the second round
-            account_list = self.event.get("DeleteAccountList")
-            # full region list
-            region_list = self.event.get("ExistingRegionList")
+        delete_operations = self.event.get("DeleteInstanceOperations")
+        # retry the failed operation
+        if self.event.get("RetryDeleteFlag"):
+            account_list = self.event.get("ActiveAccountList")
+            region_list = self.event.get("ActiveRegionList")
+        # next operation planned by list_stack_instances
+        elif delete_operations:
+            account_list = delete_operations[0].get("AccountList")
+            region_list = delete_operations[0].get("RegionList")
 
         self.event.update({"ActiveAccountList": account_list})
         self.event.update({"ActiveRegionList": region_list})
@@ -679,6 +445,14 @@ class CloudFormation(object):
         self.logger.info(response)
         self.logger.info("Operation ID: {}".format(response.get("OperationId")))
         self.event.update({"OperationId": response.get("OperationId")})
+        # the same operation is started again when another operation
+        # is in progress
+        if (
+            delete_operations
+            and not self.event.get("RetryDeleteFlag")
+            and response.get("OperationId") != "OperationInProgressException"
+        ):
+            self.event.update({"DeleteInstanceOperations": delete_operations[1:]})
         return self.event
 
 
@@ -723,26 +497,26 @@ class ServiceControlPolicy(object):
             policy_name = self.params.get("PolicyDocument").get("Name")
 
         # Check if SCP already exist
-        scp = SCP(self.logger)
-        pages = scp.list_policies()
-
-        for page in pages:
-            policies_list = page.get("Policies")
-
-            # iterate through the policies list
-            for policy in policies_list:
-                if policy.get("Name") == policy_name:
-                    self.logger.info("Policy Found")
-                    self.event.update({"PolicyId": policy.get("Id")})
-                    self.event.update({"PolicyArn": policy.get("Arn")})
-                    self.event.update({"PolicyExist": "yes"})
-                    return self.event
-                else:
-                    continue
+        policy = self._find_policy(policy_name)
+        if policy:
+            self.logger.info("Policy Found")
+            self.event.update({"PolicyId": policy.get("Id")})
+            self.event.update({"PolicyArn": policy.get("Arn")})
+            self.event.update({"PolicyExist": "yes"})
+            return self.event
 
         self.event.update({"PolicyExist": "no"})
         return self.event
 
+    def _find_policy(self, policy_name):
+        """Looks the policy up in the index passed by the pipeline, then in
+        the index cached by the Lambda execution environment
+        """
+        policy_index = self.event.get("PolicyIndex", {})
+        if policy_name in policy_index:
+            return policy_index[policy_name]
+        return get_policy_index_cache("SERVICE_CONTROL_POLICY").get(SCP(self.logger), policy_name)
+
     def create_policy(self):
         self.logger.info("Executing: " + self.__class__.__name__ + "/" + inspect.stack()[0][3])
         self.logger.info(self.params)
@@ -757,7 +531,12 @@ class ServiceControlPolicy(object):
         )
         self.logger.info("Create SCP Response")
         self.logger.info(response)
-        policy_id = response.get("Policy").get("PolicySummary").get("Id")
+        policy_summary = response.get("Policy").get("PolicySummary")
+        get_policy_index_cache("SERVICE_CONTROL_POLICY").put(
+            policy_doc.get("Name"),
+            {"Id": policy_summary.get("Id"), "Arn": policy_summary.get("Arn")},
+        )
+        policy_id = policy_summary.get("Id")
         self.event.update({"PolicyId": policy_id})
         return self.event
 
@@ -768,6 +547,12 @@ class ServiceControlPolicy(object):
         policy_id = self.event.get("PolicyId")
         policy_content = self._load_policy(policy_doc.get("PolicyURL"))
 
+        # the index passed by the pipeline has the content hash of the policy
+        policy = self.event.get("PolicyIndex", {}).get(policy_doc.get("Name"))
+        if is_policy_unchanged(policy, policy_doc.get("Description"), policy_content):
+            self.logger.info("Policy content and description unchanged, skipping the update")
+            return self.event
+
         scp = SCP(self.logger)
         self.logger.info("Updating Service Control Policy")
         response = scp.update_policy(
@@ -790,6 +575,9 @@ class ServiceControlPolicy(object):
         scp = SCP(self.logger)
         self.logger.info("Deleting Service Control Policy")
         scp.delete_policy(policy_id)
+        get_policy_index_cache("SERVICE_CONTROL_POLICY").remove(
+            self.params.get("PolicyDocument").get("Name")
+        )
         self.logger.info("Delete SCP")
         status = "Policy: {} deleted successfully".format(policy_id)
         self.event.update({"Status": status})
@@ -865,6 +653,60 @@ class ServiceControlPolicy(object):
 
         self.event.update({"PolicyAttached": "no"})
 
+    def apply_policy_attachments(self):
+        """Attaches the policy to, or detaches it from, all the OUs of the
+        OUList in one invocation. The targets of the policy are listed once,
+        then only the missing attachments and the remaining detachments are
+        applied, MAX_CONCURRENT_POLICY_ATTACHMENTS at a time.
+
+        OUList example: [[['ouname1', 'ouid1'], 'Attach'], ...]
+        """
+        self.logger.info("Executing: " + self.__class__.__name__ + "/" + inspect.stack()[0][3])
+        self.logger.info(self.params)
+        policy_id = self.event.get("PolicyId")
+        scp = SCP(self.logger)
+
+        attached_target_ids = set()
+        for page in scp.list_targets_for_policy(policy_id):
+            for target in page.get("Targets"):
+                attached_target_ids.add(target.get("TargetId"))
+
+        attach_list, detach_list = [], []
+        for (ou_name, ou_id), operation in self.params.get("OUList", []):
+            if ou_id is None or len(ou_id) == 0:
+                raise ValueError("OU id is not found for {}".format(ou_name))
+            if operation == "Attach":
+                if ou_id not in attached_target_ids:
+                    attach_list.append(ou_id)
+            elif operation == "Detach":
+                if ou_id in attached_target_ids:
+                    detach_list.append(ou_id)
+            else:
+                raise ValueError(
+                    "Invalid Operation Type {} for {}, valid choices are "
+                    "[Attach, Detach]".format(operation, ou_name)
+                )
+        self.logger.info("Attach policy {} to OUs: {}".format(policy_id, attach_list))
+        self.logger.info("Detach policy {} from OUs: {}".format(policy_id, detach_list))
+
+        max_workers = int(os.environ.get("MAX_CONCURRENT_POLICY_ATTACHMENTS", 5))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(scp.attach_policy, policy_id, target_id)
+                for target_id in attach_list
+            ] + [
+                executor.submit(scp.detach_policy, policy_id, target_id)
+                for target_id in detach_list
+            ]
+            for future in futures:
+                future.result()
+
+        status = "Policy: {} attached to OUs: {}, detached from OUs: {}".format(
+            policy_id, attach_list, detach_list
+        )
+        self.event.update({"Status": status})
+        return self.event
+
     def detach_policy_from_all_accounts(self):
         self.logger.info("Executing: " + self.__class__.__name__ + "/" + inspect.stack()[0][3])
         self.logger.info(self.params)
@@ -940,26 +782,26 @@ class ResourceControlPolicy(object):
             policy_name = self.params.get("PolicyDocument").get("Name")
 
         # Check if RCP already exist
-        rcp = RCP(self.logger)
-        pages = rcp.list_policies()
-
-        for page in pages:
-            policies_list = page.get("Policies")
-
-            # iterate through the policies list
-            for policy in policies_list:
-                if policy.get("Name") == policy_name:
-                    self.logger.info("Policy Found")
-                    self.event.update({"PolicyId": policy.get("Id")})
-                    self.event.update({"PolicyArn": policy.get("Arn")})
-                    self.event.update({"PolicyExist": "yes"})
-                    return self.event
-                else:
-                    continue
+        policy = self._find_policy(policy_name)
+        if policy:
+            self.logger.info("Policy Found")
+            self.event.update({"PolicyId": policy.get("Id")})
+            self.event.update({"PolicyArn": policy.get("Arn")})
+            self.event.update({"PolicyExist": "yes"})
+            return self.event
 
         self.event.update({"PolicyExist": "no"})
         return self.event
 
+    def _find_policy(self, policy_name):
+        """Looks the policy up in the index passed by the pipeline, then in
+        the index cached by the Lambda execution environment
+        """
+        policy_index = self.event.get("PolicyIndex", {})
+        if policy_name in policy_index:
+            return policy_index[policy_name]
+        return get_policy_index_cache("RESOURCE_CONTROL_POLICY").get(RCP(self.logger), policy_name)
+
     def create_policy(self):
         self.logger.info("Executing: " + self.__class__.__name__ + "/" + inspect.stack()[0][3])
         self.logger.info(self.params)
@@ -974,7 +816,12 @@ class ResourceControlPolicy(object):
         )
         self.logger.info("Create RCP Response")
         self.logger.info(response)
-        policy_id = response.get("Policy").get("PolicySummary").get("Id")
+        policy_summary = response.get("Policy").get("PolicySummary")
+        get_policy_index_cache("RESOURCE_CONTROL_POLICY").put(
+            policy_doc.get("Name"),
+            {"Id": policy_summary.get("Id"), "Arn": policy_summary.get("Arn")},
+        )
+        policy_id = policy_summary.get("Id")
         self.event.update({"PolicyId": policy_id})
         return self.event
 
@@ -985,6 +832,12 @@ class ResourceControlPolicy(object):
         policy_id = self.event.get("PolicyId")
         policy_content = self._load_policy(policy_doc.get("PolicyURL"))
 
+        # the index passed by the pipeline has the content hash of the policy
+        policy = self.event.get("PolicyIndex", {}).get(policy_doc.get("Name"))
+        if is_policy_unchanged(policy, policy_doc.get("Description"), policy_content):
+            self.logger.info("Policy content and description unchanged, skipping the update")
+            return self.event
+
         rcp = RCP(self.logger)
         self.logger.info("Updating Resource Control Policy")
         response = rcp.update_policy(
@@ -1007,6 +860,9 @@ class ResourceControlPolicy(object):
         rcp = RCP(self.logger)
         self.logger.info("Deleting Resource Control Policy")
         rcp.delete_policy(policy_id)
+        get_policy_index_cache("RESOURCE_CONTROL_POLICY").remove(
+            self.params.get("PolicyDocument").get("Name")
+        )
         self.logger.info("Delete RCP")
         status = "Policy: {} deleted successfully".format(policy_id)
         self.event.update({"Status": status})
@@ -1082,6 +938,60 @@ class ResourceControlPolicy(object):
 
         self.event.update({"PolicyAttached": "no"})
 
+    def apply_policy_attachments(self):
+        """Attaches the policy to, or detaches it from, all the OUs of the
+        OUList in one invocation. The targets of the policy are listed once,
+        then only the missing attachments and the remaining detachments are
+        applied, MAX_CONCURRENT_POLICY_ATTACHMENTS at a time.
+
+        OUList example: [[['ouname1', 'ouid1'], 'Attach'], ...]
+        """
+        self.logger.info("Executing: " + self.__class__.__name__ + "/" + inspect.stack()[0][3])
+        self.logger.info(self.params)
+        policy_id = self.event.get("PolicyId")
+        rcp = RCP(self.logger)
+
+        attached_target_ids = set()
+        for page in rcp.list_targets_for_policy(policy_id):
+            for target in page.get("Targets"):
+                attached_target_ids.add(target.get("TargetId"))
+
+        attach_list, detach_list = [], []
+        for (ou_name, ou_id), operation in self.params.get("OUList", []):
+            if ou_id is None or len(ou_id) == 0:
+                raise ValueError("OU id is not found for {}".format(ou_name))
+            if operation == "Attach":
+                if ou_id not in attached_target_ids:
+                    attach_list.append(ou_id)
+            elif operation == "Detach":
+                if ou_id in attached_target_ids:
+                    detach_list.append(ou_id)
+            else:
+                raise ValueError(
+                    "Invalid Operation Type {} for {}, valid choices are "
+                    "[Attach, Detach]".format(operation, ou_name)
+                )
+        self.logger.info("Attach policy {} to OUs: {}".format(policy_id, attach_list))
+        self.logger.info("Detach policy {} from OUs: {}".format(policy_id, detach_list))
+
+        max_workers = int(os.environ.get("MAX_CONCURRENT_POLICY_ATTACHMENTS", 5))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(rcp.attach_policy, policy_id, target_id)
+                for target_id in attach_list
+            ] + [
+                executor.submit(rcp.detach_policy, policy_id, target_id)
+                for target_id in detach_list
+            ]
+            for future in futures:
+                future.result()
+
+        status = "Policy: {} attached to OUs: {}, detached from OUs: {}".format(
+            policy_id, attach_list, detach_list
+        )
+        self.event.update({"Status": status})
+        return self.event
+
     def detach_policy_from_all_accounts(self):
         self.logger.info("Executing: " + self.__class__.__name__ + "/" + inspect.stack()[0][3])
         self.logger.info(self.params)
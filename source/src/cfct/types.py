@@ -1,4 +1,4 @@
-from typing import Any, Dict, List, Literal, TypedDict
+from typing import Any, Dict, List, Literal, NamedTuple, TypedDict
 
 
 class ResourcePropertiesTypeDef(TypedDict):
@@ -21,6 +21,14 @@ class StackSetRequestTypeDef(TypedDict):
     SkipUpdateStackSet: Literal["no", "yes"]
 
 
-class StackSetInstanceTypeDef(TypedDict):
+class StackInstanceSummary(NamedTuple):
+    """
+    Status is the stack instance status (CURRENT, OUTDATED or INOPERABLE),
+    detailed_status and drift_status are empty strings when not reported
+    """
+
     account: str
     region: str
+    status: str
+    detailed_status: str
+    drift_status: str
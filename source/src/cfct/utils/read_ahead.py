@@ -0,0 +1,58 @@
+###############################################################################
+#  Copyright 2021 Amazon.com, Inc. or its affiliates. All Rights Reserved.    #
+#                                                                             #
+#  Licensed under the Apache License, Version 2.0 (the "License").            #
+#  You may not use this file except in compliance with the License.
+#  A copy of the License is located at                                        #
+#                                                                             #
+#      http://www.apache.org/licenses/LICENSE-2.0                             #
+#                                                                             #
+#  or in the "license" file accompanying this file. This file is distributed  #
+#  on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, express #
+#  or implied. See the License for the specific language governing permissions#
+#  and limitations under the License.                                         #
+###############################################################################
+
+import queue
+import threading
+from typing import Iterable, Iterator
+
+_END = object()
+
+
+class ReadAhead(Iterator):
+    """Iterates over an iterable in a background thread, up to 'size' items
+    ahead of the consumer, so that the items are produced while the
+    previous ones are being processed. The error raised by the iterable is
+    raised by next() once the items produced before it are consumed.
+
+    Example:
+        for sm_input in ReadAhead(parser.iter_stack_set_manifest_v2(), size=5):
+            run(sm_input)
+    """
+
+    def __init__(self, iterable: Iterable, size: int = 1):
+        self.items = queue.Queue(maxsize=max(int(size), 1))
+        self.done = False
+        # daemon: the producer is abandoned if the consumer stops early
+        self.thread = threading.Thread(target=self._produce, args=(iterable,), daemon=True)
+        self.thread.start()
+
+    def _produce(self, iterable):
+        try:
+            for item in iterable:
+                self.items.put((item, None))
+            self.items.put((_END, None))
+        except Exception as error:
+            self.items.put((_END, error))
+
+    def __next__(self):
+        if self.done:
+            raise StopIteration
+        item, error = self.items.get()
+        if item is _END:
+            self.done = True
+            if error is not None:
+                raise error
+            raise StopIteration
+        return item
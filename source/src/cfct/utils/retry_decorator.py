@@ -15,13 +15,22 @@
 
 import time
 from functools import wraps
-from random import randint
+from random import randint, uniform
+
+from botocore.exceptions import ClientError
 
 from cfct.utils.logger import Logger
 
 # initialise logger
 logger = Logger(loglevel="info")
 
+THROTTLING_ERROR_CODES = [
+    "Throttling",
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "RequestLimitExceeded",
+]
+
 
 def try_except_retry(count=3, multiplier=2):
     def decorator(func):
@@ -45,3 +54,42 @@ def try_except_retry(count=3, multiplier=2):
         return wrapper
 
     return decorator
+
+
+def is_retryable_error(error: ClientError, error_codes=()) -> bool:
+    """Returns True if retry_on_throttling(error_codes=error_codes) retries
+    the error. The wrapped functions do not log these errors as unhandled,
+    the decorator does once the retry attempts failed.
+    """
+    return error.response["Error"]["Code"] in set(THROTTLING_ERROR_CODES).union(error_codes)
+
+
+def retry_on_throttling(count=5, base_seconds=1, max_seconds=30, error_codes=()):
+    """Retries the function when the API call is throttled, or fails with one
+    of the additional error_codes, waiting a random time between 0 and
+    base_seconds * 2^attempt (at most max_seconds) before each new attempt.
+    Other errors are raised right away.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            attempt = 0
+            while True:
+                try:
+                    return func(*args, **kwargs)
+                except ClientError as e:
+                    attempt += 1
+                    if not is_retryable_error(e, error_codes):
+                        raise
+                    if attempt >= count:
+                        logger.error("Retry attempts failed, raising the exception.")
+                        logger.log_unhandled_exception(e)
+                        raise
+                    _seconds = uniform(0, min(max_seconds, base_seconds * 2**attempt))
+                    logger.warning("{}, Trying again in {:.1f} seconds".format(e, _seconds))
+                    time.sleep(_seconds)
+
+        return wrapper
+
+    return decorator
@@ -27,7 +27,6 @@ setuptools.setup(
     package_data={"cfct": ["validation/*.yaml"]},
     python_requires=">=3.11",
     install_requires=[
-        "yorm==1.6.2",
         "pyyaml==5.4.1",
         "Jinja2==3.1.6",
         "MarkupSafe==2.0.1",  # https://github.com/pallets/jinja/issues/1585